@@ -0,0 +1,312 @@
+import csv
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from setting import Settings
+
+ITEM_COLUMNS = ['id', 'group_name', 'taste', 'nicotine', 'volume', 'price', 'code', 'count']
+
+
+class IncrementalBackup:
+    FULL = "full"
+    DELTA = "delta"
+
+    def __init__(self, db_handler, directory="backup", full_every=None, keep_chains=None):
+        """Initialize an IncrementalBackup instance.
+
+        A chain is one full CSV snapshot followed by delta files holding only the items changed since the
+        previous backup, read from the change journal. The chain is described by manifest.json in the
+        backup directory.
+
+        Args:
+            db_handler (DatabaseHandler): Handler of the database to back up.
+            directory (str, optional): Directory of the backup files. Defaults to "backup".
+            full_every (int, optional): Number of deltas after which a new full snapshot is taken.
+                Defaults to Settings().backup_full_every.
+            keep_chains (int, optional): Number of chains kept on disk. Defaults to Settings().backup_keep_chains.
+        """
+        settings = Settings()
+        self.db_handler = db_handler
+        self.directory = Path(directory)
+        self.full_every = full_every if full_every is not None else settings.backup_full_every
+        self.keep_chains = keep_chains if keep_chains is not None else settings.backup_keep_chains
+        self.manifest_path = self.directory / "manifest.json"
+
+    def load_manifest(self):
+        """Read the list of backups from the manifest.
+
+        Returns:
+            List[Dict]: Backup entries, oldest first.
+        """
+        if not self.manifest_path.exists():
+            return []
+        with self.manifest_path.open(encoding='utf-8') as file:
+            return json.load(file)['entries']
+
+    def save_manifest(self, entries):
+        """Write the list of backups to the manifest atomically.
+
+        Args:
+            entries (List[Dict]): Backup entries, oldest first.
+        """
+        temporary_path = self.manifest_path.with_suffix(".tmp")
+        with temporary_path.open('w', encoding='utf-8') as file:
+            json.dump({'entries': entries}, file, indent=2)
+        temporary_path.replace(self.manifest_path)
+
+    @staticmethod
+    def current_chain(entries):
+        """Return the latest full snapshot and the deltas taken after it.
+
+        Args:
+            entries (List[Dict]): Backup entries, oldest first.
+
+        Returns:
+            List[Dict]: Entries of the latest chain, or an empty list if there is no full snapshot.
+        """
+        for index in range(len(entries) - 1, -1, -1):
+            if entries[index]['kind'] == IncrementalBackup.FULL:
+                return entries[index:]
+        return []
+
+    def run(self, force_full=False, prune=True):
+        """Take a backup: a delta of the changes since the last backup, or a full snapshot when due.
+
+        Args:
+            force_full (bool, optional): Whether to take a full snapshot regardless of the chain length.
+                Defaults to False.
+            prune (bool, optional): Whether to prune the journal entries covered by a full snapshot right away.
+                The pruning goes through the writer connection, so a caller running off the writer's thread
+                passes False and calls prune_journal with the returned entry from that thread. Defaults to True.
+
+        Returns:
+            Dict: Manifest entry of the written backup, or None if nothing changed since the last one.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        entries = self.load_manifest()
+        chain = self.current_chain(entries)
+        if force_full or not chain or len(chain) - 1 >= self.full_every:
+            entry = self.write_full()
+        else:
+            entry = self.write_delta(chain[-1]['seq'])
+            if entry is None:
+                return None
+        entries.append(entry)
+        entries = self.apply_retention(entries)
+        self.save_manifest(entries)
+        if prune:
+            self.prune_journal(entry)
+        return entry
+
+    def prune_journal(self, entry):
+        """Delete the change journal entries covered by a full snapshot. Must run on the writer's thread.
+
+        Args:
+            entry (Dict): Manifest entry returned by run, or None.
+        """
+        if entry is not None and entry['kind'] == self.FULL:
+            # Older journal entries are covered by the snapshot
+            self.db_handler.prune_changes(entry['seq'])
+
+    def new_path(self, kind: str) -> Path:
+        """Return a fresh file name for a backup.
+
+        Args:
+            kind (str): FULL or DELTA.
+
+        Returns:
+            Path: Path of the backup file.
+        """
+        stamp = datetime.now().strftime(f"{Settings().format_data}_%H%M%S_%f")
+        return self.directory / f"{stamp}_{kind}.csv"
+
+    def write_full(self):
+        """Write every item and the journal position it corresponds to, from one consistent snapshot.
+
+        Returns:
+            Dict: Manifest entry of the snapshot.
+        """
+        path = self.new_path(self.FULL)
+        rows = 0
+        with self.db_handler.reader() as reader, reader.read_transaction():
+            seq = reader.retrieve_last_change_seq()
+            with path.open('w', newline='', encoding='utf-8', buffering=1024 * 1024) as file:
+                csv_writer = csv.writer(file)
+                csv_writer.writerow(ITEM_COLUMNS)
+                for row in reader.iter_item_rows():
+                    csv_writer.writerow(row)
+                    rows += 1
+        return {'kind': self.FULL, 'file': path.name, 'seq': seq, 'rows': rows,
+                'created_at': datetime.now().isoformat(timespec='seconds')}
+
+    def write_delta(self, since_seq: int):
+        """Write the final state of every item changed after a journal position.
+
+        Args:
+            since_seq (int): Journal position covered by the previous backup.
+
+        Returns:
+            Dict: Manifest entry of the delta, or None if nothing changed.
+        """
+        path = self.new_path(self.DELTA)
+        rows = 0
+        with self.db_handler.reader() as reader, reader.read_transaction():
+            seq = reader.retrieve_last_change_seq()
+            if seq <= since_seq:
+                return None
+            with path.open('w', newline='', encoding='utf-8', buffering=1024 * 1024) as file:
+                csv_writer = csv.writer(file)
+                csv_writer.writerow(['deleted'] + ITEM_COLUMNS)
+                for row in reader.iter_changes_since(since_seq):
+                    csv_writer.writerow([row[-1]] + list(row[:-1]))
+                    rows += 1
+        return {'kind': self.DELTA, 'file': path.name, 'seq': seq, 'since_seq': since_seq, 'rows': rows,
+                'created_at': datetime.now().isoformat(timespec='seconds')}
+
+    def apply_retention(self, entries):
+        """Drop the files of the oldest chains beyond keep_chains.
+
+        Args:
+            entries (List[Dict]): Backup entries, oldest first.
+
+        Returns:
+            List[Dict]: Entries still on disk.
+        """
+        full_positions = [index for index, entry in enumerate(entries) if entry['kind'] == self.FULL]
+        if len(full_positions) <= self.keep_chains:
+            return entries
+        first_kept = full_positions[-self.keep_chains]
+        for entry in entries[:first_kept]:
+            (self.directory / entry['file']).unlink(missing_ok=True)
+        return entries[first_kept:]
+
+    def restore(self):
+        """Replace the items with the latest full snapshot and replay the deltas taken after it.
+
+        Returns:
+            Dict: Manifest entry of the last backup replayed, or None if there is no full snapshot.
+        """
+        chain = self.current_chain(self.load_manifest())
+        if not chain:
+            return None
+        self.db_handler.restore_items(self.read_full(chain[0]), (self.read_delta(entry) for entry in chain[1:]))
+        return chain[-1]
+
+    def read_full(self, entry):
+        """Stream the item rows of a full snapshot.
+
+        Args:
+            entry (Dict): Manifest entry of the snapshot.
+
+        Yields:
+            Tuple: Item row in the column order of the 'items' table.
+        """
+        with (self.directory / entry['file']).open(newline='', encoding='utf-8') as file:
+            csv_reader = csv.reader(file)
+            next(csv_reader, None)
+            for row in csv_reader:
+                yield self.parse_row(row)
+
+    def read_delta(self, entry):
+        """Stream the changes of a delta.
+
+        Args:
+            entry (Dict): Manifest entry of the delta.
+
+        Yields:
+            Tuple[bool, Tuple]: Whether the item was deleted, and its row.
+        """
+        with (self.directory / entry['file']).open(newline='', encoding='utf-8') as file:
+            csv_reader = csv.reader(file)
+            next(csv_reader, None)
+            for row in csv_reader:
+                yield row[0] == '1', self.parse_row(row[1:])
+
+    @staticmethod
+    def parse_row(row):
+        """Convert a CSV row back into typed item values.
+
+        Args:
+            row (List[str]): Item row as written by csv.writer.
+
+        Returns:
+            Tuple: Item row in the column order of the 'items' table. Empty text fields stay empty strings,
+            which is what the application stores; empty numeric fields become None.
+        """
+        def number(text, convert):
+            return convert(text) if text != '' else None
+
+        return (int(row[0]), row[1], row[2], number(row[3], int), number(row[4], int), number(row[5], float),
+                row[6], number(row[7], int))
+
+
+class DatabaseSnapshot:
+    def __init__(self, db_handler, directory="backup", pages_per_step=None, step_sleep=None, keep=None):
+        """Initialize a DatabaseSnapshot instance.
+
+        Snapshots are native SQLite copies taken with the online backup API from a pooled read connection.
+        The copy advances a few pages at a time and restarts by itself if another connection writes
+        meanwhile, so it is consistent and never blocks the writer for long. Unlike the CSV backups it keeps
+        the schema, the indexes and the column types.
+
+        Args:
+            db_handler (DatabaseHandler): Handler of the database to snapshot.
+            directory (str, optional): Directory of the snapshot files. Defaults to "backup".
+            pages_per_step (int, optional): Pages copied per step. Defaults to Settings().snapshot_pages_per_step.
+            step_sleep (float, optional): Seconds slept between steps. Defaults to Settings().snapshot_step_sleep.
+            keep (int, optional): Number of snapshots kept on disk. Defaults to Settings().snapshot_keep.
+        """
+        settings = Settings()
+        self.db_handler = db_handler
+        self.directory = Path(directory)
+        self.pages_per_step = pages_per_step if pages_per_step is not None else settings.snapshot_pages_per_step
+        self.step_sleep = step_sleep if step_sleep is not None else settings.snapshot_step_sleep
+        self.keep = keep if keep is not None else settings.snapshot_keep
+
+    def run(self, on_progress=None) -> Path:
+        """Copy the database into a new snapshot file and apply the retention policy.
+
+        Args:
+            on_progress (Callable[[int, int], None], optional): Called with the number of copied pages and the
+                total after every step. Defaults to None.
+
+        Returns:
+            Path: Path of the snapshot file.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now().strftime(f"{Settings().format_data}_%H%M%S_%f")
+        path = self.directory / f"{stamp}_snapshot.db"
+        partial_path = self.directory / f"{stamp}_snapshot.db.part"
+
+        def progress(status, remaining, total):
+            if on_progress is not None:
+                on_progress(total - remaining, total)
+
+        try:
+            with self.db_handler.reader() as reader:
+                target = sqlite3.connect(partial_path)
+                try:
+                    reader.conn.backup(target, pages=self.pages_per_step, progress=progress, sleep=self.step_sleep)
+                finally:
+                    target.close()
+            partial_path.replace(path)
+        finally:
+            partial_path.unlink(missing_ok=True)
+        self.apply_retention()
+        return path
+
+    def list_snapshots(self):
+        """Return the snapshot files, oldest first.
+
+        Returns:
+            List[Path]: Paths of the snapshot files.
+        """
+        return sorted(self.directory.glob("*_snapshot.db"), key=lambda path: path.stat().st_mtime)
+
+    def apply_retention(self):
+        """Delete the oldest snapshots beyond keep."""
+        snapshots = self.list_snapshots()
+        for path in snapshots[:max(len(snapshots) - self.keep, 0)]:
+            path.unlink(missing_ok=True)
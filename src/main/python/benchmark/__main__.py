@@ -0,0 +1,5 @@
+import sys
+
+from benchmark.suite import main
+
+sys.exit(main())
@@ -0,0 +1,90 @@
+"""Deterministic synthetic inventories for the benchmarks.
+
+The same parameters always produce the same items, so results of different runs are comparable.
+"""
+import csv
+import random
+from pathlib import Path
+
+from database import DatabaseHandler
+
+# Sizes the suite is usually run at
+SIZES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+
+WORDS = ['apple', 'berry', 'cherry', 'citrus', 'cola', 'cream', 'grape', 'honey', 'ice', 'lemon', 'lime',
+         'mango', 'melon', 'menthol', 'mint', 'orange', 'peach', 'pear', 'pineapple', 'plum', 'raspberry',
+         'strawberry', 'tobacco', 'vanilla', 'watermelon']
+
+
+def generate_rows(rows: int, groups: int = 20, tastes: int = 500, seed: int = 0):
+    """Stream synthetic items.
+
+    Args:
+        rows (int): Number of items.
+        groups (int, optional): Number of distinct group names. Defaults to 20.
+        tastes (int, optional): Number of distinct taste strings. Defaults to 500.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Yields:
+        Tuple: (group_name, taste, nicotine, volume, price, code, count) with a unique code.
+    """
+    generator = random.Random(seed)
+    group_names = [f"Group {index:03d}" for index in range(groups)]
+    taste_names = [" ".join(generator.sample(WORDS, 2)) + f" {index}" for index in range(tastes)]
+    for index in range(rows):
+        # About one item in five is out of stock, like a real inventory
+        count = 0 if generator.random() < 0.2 else generator.randint(1, 50)
+        yield (generator.choice(group_names),
+               generator.choice(taste_names),
+               generator.choice((0, 3, 6, 12, 20, 50)),
+               generator.choice((10, 30, 60, 100)),
+               round(generator.uniform(50, 1000), 2),
+               f"{4800000000000 + index:013d}",
+               count)
+
+
+def create_database(path, rows: int, groups: int = 20, tastes: int = 500, seed: int = 0) -> DatabaseHandler:
+    """Create a database filled with synthetic items, or open it if it was already generated.
+
+    Args:
+        path (str): Path of the database file.
+        rows (int): Number of items.
+        groups (int, optional): Number of distinct group names. Defaults to 20.
+        tastes (int, optional): Number of distinct taste strings. Defaults to 500.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        DatabaseHandler: Connected handler of the database.
+    """
+    exists = Path(path).exists()
+    db_handler = DatabaseHandler(str(path))
+    db_handler.connect()
+    db_handler.create_tables()
+    if not exists:
+        db_handler.cursor.executemany(
+            "INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?);",
+            generate_rows(rows, groups, tastes, seed))
+        db_handler.conn.commit()
+    return db_handler
+
+
+def write_csv(path, rows: int, groups: int = 20, tastes: int = 500, seed: int = 0) -> Path:
+    """Write synthetic items to a CSV file readable by CSVImporter.
+
+    Args:
+        path (str): Path of the CSV file.
+        rows (int): Number of items.
+        groups (int, optional): Number of distinct group names. Defaults to 20.
+        tastes (int, optional): Number of distinct taste strings. Defaults to 500.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+        Path: Path of the CSV file.
+    """
+    path = Path(path)
+    with path.open('w', newline='', encoding='utf-8', buffering=1024 * 1024) as file:
+        csv_writer = csv.writer(file)
+        csv_writer.writerow(['group_name', 'taste', 'nicotine', 'volume', 'price', 'code', 'count'])
+        csv_writer.writerows(generate_rows(rows, groups, tastes, seed))
+    return path
@@ -0,0 +1,99 @@
+"""Compare building ItemData the old way with the slotted class and the row factory.
+
+Run from src/main/python:
+
+    python -m benchmark.item_data --rows 100000
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmark.generator import create_database
+from database import DatabaseHandler
+from services import ItemData
+
+
+class DictItemData:
+    # ItemData as it was before __slots__, kept only as the baseline of this benchmark
+    def __init__(self, id_=None, group_name=None, taste=None, nicotine=None, volume=None, price=None, code=None,
+                 count=None):
+        self.id_ = id_
+        self.group_name = group_name
+        self.taste = taste
+        self.nicotine = nicotine
+        self.volume = volume
+        self.price = price
+        self.code = str(code)
+        self.count = count
+
+
+def build_legacy(rows):
+    # One keyword construction per row, as retrieve_all_item_data used to do
+    return [DictItemData(id_=row[0], group_name=row[1], taste=row[2], nicotine=row[3], volume=row[4],
+                         price=row[5], code=row[6], count=row[7])
+            for row in rows]
+
+
+def retrieve_legacy(db_handler: DatabaseHandler):
+    db_handler.cursor.execute("SELECT * FROM items ORDER BY id ASC")
+    return build_legacy(db_handler.cursor.fetchall())
+
+
+def measure(function, repeat=3):
+    """Time a function and trace the memory held by its result.
+
+    Timing and tracing are separate runs, since tracemalloc slows allocation down.
+
+    Args:
+        function (Callable[[], List]): Function returning a list of items.
+        repeat (int, optional): Number of timed runs, the best one is kept. Defaults to 3.
+
+    Returns:
+        Tuple[float, float]: Best seconds taken and bytes held per returned item.
+    """
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    tracemalloc.start()
+    result = function()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return elapsed, held / max(len(result), 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="number of synthetic items")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_handler = create_database(Path(directory) / "benchmark.db", args.rows)
+        rows = db_handler.conn.execute("SELECT * FROM items ORDER BY id ASC").fetchall()
+
+        # "build" cases only construct objects from fetched rows, "read" cases include the query
+        cases = [
+            ("build: dict class, keywords", lambda: build_legacy(rows)),
+            ("build: ItemData.from_row", lambda: [ItemData.from_row(row) for row in rows]),
+            ("read: dict class, keywords", lambda: retrieve_legacy(db_handler)),
+            ("read: retrieve_all_item_data", db_handler.retrieve_all_item_data),
+        ]
+        print(f"{args.rows} rows")
+        for name, function in cases:
+            elapsed, per_item = measure(function)
+            print(f"{name:32} {elapsed * 1000:9.1f} ms {elapsed / args.rows * 1e9:8.0f} ns/row "
+                  f"{per_item:7.0f} B/row")
+
+        start = time.perf_counter()
+        streamed = sum(1 for _ in db_handler.iter_item_data())
+        elapsed = time.perf_counter() - start
+        print(f"{'read: iter_item_data, streamed':32} {elapsed * 1000:9.1f} ms "
+              f"{elapsed / max(streamed, 1) * 1e9:8.0f} ns/row")
+        db_handler.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""Time the hot paths of the application on a synthetic inventory and compare runs.
+
+Run from src/main/python:
+
+    python -m benchmark --size 100k --output results.json
+    python -m benchmark --size 100k --output new.json --compare results.json
+
+The exit code is 1 when --compare flags a case slower than the baseline by more than --threshold.
+"""
+import argparse
+import json
+import platform
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from backup import IncrementalBackup, DatabaseSnapshot
+from benchmark.generator import SIZES, create_database, write_csv
+from database import DatabaseHandler
+from services import FilterManager, CSVImporter, CSVExporter
+
+
+class Case:
+    def __init__(self, name: str, run, setup=None):
+        """Initialize a Case instance.
+
+        Args:
+            name (str): Unique name of the case, used to match it against a baseline.
+            run (Callable): Timed function. Receives the value returned by setup, if any.
+            setup (Callable, optional): Untimed function run before every repetition. Defaults to None.
+        """
+        self.name = name
+        self.run = run
+        self.setup = setup
+
+    def measure(self, repeat: int):
+        """Run the case and summarise its timings.
+
+        Args:
+            repeat (int): Number of repetitions.
+
+        Returns:
+            Dict: Best, median and mean seconds, and the number of repetitions.
+        """
+        timings = []
+        for _ in range(repeat):
+            argument = self.setup() if self.setup is not None else None
+            start = time.perf_counter()
+            if self.setup is not None:
+                self.run(argument)
+            else:
+                self.run()
+            timings.append(time.perf_counter() - start)
+        return {'min': min(timings), 'median': statistics.median(timings), 'mean': statistics.fmean(timings),
+                'runs': len(timings)}
+
+
+def read_cases(db_handler: DatabaseHandler, rows: int):
+    """Cases reading the items, covering every retrieve_* method of DatabaseHandler.
+
+    Args:
+        db_handler (DatabaseHandler): Handler of the synthetic database.
+        rows (int): Number of items in the database.
+
+    Returns:
+        List[Case]: Cases that do not change the database.
+    """
+    group_name = db_handler.retrieve_groups_names()[0][0]
+    filters = {
+        'in_stock': FilterManager(),
+        'group': FilterManager(group_name=group_name),
+        'search': FilterManager(search_teste="mint"),
+        'ranges': FilterManager(ranges={'volume': (10, 10), 'price': (None, 300), 'nicotine': (20, None)}),
+        'sorted': FilterManager(sort=[('price', True)]),
+    }
+    middle_id = rows // 2 + 1
+    middle_code = db_handler.retrieve_item_data_by_id(middle_id).code
+    cases = [
+        Case("retrieve_all_item_data", db_handler.retrieve_all_item_data),
+        Case("retrieve_data_from_items", db_handler.retrieve_data_from_items),
+        Case("retrieve_data_from_items_with_group_name", db_handler.retrieve_data_from_items_with_group_name),
+        Case("retrieve_data_from_items_with_group_name_where_group",
+             lambda: db_handler.retrieve_data_from_items_with_group_name_where_group(group_name)),
+        Case("retrieve_groups_names", db_handler.retrieve_groups_names),
+        Case("retrieve_item_data_by_id", lambda: db_handler.retrieve_item_data_by_id(middle_id)),
+        Case("retrieve_item_data_by_code", lambda: db_handler.retrieve_item_data_by_code(middle_code)),
+        Case("iter_item_rows", lambda: sum(1 for _ in db_handler.iter_item_rows())),
+        Case("retrieve_group_summaries", db_handler.retrieve_group_summaries),
+        Case("retrieve_inventory_totals", db_handler.retrieve_inventory_totals),
+        Case("verify_group_summary", db_handler.verify_group_summary),
+    ]
+
+    def deep_cursor(filter_manager):
+        # The cursor after the first rows // 4 items, to compare with the deep OFFSET page. Reading that many
+        # rows is slow on large sizes, so it happens on the first run of the case and only once
+        cursors = []
+
+        def setup():
+            if not cursors:
+                cursors.append(db_handler.retrieve_items_page(filter_manager, rows // 4)[1])
+            return cursors[0]
+
+        return setup
+
+    for label, filter_manager in filters.items():
+        cases += [
+            Case(f"retrieve_items_where_filter_manager[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_items_where_filter_manager(f)),
+            Case(f"retrieve_item_data_with_filters[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_item_data_with_filters(f)),
+            Case(f"retrieve_items_page_where_filter_manager[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_items_page_where_filter_manager(f, limit=200)),
+            Case(f"retrieve_items_page_where_filter_manager[{label},deep]",
+                 lambda f=filter_manager: db_handler.retrieve_items_page_where_filter_manager(
+                     f, limit=200, offset=rows // 4)),
+            Case(f"retrieve_items_page[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_items_page(f, 200)),
+            Case(f"retrieve_items_page[{label},deep]",
+                 lambda cursor, f=filter_manager: db_handler.retrieve_items_page(f, 200, cursor),
+                 setup=deep_cursor(filter_manager)),
+            Case(f"retrieve_groups_names_with_filters[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_groups_names_with_filters(f)),
+            Case(f"retrieve_count_in_group_with_filters[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_count_in_group_with_filters(f.group_name, f)),
+            Case(f"retrieve_group_facets_with_filters[{label}]",
+                 lambda f=filter_manager: db_handler.retrieve_group_facets_with_filters(f)),
+        ]
+
+    def show_group_name_combo_box():
+        # What MainWindow does on startup and when in_stock is toggled: the facets, then the first page
+        filter_manager = FilterManager()
+        db_handler.retrieve_group_facets_with_filters(filter_manager)
+        db_handler.retrieve_items_page(filter_manager, 200)
+
+    cases.append(Case("show_group_name_comboBox", show_group_name_combo_box))
+    return cases
+
+
+def write_cases(db_handler: DatabaseHandler, directory: Path, rows: int, csv_path: Path):
+    """Cases changing the database or writing files: CSV round trips, backups and count updates.
+
+    Args:
+        db_handler (DatabaseHandler): Handler of the synthetic database.
+        directory (Path): Scratch directory of the run.
+        rows (int): Number of items in the database.
+        csv_path (Path): Synthetic CSV file with the same number of items.
+
+    Returns:
+        List[Case]: Cases in the order they have to run.
+    """
+    export_directory = directory / "export"
+    export_directory.mkdir()
+    backup_directory = directory / "backup"
+    ids = list(range(1, rows + 1, max(rows // 100, 1)))[:100]
+
+    def export_csv():
+        exporter = CSVExporter(db_handler.iter_item_rows(), path_dir=str(export_directory))
+        exporter.export_to_file()
+        exporter.path_file.unlink()
+
+    def fresh_database():
+        path = directory / "import.db"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{path}{suffix}").unlink(missing_ok=True)
+        import_handler = DatabaseHandler(str(path))
+        import_handler.connect()
+        import_handler.create_tables()
+        return import_handler
+
+    def import_csv(import_handler):
+        rows_read = (item_data for chunk in CSVImporter(str(csv_path)).iter_chunks() for item_data in chunk.rows)
+        import_handler.insert_item_datas(rows_read)
+        import_handler.close_connection()
+
+    def fresh_backup_directory():
+        shutil.rmtree(backup_directory, ignore_errors=True)
+        return IncrementalBackup(db_handler, directory=str(backup_directory))
+
+    def backup_after_changes():
+        backup = fresh_backup_directory()
+        backup.run()
+        for id_ in ids:
+            db_handler.adjust_count(id_, 1)
+        return backup
+
+    def update_counts():
+        for id_ in ids:
+            item_data = db_handler.retrieve_item_data_by_id(id_)
+            db_handler.update_item_count_value(id_, item_data.count + 1)
+
+    def adjust_counts():
+        for id_ in ids:
+            db_handler.adjust_count(id_, 1)
+
+    def apply_stock_movements():
+        db_handler.apply_stock_movements([(id_, 1) for id_ in ids])
+
+    return [
+        Case("csv_export", export_csv),
+        Case("csv_import", import_csv, setup=fresh_database),
+        Case("backup_full", lambda backup: backup.run(force_full=True), setup=fresh_backup_directory),
+        Case("backup_delta[100]", lambda backup: backup.run(), setup=backup_after_changes),
+        Case("rebuild_group_summary", db_handler.rebuild_group_summary),
+        Case("snapshot", lambda: DatabaseSnapshot(db_handler, directory=str(directory / "snapshots")).run()),
+        Case("update_item_count_value[100]", update_counts),
+        Case("adjust_count[100]", adjust_counts),
+        Case("apply_stock_movements[100]", apply_stock_movements),
+    ]
+
+
+def run_suite(rows: int, groups: int, tastes: int, seed: int, repeat: int, data_dir=None, select=None):
+    """Generate the inventory, run every case and collect the results.
+
+    Args:
+        rows (int): Number of synthetic items.
+        groups (int): Number of distinct group names.
+        tastes (int): Number of distinct taste strings.
+        seed (int): Seed of the generator.
+        repeat (int): Repetitions per case.
+        data_dir (str, optional): Directory keeping generated databases between runs. Defaults to None,
+            which generates into the scratch directory.
+        select (str, optional): Only run cases whose name contains this text. Defaults to None.
+
+    Returns:
+        Dict: JSON-serialisable results with the parameters of the run.
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = Path(scratch)
+        name = f"items_{rows}_{groups}_{tastes}_{seed}.db"
+        if data_dir is not None:
+            Path(data_dir).mkdir(parents=True, exist_ok=True)
+            source = Path(data_dir) / name
+            create_database(source, rows, groups, tastes, seed).close_connection()
+            # The write cases change the database, so the run works on a copy
+            shutil.copyfile(source, directory / name)
+        db_handler = create_database(directory / name, rows, groups, tastes, seed)
+        csv_path = write_csv(directory / "items.csv", rows, groups, tastes, seed)
+        results = {}
+        try:
+            for case in read_cases(db_handler, rows) + write_cases(db_handler, directory, rows, csv_path):
+                if select is not None and select not in case.name:
+                    continue
+                results[case.name] = case.measure(repeat)
+                print(f"{case.name:64} {results[case.name]['median'] * 1000:10.2f} ms")
+        finally:
+            db_handler.close_connection()
+    return {
+        'parameters': {'rows': rows, 'groups': groups, 'tastes': tastes, 'seed': seed, 'repeat': repeat},
+        'environment': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                        'platform': platform.platform(), 'created_at': datetime.now().isoformat(timespec='seconds')},
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold: float):
+    """Compare the best timings of two runs; the best run is the least disturbed by other processes.
+
+    Args:
+        results (Dict): Results of this run.
+        baseline (Dict): Results of the reference run.
+        threshold (float): Relative slowdown above which a case is a regression, e.g. 0.2 for 20 %.
+
+    Returns:
+        List[str]: Names of the regressed cases.
+    """
+    if results['parameters'] != baseline['parameters']:
+        print(f"warning: parameters differ from the baseline: {baseline['parameters']}")
+    regressions = []
+    for name, result in results['results'].items():
+        if name not in baseline['results']:
+            continue
+        ratio = result['min'] / baseline['results'][name]['min']
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:64} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description=__doc__.splitlines()[0])
+    parser.add_argument("--size", choices=sorted(SIZES), default="1k", help="number of items (default: %(default)s)")
+    parser.add_argument("--rows", type=int, help="exact number of items, overriding --size")
+    parser.add_argument("--groups", type=int, default=20, help="distinct group names (default: %(default)s)")
+    parser.add_argument("--tastes", type=int, default=500, help="distinct taste strings (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the generator (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per case (default: %(default)s)")
+    parser.add_argument("--select", help="only run cases whose name contains this text")
+    parser.add_argument("--data-dir", help="keep generated databases here and reuse them")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of a baseline run")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="relative slowdown flagged as a regression (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    rows = args.rows if args.rows is not None else SIZES[args.size]
+    results = run_suite(rows, args.groups, args.tastes, args.seed, args.repeat, args.data_dir, args.select)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
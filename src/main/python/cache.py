@@ -0,0 +1,165 @@
+import threading
+from collections import OrderedDict
+
+from services import FilterManager, ChangeEvent
+from setting import Settings
+
+
+class InventoryCache:
+    def __init__(self, db_handler, max_entries=None):
+        """Initialize an InventoryCache instance.
+
+        The cache sits in front of a DatabaseHandler and keeps the group names, the group facets and the
+        pages of filtered items in a bounded LRU. It listens to the handler's change events and drops only
+        the entries a change can affect: an entry of one group is kept when an item of another group
+        changes. Any thread may read through the cache; results are shared and must not be modified.
+
+        Args:
+            db_handler (DatabaseHandler): Handler whose results are cached and whose changes invalidate them.
+            max_entries (int, optional): Maximum number of cached results. Defaults to Settings().cache_max_entries.
+        """
+        self.db_handler = db_handler
+        self.max_entries = max_entries if max_entries is not None else Settings().cache_max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        # Bumped by every change, so that a result read before the change is not stored after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        db_handler.add_change_listener(self.on_change)
+
+    def stats(self):
+        """Return cache statistics.
+
+        Returns:
+            Dict[str, int]: Number of hits, misses, evicted and invalidated results, and cached results.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'invalidations': self.invalidations, 'entries': len(self.entries)}
+
+    def clear(self):
+        """Drop every cached result."""
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries.clear()
+
+    def close(self):
+        """Stop listening to the handler and drop every cached result."""
+        self.db_handler.remove_change_listener(self.on_change)
+        self.clear()
+
+    def on_change(self, event: ChangeEvent):
+        """Drop the cached results an item change can affect.
+
+        Args:
+            event (ChangeEvent): Change reported by the database handler.
+        """
+        if event.kind == ChangeEvent.RELOADED:
+            self.clear()
+            return
+        item_datas = [item_data for item_data in (event.previous, event.item_data) if item_data is not None]
+        with self.lock:
+            self.generation += 1
+            for key, (value, depends_on) in list(self.entries.items()):
+                if self.is_affected(depends_on, item_datas):
+                    del self.entries[key]
+                    self.invalidations += 1
+
+    @staticmethod
+    def is_affected(depends_on: FilterManager, item_datas) -> bool:
+        """Check whether a change of items can alter a cached result.
+
+        Args:
+            depends_on (FilterManager): Filters selecting the items the result is computed from, or None if
+                it depends on every item.
+            item_datas (List[ItemData]): The changed item before and after the change.
+
+        Returns:
+            bool: True if the result has to be dropped, False otherwise.
+        """
+        if depends_on is None or not depends_on.can_match_locally() or not item_datas:
+            return True
+        return any(depends_on.matches(item_data) for item_data in item_datas)
+
+    def load(self, key, depends_on, loader):
+        """Return a cached result, computing and storing it on a miss.
+
+        Args:
+            key (Tuple): Cache key of the result.
+            depends_on (FilterManager): Filters selecting the items the result is computed from, or None if
+                it depends on every item.
+            loader (Callable[[], Any]): Computes the result from the database.
+
+        Returns:
+            Any: Cached or freshly computed result.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key][0]
+            self.misses += 1
+            generation = self.generation
+        value = loader()
+        with self.lock:
+            if generation == self.generation:
+                self.entries[key] = (value, depends_on)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def retrieve_groups_names(self, source=None):
+        """Cached DatabaseHandler.retrieve_groups_names.
+
+        Args:
+            source (DatabaseHandler, optional): Handler to read from on a miss, for example a pooled reader.
+                Defaults to the cached handler.
+
+        Returns:
+            List: List of tuples containing distinct group names.
+        """
+        source = source if source is not None else self.db_handler
+        return self.load(('groups_names',), None, source.retrieve_groups_names)
+
+    def retrieve_group_facets_with_filters(self, filter_manager: FilterManager, source=None):
+        """Cached DatabaseHandler.retrieve_group_facets_with_filters.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            source (DatabaseHandler, optional): Handler to read from on a miss. Defaults to the cached handler.
+
+        Returns:
+            Tuple[List[Tuple[str, int]], int]: (group_name, row_count) pairs and their total.
+        """
+        source = source if source is not None else self.db_handler
+        # Facets cover every group, so the group filters do not matter. The groups are listed by the in-stock
+        # filter alone, so a change outside the ranges can still alter them
+        depends_on = FilterManager(in_stock=filter_manager.in_stock, search_teste=filter_manager.search_taste)
+        query = FilterManager(in_stock=filter_manager.in_stock, search_teste=filter_manager.search_taste,
+                              ranges=filter_manager.ranges)
+        key = ('group_facets', filter_manager.in_stock, filter_manager.search_taste,
+               tuple(sorted(filter_manager.ranges.items())))
+        return self.load(key, depends_on, lambda: source.retrieve_group_facets_with_filters(query))
+
+    def retrieve_items_page(self, filter_manager: FilterManager, page_size: int, cursor: str = None, source=None):
+        """Cached DatabaseHandler.retrieve_items_page.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            page_size (int): Maximum number of rows to return.
+            cursor (str, optional): Cursor returned with the previous page. Defaults to None for the first page.
+            source (DatabaseHandler, optional): Handler to read from on a miss. Defaults to the cached handler.
+
+        Returns:
+            Tuple[List, str]: Rows of the page and the cursor of the next page, or None after the last page.
+        """
+        source = source if source is not None else self.db_handler
+        depends_on = filter_manager.copy()
+        key = ('items_keyset',) + tuple(filter_manager.to_tuple().values()) + (page_size, cursor)
+        return self.load(key, depends_on, lambda: source.retrieve_items_page(depends_on, page_size, cursor))
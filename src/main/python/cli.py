@@ -0,0 +1,292 @@
+"""Headless command line for bulk operations on the inventory database.
+
+The module never imports Qt, so it runs on machines without a display, for example from cron:
+
+    python cli.py --db database.db import items.csv
+    python cli.py query --group Fruit --in-stock > fruit.csv
+    python cli.py backup
+
+Exit codes: 0 on success, 1 on a database or file error or when summary --verify finds stale totals,
+2 on invalid arguments, 3 when an import rejected some rows.
+"""
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+from backup import ITEM_COLUMNS, IncrementalBackup, DatabaseSnapshot
+from database import DatabaseHandler
+from query import decode_cursor
+from services import FilterManager, CSVImporter, CSVExporter, RANGE_COLUMNS, SORT_COLUMNS
+from tracing import QueryTracer, format_report
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_PARTIAL = 3
+
+
+class StderrLog:
+    # Stands in for Logger, so progress reports go to stderr and stdout stays machine-readable
+    def add_log(self, log: str):
+        print(log, file=sys.stderr)
+
+
+def filter_manager_from_args(args):
+    """Build the filters given on the command line.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+
+    Returns:
+        FilterManager: Filters to apply, or None if no filter option was given.
+    """
+    ranges = {column: (getattr(args, f"min_{column}"), getattr(args, f"max_{column}")) for column in RANGE_COLUMNS}
+    ranges = {column: bounds for column, bounds in ranges.items() if bounds != (None, None)}
+    if args.group is None and args.search is None and not args.in_stock and not ranges and args.sort is None:
+        return None
+    return FilterManager(in_stock=args.in_stock, group_names=args.group, search_teste=args.search, ranges=ranges,
+                         sort=FilterManager.parse_sort(args.sort) if args.sort is not None else None)
+
+
+def validate_arguments(args):
+    """Build the filters and check the cursor given on the command line, before the database is opened.
+
+    The filters are stored as args.filter_manager for the commands taking them.
+
+    Args:
+        args (argparse.Namespace): Parsed arguments.
+
+    Raises:
+        ValueError: If a filter, sort order or cursor is invalid.
+    """
+    if hasattr(args, 'in_stock'):
+        args.filter_manager = filter_manager_from_args(args)
+    if getattr(args, 'cursor', None) is not None:
+        decode_cursor(args.cursor)
+
+
+def command_import(db_handler: DatabaseHandler, args) -> int:
+    log = StderrLog()
+    # Rows that could not be parsed never reach the database, but are rejected all the same
+    parse_errors = []
+
+    def read_item_datas():
+        for chunk in CSVImporter(args.file).iter_chunks(chunk_size=args.chunk_size):
+            for line_number, message in chunk.errors:
+                log.add_log(f"line {line_number}: {message}")
+            parse_errors.extend(chunk.errors)
+            yield from chunk.rows
+
+    result = db_handler.insert_item_datas(read_item_datas(), chunk_size=args.chunk_size,
+                                          logger=log if args.verbose else None)
+    for item_data, reason in result.rejected:
+        log.add_log(f"rejected {item_data.code}: {reason}")
+    rejected_count = result.rejected_count + len(parse_errors)
+    print(f"accepted {result.accepted}, rejected {rejected_count}")
+    return EXIT_PARTIAL if rejected_count else EXIT_OK
+
+
+def command_export(db_handler: DatabaseHandler, args) -> int:
+    filter_manager = args.filter_manager
+    exporter = CSVExporter(item_datas=db_handler.iter_item_rows(filter_manager),
+                           path_dir=args.dir,
+                           is_backup=args.backup)
+    exporter.export_to_file()
+    print(exporter.path_file)
+    return EXIT_OK
+
+
+def command_query(db_handler: DatabaseHandler, args) -> int:
+    filter_manager = args.filter_manager
+    csv_writer = csv.writer(sys.stdout, delimiter='\t' if args.format == 'tsv' else ',')
+    csv_writer.writerow(ITEM_COLUMNS)
+    if args.page_size is not None or args.cursor is not None:
+        # One page in (count DESC, id) order; the cursor printed on stderr continues with the next one
+        try:
+            rows, next_cursor = db_handler.retrieve_items_page(filter_manager or FilterManager(in_stock=False),
+                                                               args.page_size or 1000, args.cursor)
+        except ValueError as err:
+            # A cursor returned for other filters
+            print(f"error: {err}", file=sys.stderr)
+            return EXIT_USAGE
+        csv_writer.writerows(rows)
+        if next_cursor is not None:
+            print(f"next cursor: {next_cursor}", file=sys.stderr)
+        return EXIT_OK
+    for number, row in enumerate(db_handler.iter_item_rows(filter_manager), start=1):
+        csv_writer.writerow(row)
+        if number == args.limit:
+            break
+    return EXIT_OK
+
+
+def command_backup(db_handler: DatabaseHandler, args) -> int:
+    entry = IncrementalBackup(db_handler, directory=args.dir).run(force_full=args.full)
+    if entry is None:
+        print("nothing changed since the last backup")
+    else:
+        print(f"{entry['kind']} {entry['file']} ({entry['rows']} rows)")
+    return EXIT_OK
+
+
+def command_restore(db_handler: DatabaseHandler, args) -> int:
+    if not args.yes:
+        print("restore replaces every item; pass --yes to confirm", file=sys.stderr)
+        return EXIT_USAGE
+    entry = IncrementalBackup(db_handler, directory=args.dir).restore()
+    if entry is None:
+        print(f"no full backup in {args.dir}", file=sys.stderr)
+        return EXIT_FAILURE
+    print(f"restored up to {entry['file']}")
+    return EXIT_OK
+
+
+def command_snapshot(db_handler: DatabaseHandler, args) -> int:
+    print(DatabaseSnapshot(db_handler, directory=args.dir).run())
+    return EXIT_OK
+
+
+def command_summary(db_handler: DatabaseHandler, args) -> int:
+    if args.rebuild:
+        print(f"rebuilt the summary of {db_handler.rebuild_group_summary()} groups")
+        return EXIT_OK
+    if args.verify:
+        differences = db_handler.verify_group_summary()
+        for group_name, stored, actual in differences:
+            print(f"{group_name}: stored {stored}, actual {actual}", file=sys.stderr)
+        print(f"{len(differences)} groups differ" if differences else "summary is up to date")
+        return EXIT_FAILURE if differences else EXIT_OK
+    csv_writer = csv.writer(sys.stdout, delimiter='\t' if args.format == 'tsv' else ',')
+    csv_writer.writerow(['group_name', 'sku_count', 'in_stock_count', 'units', 'stock_value'])
+    csv_writer.writerows(db_handler.retrieve_group_summaries())
+    return EXIT_OK
+
+
+def command_trace_dump(args) -> int:
+    with open(args.file, encoding='utf-8') as file:
+        print(format_report(json.load(file), top=args.top))
+    return EXIT_OK
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--group", action="append", help="only items of this group; repeat for several groups")
+    parser.add_argument("--search", help="only items whose taste, group or code match this text")
+    parser.add_argument("--in-stock", action="store_true", help="only items with a positive count")
+    for column in RANGE_COLUMNS:
+        number = float if column == 'price' else int
+        parser.add_argument(f"--min-{column}", type=number, help=f"only items with at least this {column}")
+        parser.add_argument(f"--max-{column}", type=number, help=f"only items with at most this {column}")
+    parser.add_argument("--sort", help=f"sort order such as price:desc,count; columns: {', '.join(SORT_COLUMNS)} "
+                                       f"(default: count:desc)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser with one sub-command per operation.
+
+    Returns:
+        argparse.ArgumentParser: Parser of the command line.
+    """
+    parser = argparse.ArgumentParser(prog="cli.py", description="Bulk operations on the inventory database.")
+    parser.add_argument("--db", default="database.db", help="database file (default: %(default)s)")
+    parser.add_argument("--trace", action="store_true", help="time every query and print a report on stderr")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="import items from a CSV file")
+    import_parser.add_argument("file", help="CSV file to import")
+    import_parser.add_argument("--chunk-size", type=int, default=1000, help="rows per chunk (default: %(default)s)")
+    import_parser.add_argument("--verbose", action="store_true", help="report every chunk on stderr")
+    import_parser.set_defaults(handler=command_import)
+
+    export_parser = commands.add_parser("export", help="export items to a CSV file and print its path")
+    export_parser.add_argument("--dir", default=".", help="directory of the file (default: %(default)s)")
+    export_parser.add_argument("--backup", action="store_true", help="write the file to the backup directory")
+    add_filter_arguments(export_parser)
+    export_parser.set_defaults(handler=command_export)
+
+    query_parser = commands.add_parser("query", help="stream items to stdout")
+    query_parser.add_argument("--format", choices=("csv", "tsv"), default="csv", help="output format")
+    query_parser.add_argument("--limit", type=int, help="stop after this many items")
+    query_parser.add_argument("--page-size", type=int, help="print one page of this many items (default: 1000 "
+                                                            "with --cursor)")
+    query_parser.add_argument("--cursor", help="continue after the page that printed this cursor")
+    add_filter_arguments(query_parser)
+    query_parser.set_defaults(handler=command_query)
+
+    backup_parser = commands.add_parser("backup", help="take an incremental CSV backup")
+    backup_parser.add_argument("--dir", default="backup", help="backup directory (default: %(default)s)")
+    backup_parser.add_argument("--full", action="store_true", help="take a full backup even if a delta would do")
+    backup_parser.set_defaults(handler=command_backup)
+
+    restore_parser = commands.add_parser("restore", help="restore the items from the latest backup chain")
+    restore_parser.add_argument("--dir", default="backup", help="backup directory (default: %(default)s)")
+    restore_parser.add_argument("--yes", action="store_true", help="confirm that every item is replaced")
+    restore_parser.set_defaults(handler=command_restore)
+
+    snapshot_parser = commands.add_parser("snapshot", help="copy the database into a snapshot file")
+    snapshot_parser.add_argument("--dir", default="backup", help="snapshot directory (default: %(default)s)")
+    snapshot_parser.set_defaults(handler=command_snapshot)
+
+    summary_parser = commands.add_parser("summary", help="print the stock totals of every group")
+    summary_parser.add_argument("--format", choices=("csv", "tsv"), default="csv", help="output format")
+    summary_action = summary_parser.add_mutually_exclusive_group()
+    summary_action.add_argument("--verify", action="store_true",
+                                help="compare the totals with the items; exit code 1 if they differ")
+    summary_action.add_argument("--rebuild", action="store_true", help="recompute the totals from the items")
+    summary_parser.set_defaults(handler=command_summary)
+
+    trace_dump_parser = commands.add_parser("trace-dump", help="show a query trace saved by the application")
+    trace_dump_parser.add_argument("file", help="JSON file written with TRACE_QUERIES=1")
+    trace_dump_parser.add_argument("--top", type=int, help="number of statements and methods shown")
+    trace_dump_parser.set_defaults(handler=command_trace_dump, database=False)
+    return parser
+
+
+def main(argv=None) -> int:
+    """Run one command.
+
+    Args:
+        argv (List[str], optional): Command line arguments. Defaults to sys.argv[1:].
+
+    Returns:
+        int: Exit code.
+    """
+    args = build_parser().parse_args(argv)
+    try:
+        validate_arguments(args)
+    except ValueError as err:
+        print(f"error: {err}", file=sys.stderr)
+        return EXIT_USAGE
+    if not getattr(args, 'database', True):
+        try:
+            return args.handler(args)
+        except (OSError, ValueError) as err:
+            print(f"error: {err}", file=sys.stderr)
+            return EXIT_FAILURE
+    db_handler = DatabaseHandler(args.db)
+    tracer = None
+    try:
+        db_handler.connect()
+        if args.trace:
+            tracer = QueryTracer(logger=StderrLog())
+            tracer.install(db_handler)
+        db_handler.create_tables()
+        return args.handler(db_handler, args)
+    except BrokenPipeError:
+        # The reader of stdout went away, for example `| head`; the rest of the output is discarded
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return EXIT_OK
+    except (sqlite3.Error, OSError, ValueError, RuntimeError) as err:
+        print(f"error: {err}", file=sys.stderr)
+        return EXIT_FAILURE
+    finally:
+        if tracer is not None:
+            print(format_report(tracer.snapshot()), file=sys.stderr)
+        if db_handler.conn is not None:
+            db_handler.close_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,178 @@
+import queue
 import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
 
-from services import ItemData, FilterManager
+from migrations import migrate, has_search_index, GROUP_SUMMARY_QUERY
+from query import QueryCompiler, encode_cursor, decode_cursor
+from services import ItemData, FilterManager, ImportResult, ChangeEvent, SORT_COLUMNS
+from setting import Settings
 
 
 class DatabaseHandler:
-    def __init__(self, db_name):
+    def __init__(self, db_name, settings: Settings = None):
         """Initialize a DatabaseHandler instance.
 
         Args:
             db_name (str): Name of the SQLite database.
+            settings (Settings, optional): Connection settings. Defaults to Settings().
         """
         self.db_name = db_name
+        self.settings = settings if settings is not None else Settings()
         self.conn = None
         self.cursor = None
+        self.query_compiler = QueryCompiler()
+        self.change_listeners = []
+        self.read_pool = queue.Queue()
+        self.read_connections = 0
+        self.read_pool_lock = threading.Lock()
+        self.tracer = None
 
     def connect(self):
-        """Connect to the SQLite database."""
-        self.conn = sqlite3.connect(self.db_name)
+        """Connect to the SQLite database.
+
+        This connection is the only writer. It is tuned with the journal mode, synchronous level, cache,
+        memory map and busy timeout from the settings.
+        """
+        self.conn = sqlite3.connect(self.db_name, timeout=self.settings.db_busy_timeout_ms / 1000)
+        self.configure_connection(self.conn)
+        self.conn.execute(f"PRAGMA journal_mode = {self.settings.db_journal_mode};")
+        self.conn.execute(f"PRAGMA synchronous = {self.settings.db_synchronous};")
         self.cursor = self.conn.cursor()
 
-    def create_tables(self):
-        """Create necessary tables if they don't exist."""
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS items (
-            id INTEGER PRIMARY KEY,
-            group_name TEXT,
-            taste TEXT,
-            nicotine INTEGER,
-            volume INTEGER,
-            price REAL,
-            code TEXT UNIQUE,
-            count INTEGER
-        );
-        """
-
-        self.cursor.execute(create_table_query)
+    def configure_connection(self, conn: sqlite3.Connection):
+        """Apply the per-connection PRAGMAs shared by the writer and the readers.
 
-        self.conn.commit()
+        Args:
+            conn (sqlite3.Connection): Connection to be configured.
+        """
+        conn.execute(f"PRAGMA cache_size = -{int(self.settings.db_cache_size_kib)};")
+        conn.execute(f"PRAGMA mmap_size = {int(self.settings.db_mmap_size)};")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.settings.db_busy_timeout_ms)};")
+
+    def is_in_memory(self) -> bool:
+        """Check whether the database lives only in memory and cannot be opened twice.
+
+        Returns:
+            bool: True for in-memory databases, False otherwise.
+        """
+        return self.db_name == ":memory:" or str(self.db_name).startswith("file::memory:")
+
+    def open_read_connection(self) -> sqlite3.Connection:
+        """Open a read-only connection to the database for the read pool.
+
+        Returns:
+            sqlite3.Connection: Read-only connection that may be used from any thread, one at a time.
+        """
+        uri = f"{Path(self.db_name).resolve().as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=self.settings.db_busy_timeout_ms / 1000,
+                               check_same_thread=False)
+        self.configure_connection(conn)
+        conn.execute("PRAGMA query_only = 1;")
+        return conn
+
+    def acquire_read_connection(self) -> sqlite3.Connection:
+        """Take a connection from the read pool, opening one while the pool is below its size.
+
+        Blocks until a connection is returned when all of them are in use.
+
+        Returns:
+            sqlite3.Connection: Read-only connection.
+        """
+        try:
+            return self.read_pool.get_nowait()
+        except queue.Empty:
+            pass
+        with self.read_pool_lock:
+            if self.read_connections < self.settings.db_read_connections:
+                self.read_connections += 1
+                try:
+                    return self.open_read_connection()
+                except Exception:
+                    self.read_connections -= 1
+                    raise
+        return self.read_pool.get()
+
+    def release_read_connection(self, conn: sqlite3.Connection):
+        """Return a connection taken with acquire_read_connection to the read pool.
+
+        Args:
+            conn (sqlite3.Connection): Read-only connection.
+        """
+        if conn.in_transaction:
+            conn.rollback()
+        self.read_pool.put(conn)
+
+    @contextmanager
+    def reader(self):
+        """Borrow a read-only handler backed by a pooled connection, for use from a background thread.
+
+        Yields:
+            DatabaseHandler: Handler whose queries run on the borrowed connection.
+        """
+        if self.is_in_memory():
+            raise ValueError("An in-memory database cannot be shared with read connections")
+        handler = DatabaseHandler(self.db_name, self.settings)
+        handler.query_compiler = self.query_compiler
+        handler.conn = self.acquire_read_connection()
+        handler.cursor = handler.conn.cursor()
+        if self.tracer is not None:
+            self.tracer.install(handler)
+        try:
+            yield handler
+        finally:
+            handler.cursor.close()
+            self.release_read_connection(handler.conn)
+
+    def interrupt(self):
+        """Abort the query currently running on this connection. Safe to call from any thread."""
+        if self.conn:
+            self.conn.interrupt()
+
+    def add_change_listener(self, listener):
+        """Register a callback called with a ChangeEvent after every committed mutation.
+
+        Args:
+            listener (Callable[[ChangeEvent], None]): Callback to be registered.
+        """
+        self.change_listeners.append(listener)
+
+    def remove_change_listener(self, listener):
+        """Unregister a callback added with add_change_listener.
+
+        Args:
+            listener (Callable[[ChangeEvent], None]): Callback to be removed.
+        """
+        if listener in self.change_listeners:
+            self.change_listeners.remove(listener)
+
+    def emit_change(self, event: ChangeEvent):
+        """Send a ChangeEvent to every registered listener.
+
+        Args:
+            event (ChangeEvent): Event to be sent.
+        """
+        for listener in list(self.change_listeners):
+            listener(event)
+
+    def retrieve_item_data_by_id(self, row_id):
+        """Retrieve one item from the 'items' table by its ID.
+
+        Args:
+            row_id (int): ID of the item.
+
+        Returns:
+            ItemData: Item data, or None if there is no such item.
+        """
+        self.cursor.execute("SELECT * FROM items WHERE id = ?;", (row_id,))
+        row = self.cursor.fetchone()
+        return ItemData.from_row(row) if row is not None else None
+
+    def create_tables(self):
+        """Create necessary tables if they don't exist and apply pending schema migrations."""
+        migrate(self.conn)
+        self.query_compiler.full_text_search = has_search_index(self.conn)
 
     def insert_data_to_items(self, group_name: str, taste: str, nicotine: int, volume: int, price: int, code: str, count: int):
         """Insert data into the 'items' table.
@@ -57,6 +193,7 @@ class DatabaseHandler:
         values = (group_name, taste, nicotine, volume, price, code, count)
         self.cursor.execute(insert_query, values)
         self.conn.commit()
+        self.emit_inserted(self.cursor.lastrowid)
 
     def insert_item_data(self, data: ItemData):
         """Insert item data into the 'items' table.
@@ -71,6 +208,108 @@ class DatabaseHandler:
         values = (data.group_name, data.taste, data.nicotine, data.volume, data.price, str(data.code), data.count)
         self.cursor.execute(insert_query, values)
         self.conn.commit()
+        self.emit_inserted(self.cursor.lastrowid)
+
+    def emit_inserted(self, row_id):
+        """Send an INSERTED event for a newly inserted item.
+
+        Args:
+            row_id (int): ID of the inserted item.
+        """
+        if self.change_listeners:
+            self.emit_change(ChangeEvent(ChangeEvent.INSERTED, row_id, self.retrieve_item_data_by_id(row_id)))
+
+    def insert_item_datas(self, item_datas, chunk_size: int = 1000, logger=None) -> ImportResult:
+        """Insert many items into the 'items' table inside a single transaction.
+
+        Rows are written in chunks with executemany, each chunk guarded by a SAVEPOINT nested in the
+        import's transaction. When a chunk fails (for example because of a duplicate code) it is rolled
+        back to its savepoint and retried row by row so that only the offending rows are rejected. If
+        reading item_datas raises, nothing is imported.
+
+        Args:
+            item_datas (Iterable[ItemData]): Item data to be inserted.
+            chunk_size (int, optional): Number of rows per chunk. Defaults to 1000.
+            logger (Logger, optional): Logger receiving one summary entry per chunk. Defaults to None.
+
+        Returns:
+            ImportResult: Number of accepted rows and the rejected rows with reasons.
+        """
+        result = ImportResult()
+        chunk = []
+        chunk_number = 0
+        # Outside a transaction RELEASE would commit each chunk on its own
+        self.cursor.execute("BEGIN;")
+        try:
+            for item_data in item_datas:
+                chunk.append(item_data)
+                if len(chunk) >= chunk_size:
+                    chunk_number += 1
+                    self._insert_chunk(chunk, chunk_number, result, logger)
+                    chunk = []
+            if chunk:
+                chunk_number += 1
+                self._insert_chunk(chunk, chunk_number, result, logger)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        if result.accepted:
+            self.emit_change(ChangeEvent(ChangeEvent.RELOADED))
+        return result
+
+    def _insert_chunk(self, chunk, chunk_number: int, result: ImportResult, logger=None):
+        """Insert one chunk of items guarded by a SAVEPOINT.
+
+        Args:
+            chunk (List[ItemData]): Item data to be inserted.
+            chunk_number (int): Sequence number of the chunk, used in the log entry.
+            result (ImportResult): Result collecting accepted and rejected rows.
+            logger (Logger, optional): Logger receiving the chunk summary. Defaults to None.
+        """
+        insert_query = """
+        INSERT INTO items (group_name, taste, nicotine, volume, price, code, count)
+        VALUES (?, ?, ?, ?, ?, ?, ?);
+        """
+        rejected_before = result.rejected_count
+        valid = []
+        for data in chunk:
+            if data.isValid():
+                valid.append(data)
+            else:
+                result.reject(data, "missing fields")
+
+        self.cursor.execute("SAVEPOINT import_chunk;")
+        try:
+            self.cursor.executemany(insert_query, [self._item_data_values(data) for data in valid])
+            result.accepted += len(valid)
+        except sqlite3.Error:
+            self.cursor.execute("ROLLBACK TO import_chunk;")
+            for data in valid:
+                try:
+                    self.cursor.execute(insert_query, self._item_data_values(data))
+                    result.accepted += 1
+                except sqlite3.Error as err:
+                    result.reject(data, str(err))
+        self.cursor.execute("RELEASE import_chunk;")
+
+        if logger is not None:
+            rejected = result.rejected[rejected_before:]
+            reasons = "; ".join(f"{data.code}: {reason}" for data, reason in rejected)
+            logger.add_log(f"IMPORT CHUNK #{chunk_number}: accepted {len(chunk) - len(rejected)}, "
+                           f"rejected {len(rejected)}{(' (' + reasons + ')') if reasons else ''}")
+
+    @staticmethod
+    def _item_data_values(data: ItemData):
+        """Return the insert parameters for an item.
+
+        Args:
+            data (ItemData): Item data to be converted.
+
+        Returns:
+            Tuple: Values in the column order of the insert queries.
+        """
+        return data.group_name, data.taste, data.nicotine, data.volume, data.price, str(data.code), data.count
 
     def update_item_data(self, data: ItemData):
         """Update item data in the 'items' table.
@@ -82,8 +321,20 @@ class DatabaseHandler:
                        "SET group_name = ?, taste = ?, nicotine = ?, volume = ?, price = ?, code = ?, count = ? " \
                        "WHERE id = ?;"
         values = (data.group_name, data.taste, data.nicotine, data.volume, data.price, data.code, data.count, data.id_)
+        previous = self.retrieve_item_data_by_id(data.id_) if self.change_listeners else None
         self.cursor.execute(update_query, values)
         self.conn.commit()
+        self.emit_updated(data.id_, previous)
+
+    def emit_updated(self, row_id, previous):
+        """Send an UPDATED event for an updated item.
+
+        Args:
+            row_id (int): ID of the updated item.
+            previous (ItemData): Item before the update.
+        """
+        if self.change_listeners:
+            self.emit_change(ChangeEvent(ChangeEvent.UPDATED, row_id, self.retrieve_item_data_by_id(row_id), previous))
 
     def delete_data_from_items(self, row_id):
         """Delete item data from the 'items' table.
@@ -92,8 +343,11 @@ class DatabaseHandler:
             row_id (int): ID of the item data to be deleted.
         """
         delete_query = "DELETE FROM items WHERE id = ?;"
+        previous = self.retrieve_item_data_by_id(row_id) if self.change_listeners else None
         self.cursor.execute(delete_query, (row_id,))
         self.conn.commit()
+        if self.change_listeners:
+            self.emit_change(ChangeEvent(ChangeEvent.DELETED, row_id, previous=previous))
 
     def retrieve_data_from_items(self):
         """Retrieve all item data from the 'items' table.
@@ -126,11 +380,8 @@ class DatabaseHandler:
         Returns:
             List: List of tuples containing distinct group names.
         """
-        retrieve_query = f"""SELECT DISTINCT group_name 
-        FROM items 
-        WHERE count {'>' if filter_manager.in_stock else '>='} 0  {("AND group_name = '" + filter_manager.group_name + "'") if filter_manager.group_name is not None else ''}
-        ORDER BY count DESC;"""
-        self.cursor.execute(retrieve_query)
+        retrieve_query, values = self.query_compiler.compile_group_names(filter_manager)
+        self.cursor.execute(retrieve_query, values)
         rows = self.cursor.fetchall()
         return rows
 
@@ -144,16 +395,98 @@ class DatabaseHandler:
                 Returns:
                     int: Number of items in the specified group based on filters.
                 """
-        retrieve_query = f"""SELECT COUNT(*) AS row_count 
-                FROM items 
-                WHERE count {'>' if filter_manager.in_stock else '>='} 0  
-{("AND group_name = '" + group_name + "'") if group_name is not None else ''}
-{("AND LOWER(taste) LIKE '%" + filter_manager.search_taste + "%'") if filter_manager.search_taste is not None else ''} 
-"""
-        self.cursor.execute(retrieve_query)
+        retrieve_query, values = self.query_compiler.compile_count(group_name, filter_manager)
+        self.cursor.execute(retrieve_query, values)
         rows = self.cursor.fetchall()
         return rows[0][0]
 
+    def retrieve_group_facets_with_filters(self, filter_manager: FilterManager):
+        """Retrieve every group with its number of items based on filters in a single query.
+
+        Groups are listed according to the in-stock filter, while their counts also honour the taste
+        search, matching what the group ComboBox used to show with one query per group.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Tuple[List[Tuple[str, int]], int]: List of (group_name, row_count) pairs and the grand total.
+        """
+        retrieve_query, values = self.query_compiler.compile_group_facets(filter_manager)
+        self.cursor.execute(retrieve_query, values)
+        facets = self.cursor.fetchall()
+        return facets, sum(row_count for _, row_count in facets)
+
+    def retrieve_group_summaries(self):
+        """Retrieve the stock totals of every group from the summary table kept up to date by triggers.
+
+        Reads one row per group instead of scanning the items.
+
+        Returns:
+            List[Tuple[str, int, int, int, float]]: (group_name, sku_count, in_stock_count, units, stock_value)
+            per group, ordered by stock value, highest first.
+        """
+        self.cursor.execute("""
+        SELECT group_name, sku_count, in_stock_count, units, stock_value_cents / 100.0
+            FROM group_summary
+            ORDER BY stock_value_cents DESC, group_name;
+        """)
+        return self.cursor.fetchall()
+
+    def retrieve_inventory_totals(self):
+        """Retrieve the stock totals of the whole inventory from the summary table.
+
+        Returns:
+            Tuple[int, int, int, int, float]: Number of groups, sku_count, in_stock_count, units and stock_value.
+        """
+        self.cursor.execute("""
+        SELECT COUNT(*), COALESCE(SUM(sku_count), 0), COALESCE(SUM(in_stock_count), 0), COALESCE(SUM(units), 0),
+               COALESCE(SUM(stock_value_cents), 0) / 100.0
+            FROM group_summary;
+        """)
+        return self.cursor.fetchone()
+
+    def verify_group_summary(self):
+        """Compare the summary table with totals computed from the items.
+
+        Returns:
+            List[Tuple[str, Tuple, Tuple]]: (group_name, stored, actual) for every group whose totals differ,
+            stored or actual being None for a group missing on that side, and (group_name, stored, None) for
+            every extra row of a group stored more than once. Empty if the table is correct.
+        """
+        self.cursor.execute("SELECT group_name, sku_count, in_stock_count, units, stock_value_cents FROM group_summary;")
+        stored = {}
+        differences = []
+        for row in self.cursor.fetchall():
+            if row[0] in stored:
+                # A group summarised twice is drift even if one of its rows is right
+                differences.append((row[0], row[1:], None))
+            else:
+                stored[row[0]] = row[1:]
+        self.cursor.execute(GROUP_SUMMARY_QUERY)
+        actual = {row[0]: row[1:] for row in self.cursor.fetchall()}
+        differences += [(group_name, stored.get(group_name), actual.get(group_name))
+                        for group_name in stored.keys() | actual.keys()
+                        if stored.get(group_name) != actual.get(group_name)]
+        return sorted(differences, key=lambda difference: str(difference[0]))
+
+    def rebuild_group_summary(self) -> int:
+        """Recompute the summary table from the items, in one transaction.
+
+        Returns:
+            int: Number of groups in the rebuilt table.
+        """
+        try:
+            self.cursor.execute("DELETE FROM group_summary;")
+            self.cursor.execute(f"INSERT INTO group_summary (group_name, sku_count, in_stock_count, units, "
+                                f"stock_value_cents) {GROUP_SUMMARY_QUERY};")
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        self.cursor.execute("SELECT COUNT(*) FROM group_summary;")
+        return self.cursor.fetchone()[0]
+
     def update_item_count_value(self, _id: int, new_value: int):
         """Update the count of an item in the 'items' table.
 
@@ -162,8 +495,96 @@ class DatabaseHandler:
             new_value (int): New count value.
         """
         update_query = "UPDATE items SET count = ? WHERE id = ?;"
+        previous = self.retrieve_item_data_by_id(_id) if self.change_listeners else None
         self.cursor.execute(update_query, (new_value, _id))
         self.conn.commit()
+        self.emit_updated(_id, previous)
+
+    def retrieve_item_data_by_code(self, code: str):
+        """Retrieve one item from the 'items' table by its code, through the UNIQUE index on code.
+
+        Args:
+            code (str): Code of the item, for example a scanned barcode.
+
+        Returns:
+            ItemData: Item data, or None if there is no such item.
+        """
+        self.cursor.execute("SELECT * FROM items WHERE code = ?;", (code,))
+        row = self.cursor.fetchone()
+        return ItemData.from_row(row) if row is not None else None
+
+    def adjust_count(self, _id: int, delta: int):
+        """Add a delta to the count of an item, in one atomic statement.
+
+        Unlike update_item_count_value the new count is computed by SQLite, so concurrent changes made
+        through other connections are not overwritten. A delta that would make the count negative is
+        not applied.
+
+        Args:
+            _id (int): ID of the item.
+            delta (int): Number of units to add, negative to take units away.
+
+        Returns:
+            ItemData: Item after the change, or None if there is no such item or not enough stock.
+        """
+        return self.apply_stock_movements([(_id, delta)])[0]
+
+    def adjust_count_by_code(self, code: str, delta: int):
+        """Add a delta to the count of the item with a code, in one atomic statement.
+
+        The item is found through the UNIQUE index on code and the new row is returned by the UPDATE
+        itself, so a scan costs a single statement and a commit. A delta that would make the count
+        negative is not applied.
+
+        Args:
+            code (str): Code of the item, for example a scanned barcode.
+            delta (int): Number of units to add, negative for a sale.
+
+        Returns:
+            ItemData: Item after the change, or None if there is no such item or not enough stock.
+        """
+        return self._apply_deltas("code", [(code, delta)])[0]
+
+    def apply_stock_movements(self, movements):
+        """Apply many count deltas in a single transaction.
+
+        Each delta is guarded on its own: one that would make a count negative is skipped while the
+        others are applied. Deltas of the same item are applied in order.
+
+        Args:
+            movements (Iterable[Tuple[int, int]]): (item ID, delta) pairs.
+
+        Returns:
+            List[ItemData]: For every movement, the item after it was applied, or None if it was not.
+        """
+        return self._apply_deltas("id", movements)
+
+    def _apply_deltas(self, column, movements):
+        update_query = f"""
+            UPDATE items SET count = count + ?
+            WHERE {column} = ? AND count + ? >= 0
+            RETURNING *;
+        """
+        results = []
+        applied = []
+        try:
+            # sqlite3 opens the transaction before the first UPDATE and keeps it until the commit
+            for key, delta in movements:
+                self.cursor.execute(update_query, (delta, key, delta))
+                row = self.cursor.fetchone()
+                results.append(ItemData.from_row(row) if row is not None else None)
+                if row is not None:
+                    applied.append((row, delta))
+            self.conn.commit()
+        except sqlite3.Error:
+            self.conn.rollback()
+            raise
+        if self.change_listeners:
+            for row, delta in applied:
+                # The state before the movement follows from the returned row
+                previous = ItemData.from_row(row[:7] + (row[7] - delta,))
+                self.emit_change(ChangeEvent(ChangeEvent.UPDATED, row[0], ItemData.from_row(row), previous))
+        return results
 
     def retrieve_data_from_items_with_group_name(self):
         """Retrieve all item data from the 'items' table for a specific group.
@@ -223,50 +644,178 @@ class DatabaseHandler:
             filter_manager (FilterManager): FilterManager instance containing filter settings.
 
         Returns:
-            List: List of tuples containing item data based on filters.
+            List: List of tuples containing item data based on filters. Searches answered through the
+            FTS5 index are ordered by relevance first.
         """
-        retrieve_query = f"""
-        SELECT *
-            FROM items
-            WHERE count {'>' if filter_manager.in_stock else '>='} 0  
-{("AND group_name = '" + filter_manager.group_name + "'") if filter_manager.group_name is not None else ''}
-{("AND LOWER(taste) LIKE '%" + filter_manager.search_taste + "%'") if filter_manager.search_taste is not None else ''}  
-            ORDER BY count DESC;
+        retrieve_query, values = self.query_compiler.compile_items(filter_manager)
+        self.cursor.execute(retrieve_query, values)
+        rows = self.cursor.fetchall()
+        return rows
+
+    def retrieve_items_page_where_filter_manager(self, filter_manager: FilterManager, limit: int, offset: int = 0):
+        """Retrieve one page of item data from the 'items' table based on filter settings.
+
+        Skipping rows with OFFSET makes deep pages cost as much as every page before them; callers page
+        with retrieve_items_page. This method stays as the offset baseline of benchmark/suite.py.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            limit (int): Maximum number of rows to return.
+            offset (int, optional): Number of rows to skip. Defaults to 0.
+
+        Returns:
+            List: List of tuples containing item data based on filters, in the same order as
+            retrieve_items_where_filter_manager.
         """
-        self.cursor.execute(retrieve_query)
+        retrieve_query, values = self.query_compiler.compile_items(filter_manager, paged=True)
+        self.cursor.execute(retrieve_query, values + (limit, offset))
         rows = self.cursor.fetchall()
         return rows
 
+    def retrieve_items_page(self, filter_manager: FilterManager, page_size: int, cursor: str = None):
+        """Retrieve one page of item data in the sort order of the filters, continuing from a cursor.
+
+        Each page seeks to the row after the previous one, so page N costs the same as page 1. Searches
+        answered through the FTS5 index without an explicit sort are ordered by relevance, which has no key
+        to seek on; their cursor holds an offset instead.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            page_size (int): Maximum number of rows to return.
+            cursor (str, optional): Cursor returned with the previous page. Defaults to None for the first page.
+
+        Returns:
+            Tuple[List, str]: Rows of the page and the cursor of the next page, or None after the last page.
+
+        Raises:
+            ValueError: If the cursor is invalid or was returned for a different kind of query.
+        """
+        position = decode_cursor(cursor) if cursor is not None else None
+        order = filter_manager.sort_order()
+        by_relevance = self.query_compiler.search_mode(filter_manager.search_taste) == 'fts' and not filter_manager.sort
+        if by_relevance:
+            if position is not None and (position[0] != 'offset' or len(position) != 2):
+                raise ValueError(f"Cursor does not belong to this query: {cursor!r}")
+            offset = position[1] if position is not None else 0
+            retrieve_query, values = self.query_compiler.compile_items(filter_manager, paged=True)
+            self.cursor.execute(retrieve_query, values + (page_size + 1, offset))
+            rows = self.cursor.fetchall()
+            next_position = ['offset', offset + page_size]
+        else:
+            if position is not None and (position[0] != 'key' or len(position) != len(order) + 1):
+                raise ValueError(f"Cursor does not belong to this query: {cursor!r}")
+            after = position[1:] if position is not None else None
+            # The first page is one query; later pages go from the rows tied with the last row on the most
+            # sort columns to the rows beyond it on the first one, until the page is full
+            parts = [(None, 'value')] if after is None else self.query_compiler.keyset_parts(filter_manager, after)
+            rows = []
+            for tied, beyond in parts:
+                retrieve_query, values = self.query_compiler.compile_items_keyset(
+                    filter_manager, page_size + 1 - len(rows), after, tied, beyond)
+                self.cursor.execute(retrieve_query, values)
+                rows += self.cursor.fetchall()
+                if len(rows) > page_size:
+                    break
+            next_position = None
+            if len(rows) > page_size:
+                next_position = ['key'] + [rows[page_size - 1][SORT_COLUMNS.index(column)] for column, _ in order]
+        # One row more than asked for tells whether another page follows
+        if len(rows) <= page_size:
+            return rows, None
+        return rows[:page_size], encode_cursor(next_position)
+
     def retrieve_all_item_data(self):
-        retrieve_query = "SELECT * FROM items ORDER BY id ASC"
-        self.cursor.execute(retrieve_query)
-        rows = self.cursor.fetchall()
-        item_datas = []
-        for row in rows:
-            item_datas.append(ItemData(id_=row[0],
-                                       group_name=row[1],
-                                       taste=row[2],
-                                       nicotine=row[3],
-                                       volume=row[4],
-                                       price=row[5],
-                                       code=row[6],
-                                       count=row[7],
-                                       ))
-        return item_datas
+        """Retrieve every item from the 'items' table ordered by id.
+
+        Returns:
+            List[ItemData]: Item data of every item.
+        """
+        return list(self.iter_item_data())
 
     def retrieve_item_data_with_filters(self, filter_manager: FilterManager):
-        item_datas = []
-        for row in self.retrieve_items_where_filter_manager(filter_manager=filter_manager):
-            item_datas.append(ItemData(id_=row[0],
-                                       group_name=row[1],
-                                       taste=row[2],
-                                       nicotine=row[3],
-                                       volume=row[4],
-                                       price=row[5],
-                                       code=row[6],
-                                       count=row[7],
-                                       ))
-        return item_datas
+        """Retrieve the items matching the filters.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            List[ItemData]: Item data in the same order as retrieve_items_where_filter_manager.
+        """
+        return list(self.iter_item_data(filter_manager))
+
+    def iter_item_rows(self, filter_manager: FilterManager = None, batch_size: int = 1000):
+        """Stream item rows from the 'items' table without materialising the whole result.
+
+        Rows are read with fetchmany on a dedicated cursor, so the handler's shared cursor stays usable.
+
+        Args:
+            filter_manager (FilterManager, optional): Filters to apply, or None for every item ordered by id.
+                Defaults to None.
+            batch_size (int, optional): Number of rows fetched at a time. Defaults to 1000.
+
+        Yields:
+            Tuple: Item row in the column order of the 'items' table.
+        """
+        yield from self._iter_items(filter_manager, batch_size, row_factory=None)
+
+    def iter_item_data(self, filter_manager: FilterManager = None, batch_size: int = 1000):
+        """Stream items as ItemData instances, built by the cursor's row factory.
+
+        The lazy counterpart of retrieve_all_item_data and retrieve_item_data_with_filters.
+
+        Args:
+            filter_manager (FilterManager, optional): Filters to apply, or None for every item ordered by id.
+                Defaults to None.
+            batch_size (int, optional): Number of rows fetched at a time. Defaults to 1000.
+
+        Yields:
+            ItemData: Item data of each row.
+        """
+        yield from self._iter_items(filter_manager, batch_size, row_factory=self.item_data_factory)
+
+    def _iter_items(self, filter_manager, batch_size, row_factory):
+        if filter_manager is None:
+            retrieve_query, values = "SELECT * FROM items ORDER BY id ASC;", ()
+        else:
+            retrieve_query, values = self.query_compiler.compile_items(filter_manager)
+        cursor = self.conn.cursor()
+        cursor.row_factory = row_factory
+        try:
+            cursor.execute(retrieve_query, values)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def item_data_factory(cursor, row):
+        """Row factory building ItemData instances from 'items' rows.
+
+        Args:
+            cursor (sqlite3.Cursor): Cursor the row was read from.
+            row (Tuple): Item row in the column order of the 'items' table.
+
+        Returns:
+            ItemData: Item data of the row.
+        """
+        return ItemData.from_row(row)
+
+    def count_items(self, filter_manager: FilterManager = None) -> int:
+        """Count the items iter_item_rows would return.
+
+        Args:
+            filter_manager (FilterManager, optional): Filters to apply, or None for every item. Defaults to None.
+
+        Returns:
+            int: Number of items.
+        """
+        if filter_manager is None:
+            self.cursor.execute("SELECT COUNT(*) FROM items;")
+            return self.cursor.fetchone()[0]
+        return self.retrieve_count_in_group_with_filters(filter_manager.group_name, filter_manager)
 
     def count_rows_from_items_where_group_name(self, group_name):
         """Count rows from the 'items' table for a specific group.
@@ -286,7 +835,109 @@ class DatabaseHandler:
         count = self.cursor.fetchall()
         return count
 
+    @contextmanager
+    def read_transaction(self):
+        """Run the enclosed queries against one consistent snapshot of the database."""
+        self.cursor.execute("BEGIN;")
+        try:
+            yield self
+        finally:
+            self.cursor.execute("COMMIT;")
+
+    def retrieve_last_change_seq(self) -> int:
+        """Retrieve the sequence number of the latest entry of the change journal.
+
+        Returns:
+            int: Latest sequence number, or 0 if nothing was ever journaled.
+        """
+        self.cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'items_changes';")
+        row = self.cursor.fetchone()
+        return row[0] if row is not None else 0
+
+    def iter_changes_since(self, seq: int, batch_size: int = 1000):
+        """Stream the final state of every item changed after a journal sequence number.
+
+        Args:
+            seq (int): Sequence number already covered by a previous backup.
+            batch_size (int, optional): Number of rows fetched at a time. Defaults to 1000.
+
+        Yields:
+            Tuple: Item row in the column order of the 'items' table for items that still exist, or a
+            row holding only the id followed by None values for deleted items.
+        """
+        retrieve_query = """
+        SELECT changes.item_id, items.group_name, items.taste, items.nicotine, items.volume,
+               items.price, items.code, items.count, items.id IS NULL AS deleted
+            FROM (SELECT DISTINCT item_id FROM items_changes WHERE seq > ?) AS changes
+            LEFT JOIN items ON items.id = changes.item_id
+            ORDER BY changes.item_id;
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(retrieve_query, (seq,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def prune_changes(self, seq: int):
+        """Delete change journal entries already covered by a full backup.
+
+        Args:
+            seq (int): Sequence number covered by the full backup.
+        """
+        self.cursor.execute("DELETE FROM items_changes WHERE seq <= ?;", (seq,))
+        self.conn.commit()
+
+    def restore_items(self, base_rows, deltas):
+        """Replace every item with a full backup followed by its deltas, in one transaction.
+
+        The restored state is the state the backups were taken at, so the change journal is cleared and
+        later deltas continue from it.
+
+        Args:
+            base_rows (Iterable[Tuple]): Item rows of the full backup, in the column order of the 'items' table.
+            deltas (Iterable[Iterable[Tuple[bool, Tuple]]]): For each delta, (deleted, row) pairs.
+        """
+        insert_query = """
+        INSERT INTO items (id, group_name, taste, nicotine, volume, price, code, count)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """
+        try:
+            self.cursor.execute("DELETE FROM items;")
+            self.cursor.executemany(insert_query, base_rows)
+            for delta in deltas:
+                for deleted, row in delta:
+                    # An explicit DELETE instead of INSERT OR REPLACE keeps the delete triggers firing.
+                    # A row losing its code here is part of the same delta and is written again
+                    self.cursor.execute("DELETE FROM items WHERE id = ? OR code = ?;", (row[0], row[6]))
+                    if not deleted:
+                        self.cursor.execute(insert_query, row)
+            self.cursor.execute("DELETE FROM items_changes;")
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.emit_change(ChangeEvent(ChangeEvent.RELOADED))
+
     def close_connection(self):
-        """Close the database connection."""
+        """Close the database connection.
+
+        Idle read connections are closed and the write-ahead log is checkpointed into the database file
+        before the writer is closed.
+        """
+        while True:
+            try:
+                self.read_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        self.read_connections = 0
         if self.conn:
-            self.conn.close()
\ No newline at end of file
+            if self.conn.in_transaction:
+                self.conn.rollback()
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            self.conn.close()
+            self.conn = None
\ No newline at end of file
@@ -34,6 +34,16 @@ class Language:
         self.close = "Close"
         self.backup = "Backup"
         self.import_ = "Import"
+        self.scan_mode = "Scan mode"
+        self.scan_not_found = "Not found"
+        self.scan_out_of_stock = "Out of stock"
+        self.inventory = "Inventory"
+        self.skus = "SKUs"
+        self.in_stock = "in stock"
+        self.units = "Units"
+        self.stock_value = "Stock value"
+        self.search_hint = "Search text, or ranges such as price:100-300 volume:10 nicotine:20- count:-5\n" \
+                           "Click a column header to sort, Shift+click to sort by one more column"
 
     def setLanguage(self, language: str) -> None:
         self.language = language
@@ -69,5 +79,15 @@ class Language:
             self.done = "Завершено"
             self.close = "Закрити"
             self.backup = "Резервна копія"
+            self.scan_mode = "Режим сканування"
+            self.scan_not_found = "Не знайдено"
+            self.scan_out_of_stock = "Немає в наявності"
+            self.inventory = "Склад"
+            self.skus = "Позицій"
+            self.in_stock = "в наявності"
+            self.units = "Одиниць"
+            self.stock_value = "Вартість залишку"
+            self.search_hint = "Текст для пошуку або діапазони, наприклад price:100-300 volume:10 nicotine:20- " \
+                               "count:-5\nНатисніть заголовок стовпця для сортування, Shift+клік — ще за одним стовпцем"
         else:
             self.init_language()
\ No newline at end of file
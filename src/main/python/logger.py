@@ -1,22 +1,188 @@
+import atexit
+import queue
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 
 from setting import Settings
 
 
+class LogWriter(threading.Thread):
+   def __init__(self, directory="log", max_bytes=None, flush_interval=None):
+       """Initialize a LogWriter instance.
+
+       The writer is the only thread touching the log files. It collects queued lines for up to
+       flush_interval seconds and appends them with one write, keeping the current file open.
+       Files are named log/<date>.txt and roll over to log/<date>.<n>.txt once they reach max_bytes.
+
+       Args:
+           directory (str, optional): Directory of the log files. Defaults to "log".
+           max_bytes (int, optional): Size at which a log file is rotated. Defaults to Settings().log_max_bytes.
+           flush_interval (float, optional): Seconds lines are collected before writing.
+               Defaults to Settings().log_flush_interval.
+       """
+       super().__init__(name="LogWriter", daemon=True)
+       settings = Settings()
+       self.directory = Path(directory)
+       self.max_bytes = max_bytes if max_bytes is not None else settings.log_max_bytes
+       self.flush_interval = flush_interval if flush_interval is not None else settings.log_flush_interval
+       self.queue = queue.Queue()
+       self.file = None
+       self.file_date = None
+       self.file_index = 0
+
+   def put(self, date: str, line: str):
+       """Queue a line for the log file of a date. Returns immediately.
+
+       Args:
+           date (str): Date part of the log file name.
+           line (str): Line to be written, without the trailing newline.
+       """
+       self.queue.put((date, line))
+
+   def flush(self, timeout=None):
+       """Block until every line queued so far is written.
+
+       Args:
+           timeout (float, optional): Maximum number of seconds to wait. Defaults to None.
+       """
+       if not self.is_alive():
+           return
+       done = threading.Event()
+       self.queue.put(done)
+       done.wait(timeout)
+
+   def stop(self):
+       """Write the queued lines, close the log file and end the thread."""
+       if not self.is_alive():
+           return
+       self.queue.put(None)
+       self.join()
+
+   def run(self):
+       running = True
+       while running:
+           batch = [self.queue.get()]
+           deadline = time.monotonic() + self.flush_interval
+           while isinstance(batch[-1], tuple):
+               remaining = deadline - time.monotonic()
+               if remaining <= 0:
+                   break
+               try:
+                   batch.append(self.queue.get(timeout=remaining))
+               except queue.Empty:
+                   break
+           lines = [record for record in batch if isinstance(record, tuple)]
+           try:
+               self.write_lines(lines)
+           except OSError:
+               # Logging must never bring the application down; the lines of this batch are lost
+               self.close_file()
+           for record in batch:
+               if isinstance(record, threading.Event):
+                   record.set()
+               elif record is None:
+                   running = False
+       self.close_file()
+
+   def write_lines(self, lines):
+       """Append lines to their log files, rotating as soon as a file reaches max_bytes.
+
+       Args:
+           lines (List[Tuple[str, str]]): (date, line) pairs in the order they were logged.
+       """
+       buffer = []
+       size = 0
+       for date, line in lines:
+           if buffer and (date != self.file_date or size >= self.max_bytes):
+               self.file.write("".join(buffer))
+               buffer = []
+           if not buffer:
+               self.open_file(date)
+               size = self.file.tell()
+           text = f"{line}\n"
+           buffer.append(text)
+           size += len(text.encode("utf-8"))
+       if buffer:
+           self.file.write("".join(buffer))
+       if self.file is not None:
+           self.file.flush()
+
+   def open_file(self, date: str):
+       """Make the file for a date the current file, rotating it if it is full.
+
+       Args:
+           date (str): Date part of the log file name.
+       """
+       if self.file is not None and self.file_date == date and self.file.tell() < self.max_bytes:
+           return
+       if self.file_date != date:
+           self.file_index = 0
+       self.close_file()
+       self.directory.mkdir(parents=True, exist_ok=True)
+       while True:
+           path = self.path_for(date, self.file_index)
+           if not path.exists() or path.stat().st_size < self.max_bytes:
+               break
+           self.file_index += 1
+       self.file = path.open(mode="a", encoding="utf-8")
+       self.file_date = date
+
+   def path_for(self, date: str, index: int) -> Path:
+       """Return the path of a log file.
+
+       Args:
+           date (str): Date part of the log file name.
+           index (int): Rotation number, 0 for the first file of the day.
+
+       Returns:
+           Path: Path of the log file.
+       """
+       if index == 0:
+           return self.directory / f"{date}.txt"
+       return self.directory / f"{date}.{index}.txt"
+
+   def close_file(self):
+       """Close the current log file."""
+       if self.file is not None:
+           self.file.close()
+           self.file = None
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+   """Return the process-wide LogWriter, starting it on first use.
+
+   The writer is flushed and stopped when the interpreter exits.
+
+   Returns:
+       LogWriter: Running log writer shared by every Logger.
+   """
+   global _writer
+   with _writer_lock:
+       if _writer is None:
+           _writer = LogWriter()
+           _writer.start()
+           atexit.register(_writer.stop)
+       return _writer
+
+
 class Logger:
    def __init__(self):
        self.format_data = Settings().format_data
        self.format_time = Settings().format_time
-       self.file_path = None
-       self.create_today_log_file_if_not_exist()
-
-   def create_today_log_file_if_not_exist(self):
-       Path("log").mkdir(parents=True, exist_ok=True)
-       self.file_path = Path(f'log/{datetime.now().strftime(self.format_data)}.txt')
-       self.file_path.touch(exist_ok=True)
+       self.writer = get_log_writer()
 
    def add_log(self, log: str):
-       current_time = datetime.now().strftime(f"{self.format_data} {self.format_time}")
-       with self.file_path.open(mode="a", encoding="utf-8") as file:
-           file.write(f"{current_time} {log}\n")
+       # Only formats the line and queues it; the LogWriter thread does the file I/O
+       now = datetime.now()
+       current_time = now.strftime(f"{self.format_data} {self.format_time}")
+       self.writer.put(now.strftime(self.format_data), f"{current_time} {log}")
+
+   def flush(self):
+       # Blocks until every queued line is on disk
+       self.writer.flush()
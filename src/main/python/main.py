@@ -1,4 +1,7 @@
+from startup import startup_profile
 from view import main
 
+startup_profile.mark("imports")
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,282 @@
+import sqlite3
+
+
+def create_items_table(cursor: sqlite3.Cursor):
+    """Create the 'items' table if it doesn't exist.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS items (
+        id INTEGER PRIMARY KEY,
+        group_name TEXT,
+        taste TEXT,
+        nicotine INTEGER,
+        volume INTEGER,
+        price REAL,
+        code TEXT UNIQUE,
+        count INTEGER
+    );
+    """)
+
+
+def create_filter_indexes(cursor: sqlite3.Cursor):
+    """Create indexes matching the filtered item and group queries.
+
+    Every read path filters on count, optionally on group_name and LOWER(taste), and sorts by count DESC.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_count_taste ON items (count DESC, LOWER(taste));")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_group_name_count_taste "
+                   "ON items (group_name, count DESC, LOWER(taste));")
+
+
+def create_search_index(cursor: sqlite3.Cursor):
+    """Create the FTS5 search index over taste, group_name and code and the triggers keeping it in sync.
+
+    The index is an external-content table, so it stores no copy of the rows. When SQLite is built without
+    FTS5 the migration is a no-op and searches fall back to LIKE.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+            taste, group_name, code,
+            content='items', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+        );
+        """)
+    except sqlite3.OperationalError:
+        return
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_fts_after_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_fts (rowid, taste, group_name, code) VALUES (new.id, new.taste, new.group_name, new.code);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_fts_after_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, taste, group_name, code)
+        VALUES ('delete', old.id, old.taste, old.group_name, old.code);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_fts_after_update AFTER UPDATE OF taste, group_name, code ON items BEGIN
+        INSERT INTO items_fts (items_fts, rowid, taste, group_name, code)
+        VALUES ('delete', old.id, old.taste, old.group_name, old.code);
+        INSERT INTO items_fts (rowid, taste, group_name, code) VALUES (new.id, new.taste, new.group_name, new.code);
+    END;
+    """)
+    cursor.execute("INSERT INTO items_fts (items_fts) VALUES ('rebuild');")
+
+
+def create_change_journal(cursor: sqlite3.Cursor):
+    """Create the change journal recording which items changed, for incremental backups.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS items_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_id INTEGER NOT NULL,
+        operation TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_changes_after_insert AFTER INSERT ON items BEGIN
+        INSERT INTO items_changes (item_id, operation) VALUES (new.id, 'I');
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_changes_after_update AFTER UPDATE ON items BEGIN
+        INSERT INTO items_changes (item_id, operation) VALUES (new.id, 'U');
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS items_changes_after_delete AFTER DELETE ON items BEGIN
+        INSERT INTO items_changes (item_id, operation) VALUES (old.id, 'D');
+    END;
+    """)
+
+
+def create_keyset_indexes(cursor: sqlite3.Cursor):
+    """Replace the filter indexes with ones ending in id, matching the (count DESC, id) page order.
+
+    Ties on count are then ordered by the index itself, so paged queries seek straight to the row after
+    the previous page.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("DROP INDEX IF EXISTS idx_items_count_taste;")
+    cursor.execute("DROP INDEX IF EXISTS idx_items_group_name_count_taste;")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_count_id_taste ON items (count DESC, id, LOWER(taste));")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_group_name_count_id_taste "
+                   "ON items (group_name, count DESC, id, LOWER(taste));")
+
+
+def create_range_indexes(cursor: sqlite3.Cursor):
+    """Create indexes for the range filters and sorts on nicotine, volume and price.
+
+    Count is already the leading column of idx_items_count_id_taste. Volume is usually searched for one
+    value together with a price range, hence the composite index.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_nicotine ON items (nicotine);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_volume_price ON items (volume, price);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_price ON items (price);")
+
+
+# Per-group totals computed from the 'items' table, shared by the migration and DatabaseHandler.
+# Items without a group are summarised under '', since NULL would never match a key
+GROUP_SUMMARY_QUERY = """
+SELECT COALESCE(group_name, ''),
+       COUNT(*),
+       SUM(COALESCE(count, 0) > 0),
+       SUM(COALESCE(count, 0)),
+       SUM(CAST(ROUND(COALESCE(price, 0) * 100) AS INTEGER) * COALESCE(count, 0))
+    FROM items
+    GROUP BY COALESCE(group_name, '')
+"""
+
+
+def create_group_summary(cursor: sqlite3.Cursor):
+    """Create the per-group summary table, the triggers keeping it in sync with 'items' and fill it.
+
+    Items without a group are summarised under ''. Stock value is kept in cents as an integer, so adding
+    and subtracting it on every change never drifts the way a floating point sum would.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS group_summary (
+        group_name TEXT NOT NULL PRIMARY KEY,
+        sku_count INTEGER NOT NULL,
+        in_stock_count INTEGER NOT NULL,
+        units INTEGER NOT NULL,
+        stock_value_cents INTEGER NOT NULL
+    );
+    """)
+    add_new = """
+        INSERT INTO group_summary (group_name, sku_count, in_stock_count, units, stock_value_cents)
+        VALUES (COALESCE(new.group_name, ''), 1, COALESCE(new.count, 0) > 0, COALESCE(new.count, 0),
+                CAST(ROUND(COALESCE(new.price, 0) * 100) AS INTEGER) * COALESCE(new.count, 0))
+        ON CONFLICT (group_name) DO UPDATE SET
+            sku_count = sku_count + excluded.sku_count,
+            in_stock_count = in_stock_count + excluded.in_stock_count,
+            units = units + excluded.units,
+            stock_value_cents = stock_value_cents + excluded.stock_value_cents;
+    """
+    subtract_old = """
+        UPDATE group_summary SET
+            sku_count = sku_count - 1,
+            in_stock_count = in_stock_count - (COALESCE(old.count, 0) > 0),
+            units = units - COALESCE(old.count, 0),
+            stock_value_cents = stock_value_cents
+                - CAST(ROUND(COALESCE(old.price, 0) * 100) AS INTEGER) * COALESCE(old.count, 0)
+            WHERE group_name = COALESCE(old.group_name, '');
+        DELETE FROM group_summary WHERE group_name = COALESCE(old.group_name, '') AND sku_count = 0;
+    """
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS group_summary_after_insert AFTER INSERT ON items BEGIN "
+                   f"{add_new} END;")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS group_summary_after_delete AFTER DELETE ON items BEGIN "
+                   f"{subtract_old} END;")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS group_summary_after_update "
+                   f"AFTER UPDATE OF group_name, price, count ON items BEGIN {subtract_old} {add_new} END;")
+    cursor.execute("DELETE FROM group_summary;")
+    cursor.execute(f"INSERT INTO group_summary (group_name, sku_count, in_stock_count, units, stock_value_cents) "
+                   f"{GROUP_SUMMARY_QUERY};")
+
+
+def create_sort_indexes(cursor: sqlite3.Cursor):
+    """Create indexes for the header sorts the existing indexes cannot serve, ending in id like the page order.
+
+    Without them every page of such a sort scans the whole table, or all rows tied on the sort column, and
+    sorts them. The index on volume and price orders volume ties by price, the one on count only serves
+    count DESC. Code, nicotine and price need none, as a single-column index already orders ties by id.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the connection being migrated.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_group_name_id ON items (group_name, id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_taste_id ON items (taste, id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_volume_id ON items (volume, id);")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_count_asc_id ON items (count, id);")
+
+
+# Ordered list of migrations. The database's PRAGMA user_version holds the number of applied migrations,
+# so new migrations must only ever be appended.
+MIGRATIONS = [
+    create_items_table,
+    create_filter_indexes,
+    create_search_index,
+    create_change_journal,
+    create_keyset_indexes,
+    create_range_indexes,
+    create_group_summary,
+    create_sort_indexes,
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the schema version stored in the database.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+
+    Returns:
+        int: Number of migrations already applied.
+    """
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def has_search_index(conn: sqlite3.Connection) -> bool:
+    """Check whether the FTS5 search index exists and can be queried.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+
+    Returns:
+        bool: True if searches can be answered through the FTS5 index, False otherwise.
+    """
+    try:
+        conn.execute("SELECT rowid FROM items_fts LIMIT 0;")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+def migrate(conn: sqlite3.Connection) -> int:
+    """Apply every pending migration, each one in its own transaction.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the database.
+
+    Returns:
+        int: Schema version after migrating.
+    """
+    version = get_schema_version(conn)
+    if version > len(MIGRATIONS):
+        raise RuntimeError(f"Database schema version {version} is newer than this application supports "
+                           f"({len(MIGRATIONS)})")
+    conn.commit()
+    cursor = conn.cursor()
+    for version, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        try:
+            cursor.execute("BEGIN;")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version};")
+            cursor.execute("COMMIT;")
+        except Exception:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK;")
+            raise
+    return get_schema_version(conn)
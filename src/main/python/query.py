@@ -0,0 +1,427 @@
+import base64
+import json
+
+from services import FilterManager
+
+# Columns never NULL in a filtered result: id is the rowid and every filter requires count >= 0
+NOT_NULL_COLUMNS = ('id', 'count')
+
+
+def to_fts_query(text: str):
+    """Convert search text into an FTS5 query matching every word as a prefix.
+
+    Args:
+        text (str): Text typed into the search box.
+
+    Returns:
+        str: FTS5 MATCH expression, or None if the text contains no words.
+    """
+    words = text.split()
+    if not words:
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+def encode_cursor(position) -> str:
+    """Encode a page position into an opaque cursor.
+
+    Args:
+        position (List): Position after the last row of a page, for example ['key', count, id].
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    text = json.dumps(position, separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """Decode a cursor returned by encode_cursor.
+
+    Args:
+        cursor (str): Cursor string.
+
+    Returns:
+        List: Page position.
+
+    Raises:
+        ValueError: If the cursor is not a valid cursor.
+    """
+    try:
+        text = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        position = json.loads(text)
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from err
+    if not isinstance(position, list) or not position:
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return position
+
+
+class QueryCompiler:
+    def __init__(self, full_text_search=False):
+        """Initialize a QueryCompiler instance.
+
+        The compiler turns a FilterManager into a fixed SQL template plus bound parameters. Templates are
+        cached by query kind and by which filters are active, so the same SQL text is sent to sqlite3 for
+        every search text or group name and its statement cache is reused.
+
+        Args:
+            full_text_search (bool, optional): Whether searches go through the FTS5 index. Defaults to False.
+        """
+        self.full_text_search = full_text_search
+        self.templates = {}
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return template cache statistics.
+
+        Returns:
+            Dict[str, int]: Number of cache hits, misses and cached templates.
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'templates': len(self.templates)}
+
+    def search_mode(self, search_taste):
+        """Return how the search text will be matched.
+
+        Args:
+            search_taste (str): Text typed into the search box, or None.
+
+        Returns:
+            str: 'fts' for the FTS5 index, 'like' for the LIKE fallback, or None without a search.
+        """
+        if search_taste is None:
+            return None
+        if self.full_text_search and to_fts_query(search_taste) is not None:
+            return 'fts'
+        return 'like'
+
+    @staticmethod
+    def search_value(search_taste, mode):
+        """Return the bound parameter for the search text.
+
+        Args:
+            search_taste (str): Text typed into the search box.
+            mode (str): Search mode returned by search_mode.
+
+        Returns:
+            str: FTS5 MATCH expression or LIKE pattern.
+        """
+        if mode == 'fts':
+            return to_fts_query(search_taste)
+        return f"%{search_taste}%"
+
+    def get_template(self, key, build):
+        """Return the cached SQL template for a key, building it on a miss.
+
+        Args:
+            key (Tuple): Query kind and active filters.
+            build (Callable[[], Tuple[str, List[str]]]): Builds the SQL and the order of its parameters.
+
+        Returns:
+            Tuple[str, List[str]]: SQL template and the names of its parameters in order.
+        """
+        template = self.templates.get(key)
+        if template is None:
+            self.misses += 1
+            template = build()
+            self.templates[key] = template
+        else:
+            self.hits += 1
+        return template
+
+    @staticmethod
+    def filter_shape(filter_manager: FilterManager):
+        """Return which group list and range filters are active, which decides the SQL of a query.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Tuple[int, Tuple]: Number of group names, and (column, has_low, has_high) per range, with
+            has_high None for a single value.
+        """
+        range_sides = tuple((column, low is not None, None if low == high else high is not None)
+                            for column, (low, high) in sorted(filter_manager.ranges.items()))
+        return len(filter_manager.group_names), range_sides
+
+    @staticmethod
+    def filter_values(filter_manager: FilterManager):
+        """Return the values of the group list and range parameters.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Dict[str, Any]: Parameter values by name.
+        """
+        values = {f'group_names_{index}': group_name for index, group_name in enumerate(filter_manager.group_names)}
+        for column, (low, high) in filter_manager.ranges.items():
+            values[f'{column}_low'] = low
+            values[f'{column}_high'] = high
+        return values
+
+    @staticmethod
+    def order_by(filter_manager: FilterManager, start=0, prefix=""):
+        """Build the ORDER BY terms of the sort order of a FilterManager.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing the sort order.
+            start (int, optional): Number of leading sort columns to leave out. Defaults to 0.
+            prefix (str, optional): Table prefix for column names. Defaults to "".
+
+        Returns:
+            str: Comma-separated ORDER BY terms.
+        """
+        return ", ".join(f"{prefix}{column}{' DESC' if descending else ''}"
+                         for column, descending in filter_manager.sort_order()[start:])
+
+    @staticmethod
+    def where_clause(in_stock, has_group, search_mode, prefix="", shape=(0, ())):
+        """Build the WHERE conditions shared by the filtered queries.
+
+        Every condition compares a column with bound values, so it can be answered by an index on that column.
+
+        Args:
+            in_stock (bool): In-stock status filter.
+            has_group (bool): Whether a group name filter is active.
+            search_mode (str): Search mode returned by search_mode.
+            prefix (str, optional): Table prefix for column names. Defaults to "".
+            shape (Tuple[int, Tuple], optional): Group list and range filters returned by filter_shape.
+                Defaults to none of them.
+
+        Returns:
+            Tuple[List[str], List[str]]: SQL conditions and the names of their parameters in order. The
+            search condition, if any, comes last.
+        """
+        group_count, range_sides = shape
+        conditions = [f"{prefix}count {'>' if in_stock else '>='} 0"]
+        names = []
+        if has_group:
+            conditions.append(f"{prefix}group_name = ?")
+            names.append('group_name')
+        if group_count:
+            conditions.append(f"{prefix}group_name IN ({', '.join('?' * group_count)})")
+            names += [f'group_names_{index}' for index in range(group_count)]
+        for column, has_low, has_high in range_sides:
+            if has_high is None:
+                # A single value, so that a composite index can also seek on its next column
+                conditions.append(f"{prefix}{column} = ?")
+                names.append(f'{column}_low')
+            elif has_low:
+                conditions.append(f"{prefix}{column} >= ?")
+                names.append(f'{column}_low')
+            if has_high:
+                conditions.append(f"{prefix}{column} <= ?")
+                names.append(f'{column}_high')
+        if search_mode == 'fts':
+            conditions.append(f"{prefix}id IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+            names.append('search')
+        elif search_mode == 'like':
+            conditions.append(f"LOWER({prefix}taste) LIKE ?")
+            names.append('search')
+        return conditions, names
+
+    def bind(self, template, group_name=None, search_taste=None, mode=None, **extra):
+        """Bind filter values to a template.
+
+        Args:
+            template (Tuple[str, List[str]]): SQL template and the names of its parameters.
+            group_name (str, optional): Group name filter. Defaults to None.
+            search_taste (str, optional): Text typed into the search box. Defaults to None.
+            mode (str, optional): Search mode returned by search_mode. Defaults to None.
+            **extra: Values of the other named parameters, for example limit.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters.
+        """
+        sql, names = template
+        values = {'group_name': group_name, **extra}
+        if mode is not None:
+            values['search'] = self.search_value(search_taste, mode)
+        return sql, tuple(values[name] for name in names)
+
+    def compile_items(self, filter_manager: FilterManager, paged=False):
+        """Compile the query retrieving filtered items.
+
+        Searches answered through the FTS5 index are ordered by relevance first, unless the filters have
+        an explicit sort order.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            paged (bool, optional): Whether the query ends with LIMIT ? OFFSET ? placeholders. Defaults to False.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters, without the LIMIT and OFFSET values.
+        """
+        mode = self.search_mode(filter_manager.search_taste)
+        has_group = filter_manager.group_name is not None
+        shape = self.filter_shape(filter_manager)
+        by_relevance = mode == 'fts' and not filter_manager.sort
+        key = ('items', filter_manager.in_stock, has_group, mode, shape, tuple(filter_manager.sort), paged)
+        limit = " LIMIT ? OFFSET ?" if paged else ""
+
+        def build():
+            if by_relevance:
+                conditions, names = self.where_clause(filter_manager.in_stock, has_group, None, "items.", shape)
+                conditions.insert(0, "items_fts MATCH ?")
+                return f"SELECT items.* FROM items JOIN items_fts ON items_fts.rowid = items.id " \
+                       f"WHERE {' AND '.join(conditions)} " \
+                       f"ORDER BY items_fts.rank, {self.order_by(filter_manager, prefix='items.')}{limit};", \
+                       ['search'] + names
+            conditions, names = self.where_clause(filter_manager.in_stock, has_group, mode, shape=shape)
+            return f"SELECT * FROM items WHERE {' AND '.join(conditions)} " \
+                   f"ORDER BY {self.order_by(filter_manager)}{limit};", names
+
+        return self.bind(self.get_template(key, build), filter_manager.group_name, filter_manager.search_taste, mode,
+                         **self.filter_values(filter_manager))
+
+    @staticmethod
+    def keyset_parts(filter_manager: FilterManager, after):
+        """List the parts a page after a known row is read in, in sort order.
+
+        The rows after a known row are read in parts, each a single index range: first the rows tied with
+        it on every sort column but the last one, then on one column fewer, down to the rows beyond it on
+        the first sort column. SQLite sorts NULL before every value, so beyond a NULL in an ascending column
+        come the values, and beyond a value in a descending column come the smaller values and then NULL.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing the sort order.
+            after (List): Values of the sort_order columns of the known row.
+
+        Returns:
+            List[Tuple[int, str]]: (tied, beyond) arguments of compile_items_keyset.
+        """
+        parts = []
+        order = filter_manager.sort_order()
+        for tied in range(len(order) - 1, -1, -1):
+            column, descending = order[tied]
+            if after[tied] is None:
+                if not descending:
+                    parts.append((tied, 'not_null'))
+            else:
+                parts.append((tied, 'value'))
+                if descending and column not in NOT_NULL_COLUMNS:
+                    parts.append((tied, 'null'))
+        return parts
+
+    def compile_items_keyset(self, filter_manager: FilterManager, limit: int, after=None, tied=None, beyond='value'):
+        """Compile the query retrieving filtered items in their sort order from a known position.
+
+        The query seeks on an index instead of skipping rows with OFFSET, so every page costs the same.
+        A single "a < ? OR (a = ? AND b > ?)" range would walk every row of a tie, so a page after a known
+        row is read in the parts listed by keyset_parts. Searches answered through the FTS5 index without
+        an explicit sort are ordered by relevance and have to be paged with compile_items instead.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+            limit (int): Maximum number of rows to return.
+            after (List, optional): Values of the sort_order columns of the known row. Defaults to None for
+                the first page.
+            tied (int, optional): Number of leading sort columns the rows share with the known row; the
+                next column has to be beyond it. Defaults to None for the first page.
+            beyond (str, optional): How the next column is beyond the known row: 'value' for a greater or
+                smaller value, 'null' for NULL and 'not_null' for any value. Defaults to 'value'.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters.
+        """
+        mode = self.search_mode(filter_manager.search_taste)
+        has_group = filter_manager.group_name is not None
+        shape = self.filter_shape(filter_manager)
+        order = filter_manager.sort_order()
+        key = ('items_keyset', filter_manager.in_stock, has_group, mode, shape, tuple(order), tied, beyond)
+
+        def build():
+            conditions, names = self.where_clause(filter_manager.in_stock, has_group, mode, shape=shape)
+            if tied is None:
+                return f"SELECT * FROM items WHERE {' AND '.join(conditions)} " \
+                       f"ORDER BY {self.order_by(filter_manager)} LIMIT ?;", names + ['limit']
+            for index, (column, _) in enumerate(order[:tied]):
+                # IS also matches a tie on NULL, and can be answered by an index like =
+                conditions.append(f"{column} IS ?")
+                names = names + [f'after_{index}']
+            column, descending = order[tied]
+            if beyond == 'null':
+                conditions.append(f"{column} IS NULL")
+            elif beyond == 'not_null':
+                conditions.append(f"{column} IS NOT NULL")
+            else:
+                conditions.append(f"{column} {'<' if descending else '>'} ?")
+                names = names + [f'after_{tied}']
+            return f"SELECT * FROM items WHERE {' AND '.join(conditions)} " \
+                   f"ORDER BY {self.order_by(filter_manager, start=tied)} LIMIT ?;", names + ['limit']
+
+        after_values = {f'after_{index}': value for index, value in enumerate(after or ())}
+        return self.bind(self.get_template(key, build), filter_manager.group_name, filter_manager.search_taste, mode,
+                         limit=limit, **after_values, **self.filter_values(filter_manager))
+
+    def compile_count(self, group_name, filter_manager: FilterManager):
+        """Compile the query counting filtered items in a group.
+
+        Args:
+            group_name (str): Group name for filtering, or None for every group.
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters.
+        """
+        mode = self.search_mode(filter_manager.search_taste)
+        has_group = group_name is not None
+        shape = self.filter_shape(filter_manager)
+        key = ('count', filter_manager.in_stock, has_group, mode, shape)
+
+        def build():
+            conditions, names = self.where_clause(filter_manager.in_stock, has_group, mode, shape=shape)
+            return f"SELECT COUNT(*) AS row_count FROM items WHERE {' AND '.join(conditions)};", names
+
+        return self.bind(self.get_template(key, build), group_name, filter_manager.search_taste, mode,
+                         **self.filter_values(filter_manager))
+
+    def compile_group_names(self, filter_manager: FilterManager):
+        """Compile the query retrieving distinct group names based on filters.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters.
+        """
+        has_group = filter_manager.group_name is not None
+        key = ('group_names', filter_manager.in_stock, has_group)
+
+        def build():
+            conditions, names = self.where_clause(filter_manager.in_stock, has_group, None)
+            return f"SELECT DISTINCT group_name FROM items WHERE {' AND '.join(conditions)} " \
+                   f"ORDER BY count DESC;", names
+
+        return self.bind(self.get_template(key, build), filter_manager.group_name)
+
+    def compile_group_facets(self, filter_manager: FilterManager):
+        """Compile the query retrieving every group with its number of filtered items.
+
+        Groups are listed according to the in-stock filter, while their counts also honour the search and
+        the ranges.
+
+        Args:
+            filter_manager (FilterManager): FilterManager instance containing filter settings.
+
+        Returns:
+            Tuple[str, Tuple]: SQL and its parameters.
+        """
+        mode = self.search_mode(filter_manager.search_taste)
+        shape = (0, self.filter_shape(filter_manager)[1])
+        key = ('group_facets', filter_manager.in_stock, mode, shape)
+
+        def build():
+            conditions, _ = self.where_clause(filter_manager.in_stock, False, None)
+            count_conditions, names = self.where_clause(filter_manager.in_stock, False, mode, shape=shape)
+            count_expression = "COUNT(*)"
+            if len(count_conditions) > 1:
+                count_expression = f"SUM(CASE WHEN {' AND '.join(count_conditions[1:])} THEN 1 ELSE 0 END)"
+            return f"SELECT group_name, {count_expression} AS row_count FROM items " \
+                   f"WHERE {' AND '.join(conditions)} " \
+                   f"GROUP BY group_name ORDER BY MAX(count) DESC, group_name;", names
+
+        return self.bind(self.get_template(key, build), None, filter_manager.search_taste, mode,
+                         **self.filter_values(filter_manager))
@@ -1,4 +1,5 @@
 import csv
+import re
 from pathlib import Path
 from typing import Dict, Union
 from datetime import datetime
@@ -6,32 +7,230 @@ from datetime import datetime
 from setting import Settings
 
 
+# Columns of the 'items' table in row order; items can be sorted on any of them
+SORT_COLUMNS = ('id', 'group_name', 'taste', 'nicotine', 'volume', 'price', 'code', 'count')
+# Numeric columns items can be filtered on by range
+RANGE_COLUMNS = ('nicotine', 'volume', 'price', 'count')
+# "price:100-300", "volume:10", "nicotine:20-" or "price:-300" typed into the search box
+RANGE_PATTERN = re.compile(r'^(?P<column>[a-z]+):(?P<low>\d+(?:[.,]\d+)?)?(?P<dash>-)?(?P<high>\d+(?:[.,]\d+)?)?$')
+
+
 class FilterManager:
-    def __init__(self, in_stock=True, group_name=None, search_teste=None):
+    def __init__(self, in_stock=True, group_name=None, search_teste=None, group_names=None, ranges=None, sort=None):
         """Initialize a FilterManager instance.
 
         Args:
             in_stock (bool, optional): In-stock status filter. Defaults to True.
             group_name (str, optional): Group name filter. Defaults to None.
+            search_teste (str, optional): Text typed into the search box. Defaults to None.
+            group_names (Iterable[str], optional): Several group names, any of which an item may have.
+                Defaults to None.
+            ranges (Dict[str, Tuple], optional): Inclusive (low, high) bounds per column of RANGE_COLUMNS,
+                None leaving a side open. Defaults to None.
+            sort (List[Tuple[str, bool]], optional): (column, descending) pairs, most significant first.
+                Defaults to None, which sorts by count, highest first.
+
+        Raises:
+            ValueError: If a range or sort names an unknown column or a range is empty.
         """
         self.in_stock = in_stock
         self.group_name = group_name
         self.search_taste = search_teste
+        self.group_names = tuple(group_names) if group_names else ()
+        self.ranges = {}
+        for column, (low, high) in (ranges or {}).items():
+            self.set_range(column, low, high)
+        self.sort = []
+        self.set_sort(sort or [])
 
     def __str__(self):
         """Return a string representation of the FilterManager instance."""
-        return f"FilterManager(in_stock={self.in_stock}, group_name={self.group_name}, search_taste={self.search_taste})"
+        return f"FilterManager(in_stock={self.in_stock}, group_name={self.group_name}, search_taste={self.search_taste}, " \
+               f"group_names={self.group_names}, ranges={self.ranges}, sort={self.sort})"
+
+    def copy(self):
+        """Return an independent copy of the FilterManager instance.
+
+        Returns:
+            FilterManager: FilterManager with the same filter settings.
+        """
+        return FilterManager(in_stock=self.in_stock, group_name=self.group_name, search_teste=self.search_taste,
+                             group_names=self.group_names, ranges=self.ranges, sort=self.sort)
+
+    def set_range(self, column: str, low=None, high=None):
+        """Restrict a numeric column to a range, or lift the restriction when both bounds are None.
+
+        Args:
+            column (str): Column of RANGE_COLUMNS.
+            low (float, optional): Smallest accepted value. Defaults to None.
+            high (float, optional): Largest accepted value. Defaults to None.
+
+        Raises:
+            ValueError: If the column cannot be filtered by range or low is above high.
+        """
+        if column not in RANGE_COLUMNS:
+            raise ValueError(f"Cannot filter by range on column '{column}'")
+        if low is not None and high is not None and low > high:
+            raise ValueError(f"Empty range for {column}: {low} > {high}")
+        if low is None and high is None:
+            self.ranges.pop(column, None)
+        else:
+            self.ranges[column] = (low, high)
+
+    def set_sort(self, sort):
+        """Replace the sort order.
+
+        Args:
+            sort (List[Tuple[str, bool]]): (column, descending) pairs, most significant first. An empty list
+                restores the default order.
+
+        Raises:
+            ValueError: If a column is unknown or given twice.
+        """
+        columns = [column for column, _ in sort]
+        for column in columns:
+            if column not in SORT_COLUMNS:
+                raise ValueError(f"Cannot sort on column '{column}'")
+        if len(set(columns)) != len(columns):
+            raise ValueError(f"Column sorted on twice: {columns}")
+        self.sort = [(column, bool(descending)) for column, descending in sort]
+
+    @staticmethod
+    def parse_sort(text: str):
+        """Parse a sort order such as "price:desc,count".
+
+        Args:
+            text (str): Comma-separated columns, each optionally followed by ":asc" or ":desc".
+
+        Returns:
+            List[Tuple[str, bool]]: (column, descending) pairs.
+
+        Raises:
+            ValueError: If a direction is neither "asc" nor "desc".
+        """
+        sort = []
+        for part in text.split(','):
+            column, _, direction = part.strip().partition(':')
+            if direction not in ('', 'asc', 'desc'):
+                raise ValueError(f"Unknown sort direction '{direction}'")
+            sort.append((column, direction == 'desc'))
+        return sort
+
+    def set_search_text(self, text: str):
+        """Set the search and the ranges from the text typed into the search box.
+
+        Words like "price:100-300", "volume:10", "nicotine:20-" or "count:-5" set the range of a column
+        of RANGE_COLUMNS; the remaining words are the search text.
+
+        Args:
+            text (str): Text typed into the search box.
+        """
+        self.ranges = {}
+        words = []
+        for word in text.split():
+            match = RANGE_PATTERN.match(word.lower())
+            if match is None or match['column'] not in RANGE_COLUMNS or not (match['low'] or match['high']):
+                words.append(word)
+                continue
+            low, high = (self.parse_number(value) if value else None for value in (match['low'], match['high']))
+            if match['dash'] is None:
+                high = low
+            try:
+                self.set_range(match['column'], low, high)
+            except ValueError:
+                words.append(word)
+        self.search_taste = " ".join(words) if words else None
+
+    @staticmethod
+    def parse_number(text: str):
+        """Parse a bound typed into the search box, accepting a comma as the decimal separator.
+
+        Args:
+            text (str): Digits, optionally with a decimal part.
+
+        Returns:
+            Union[int, float]: Whole numbers as int, others as float.
+        """
+        number = float(text.replace(',', '.'))
+        return int(number) if number.is_integer() else number
 
-    def to_tuple(self) -> Dict[str, Union[bool, str]]:
-        """Convert FilterManager instance to a dictionary.
+    def sort_order(self):
+        """Return the full sort order, ending with id so that every row has a unique position.
 
         Returns:
-            Dict[str, Union[bool, str]]: Dictionary representation of the FilterManager instance.
+            List[Tuple[str, bool]]: (column, descending) pairs, most significant first.
         """
-        return {'in_stock': self.in_stock, 'group_name': self.group_name, 'search_taste': self.search_taste}
+        order = self.sort or [('count', True)]
+        if 'id' not in (column for column, _ in order):
+            order = order + [('id', False)]
+        return order
+
+    def precedes(self, row, other) -> bool:
+        """Check whether a row comes before another in the sort order.
+
+        Args:
+            row (Tuple): Item row in the column order of the 'items' table.
+            other (Tuple): Item row to compare with.
+
+        Returns:
+            bool: True if row is sorted before other, False otherwise.
+        """
+        for column, descending in self.sort_order():
+            index = SORT_COLUMNS.index(column)
+            value, other_value = row[index], other[index]
+            if value == other_value:
+                continue
+            # Like SQLite, NULL sorts before every value
+            smaller = value is None if value is None or other_value is None else value < other_value
+            return not smaller if descending else smaller
+        return False
+
+    def can_match_locally(self) -> bool:
+        """Check whether matches can decide membership without the database.
+
+        Returns:
+            bool: False when a search is active, because searches are answered by the database index.
+        """
+        return self.search_taste is None
+
+    def matches(self, item_data) -> bool:
+        """Check whether an item passes the in-stock, group and range filters.
+
+        The search filter is not evaluated; use can_match_locally first.
+
+        Args:
+            item_data (ItemData): Item data to be checked.
+
+        Returns:
+            bool: True if the item passes the filters, False otherwise.
+        """
+        if item_data.count is None or item_data.count < (1 if self.in_stock else 0):
+            return False
+        if self.group_name is not None and item_data.group_name != self.group_name:
+            return False
+        if self.group_names and item_data.group_name not in self.group_names:
+            return False
+        for column, (low, high) in self.ranges.items():
+            value = getattr(item_data, column)
+            if value is None or (low is not None and value < low) or (high is not None and value > high):
+                return False
+        return True
+
+    def to_tuple(self) -> Dict[str, Union[bool, str, tuple]]:
+        """Convert FilterManager instance to a dictionary of hashable values.
+
+        Returns:
+            Dict[str, Union[bool, str, tuple]]: Dictionary representation of the FilterManager instance.
+        """
+        return {'in_stock': self.in_stock, 'group_name': self.group_name, 'search_taste': self.search_taste,
+                'group_names': self.group_names, 'ranges': tuple(sorted(self.ranges.items())),
+                'sort': tuple(self.sort)}
 
 
 class ItemData:
+    # Fixed attributes keep an instance small: no per-instance __dict__
+    __slots__ = ('id_', 'group_name', 'taste', 'nicotine', 'volume', 'price', 'code', 'count')
+
     def __init__(self, id_=None, group_name=None, taste=None, nicotine=None, volume=None, price=None, code=None,
                  count=None):
         """Initialize an ItemData instance.
@@ -55,6 +254,24 @@ class ItemData:
         self.code = str(code)
         self.count = count
 
+    @classmethod
+    def from_row(cls, row):
+        """Build an ItemData instance straight from a row of the 'items' table.
+
+        Skips the keyword arguments and the str() conversion of __init__, since the database already
+        stores the code as text.
+
+        Args:
+            row (Tuple): Item row in the column order of the 'items' table.
+
+        Returns:
+            ItemData: Item data of the row.
+        """
+        item_data = cls.__new__(cls)
+        (item_data.id_, item_data.group_name, item_data.taste, item_data.nicotine, item_data.volume,
+         item_data.price, item_data.code, item_data.count) = row
+        return item_data
+
     def setData(self, group_name=None, taste=None, nicotine=None, volume=None, price=None, code=None, count=None):
         """Set data for the item.
 
@@ -108,7 +325,87 @@ class ItemData:
         return [self.id_, self.group_name, self.taste, self.nicotine, self.volume, self.price, self.code, self.count]
 
 
+class ChangeEvent:
+    INSERTED = "inserted"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    RELOADED = "reloaded"
+
+    def __init__(self, kind: str, id_=None, item_data=None, previous=None):
+        """Initialize a ChangeEvent instance.
+
+        Args:
+            kind (str): One of INSERTED, UPDATED, DELETED or RELOADED. RELOADED means many rows changed
+                at once and listeners should reload everything.
+            id_ (int, optional): ID of the changed item. Defaults to None.
+            item_data (ItemData, optional): Item after the change, None for deletions. Defaults to None.
+            previous (ItemData, optional): Item before the change, None for insertions. Defaults to None.
+        """
+        self.kind = kind
+        self.id_ = id_
+        self.item_data = item_data
+        self.previous = previous
+
+    def __str__(self):
+        """Return a string representation of the ChangeEvent instance."""
+        return f"ChangeEvent(kind={self.kind}, id={self.id_}, item_data={self.item_data}, previous={self.previous})"
+
+
+class ImportResult:
+    def __init__(self):
+        """Initialize an ImportResult instance.
+
+        Collects the outcome of a bulk import: how many rows were accepted and which rows were
+        rejected together with the reason.
+        """
+        self.accepted = 0
+        self.rejected = []
+
+    def reject(self, item_data: ItemData, reason: str):
+        """Record a rejected row.
+
+        Args:
+            item_data (ItemData): Item data that could not be imported.
+            reason (str): Why the row was rejected.
+        """
+        self.rejected.append((item_data, reason))
+
+    @property
+    def rejected_count(self) -> int:
+        """Return the number of rejected rows."""
+        return len(self.rejected)
+
+    def __str__(self):
+        """Return a string representation of the ImportResult instance."""
+        return f"ImportResult(accepted={self.accepted}, rejected={self.rejected_count})"
+
+
+class ImportChunk:
+    def __init__(self, rows, errors):
+        """Initialize an ImportChunk instance.
+
+        Args:
+            rows (List[ItemData]): Coerced and validated items of the chunk.
+            errors (List[Tuple[int, str]]): (line_number, message) pairs of the rows that could not be read.
+        """
+        self.rows = rows
+        self.errors = errors
+
+    def __str__(self):
+        """Return a string representation of the ImportChunk instance."""
+        return f"ImportChunk(rows={len(self.rows)}, errors={len(self.errors)})"
+
+
 class CSVImporter:
+    # Header keywords identifying each column, matched against the start of the lower-cased header cell
+    COLUMNS = {'group_name': ('group',),
+               'taste': ('taste',),
+               'nicotine': ('nicotine',),
+               'volume': ('volume',),
+               'price': ('price',),
+               'code': ('code', 'cod'),
+               'count': ('count',)}
+
     def __init__(self, path_file):
         """Initialize a CSVImporter instance.
 
@@ -133,35 +430,179 @@ class CSVImporter:
     def get_in_item_data_list(self):
         """Convert CSV data to a list of ItemData instances.
 
-            Args:
-                path_to_csv (str): Path to the CSV file.
+            Rows that cannot be read are skipped; use iter_chunks to get their errors.
 
             Returns:
-                List[List[ItemData]]: List of ItemData instances.
+                List[ItemData]: List of ItemData instances.
             """
-        csv_in_list = self.get_in_list()
-        if len(csv_in_list) == 1 or not csv_in_list:
-            return []
-        csv_in_list.pop(0)
-        if len(csv_in_list[0]) < 7:
-            return []
-        return [ItemData(None, row[0], row[1], row[2], row[3], row[4], row[5], row[6]) for row in csv_in_list]
+        return [item_data for chunk in self.iter_chunks() for item_data in chunk.rows]
+
+    def map_header(self, header):
+        """Map every column to its position in the file using the header row.
+
+        Columns are matched by name, so their order in the file does not matter. A header that does not
+        name every column falls back to the positional layout of example.csv.
+
+        Args:
+            header (List[str]): First row of the CSV file.
+
+        Returns:
+            Dict[str, int]: Position of each column, or None if the row is too short for the positional layout.
+        """
+        mapping = {}
+        for position, cell in enumerate(header):
+            name = cell.strip().lower()
+            for column, keywords in self.COLUMNS.items():
+                if column not in mapping and name.startswith(keywords):
+                    mapping[column] = position
+                    break
+        if len(mapping) == len(self.COLUMNS):
+            return mapping
+        if len(header) < len(self.COLUMNS):
+            return None
+        return {column: position for position, column in enumerate(self.COLUMNS)}
+
+    @staticmethod
+    def parse_int(value: str) -> int:
+        """Parse an integer field, accepting integral decimals such as "15.0".
+
+        Args:
+            value (str): Raw field.
+
+        Returns:
+            int: Parsed value.
+        """
+        value = value.strip()
+        try:
+            return int(value)
+        except ValueError:
+            number = float(value.replace(',', '.'))
+            if not number.is_integer():
+                raise ValueError(f"'{value}' is not a whole number")
+            return int(number)
+
+    @staticmethod
+    def parse_float(value: str) -> float:
+        """Parse a decimal field, accepting a comma as the decimal separator.
+
+        Args:
+            value (str): Raw field.
+
+        Returns:
+            float: Parsed value.
+        """
+        return float(value.strip().replace(',', '.'))
+
+    def coerce_row(self, row, mapping) -> ItemData:
+        """Convert one CSV row into a typed ItemData instance.
+
+        Args:
+            row (List[str]): Raw CSV row.
+            mapping (Dict[str, int]): Position of each column returned by map_header.
+
+        Returns:
+            ItemData: Typed and validated item data.
+
+        Raises:
+            ValueError: If a field is missing, empty or cannot be parsed.
+        """
+        if len(row) <= max(mapping.values()):
+            raise ValueError(f"expected {max(mapping.values()) + 1} columns, got {len(row)}")
+        values = {column: row[position].strip() for column, position in mapping.items()}
+        for column in ('group_name', 'taste', 'code'):
+            if not values[column]:
+                raise ValueError(f"empty {column}")
+        try:
+            item_data = ItemData(group_name=values['group_name'],
+                                 taste=values['taste'],
+                                 nicotine=self.parse_int(values['nicotine']),
+                                 volume=self.parse_int(values['volume']),
+                                 price=self.parse_float(values['price']),
+                                 code=values['code'],
+                                 count=self.parse_int(values['count']))
+        except ValueError as err:
+            raise ValueError(f"invalid number: {err}")
+        if min(item_data.nicotine, item_data.volume, item_data.price, item_data.count) < 0:
+            raise ValueError("negative number")
+        return item_data
+
+    def iter_chunks(self, chunk_size=1000):
+        """Stream the CSV file as chunks of typed items.
+
+        Only one chunk is held in memory at a time, whatever the size of the file.
+
+        Args:
+            chunk_size (int, optional): Maximum number of rows read per chunk. Defaults to 1000.
+
+        Yields:
+            ImportChunk: Coerced items of the chunk and the errors of its unreadable rows.
+        """
+        with open(self.path_file, 'r', newline='', encoding='utf-8') as file:
+            csv_reader = csv.reader(file)
+            header = next(csv_reader, None)
+            if header is None:
+                return
+            mapping = self.map_header(header)
+            if mapping is None:
+                yield ImportChunk([], [(csv_reader.line_num, "header does not name the columns")])
+                return
+            rows = []
+            errors = []
+            for row in csv_reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                try:
+                    rows.append(self.coerce_row(row, mapping))
+                except ValueError as err:
+                    errors.append((csv_reader.line_num, str(err)))
+                if len(rows) + len(errors) >= chunk_size:
+                    yield ImportChunk(rows, errors)
+                    rows = []
+                    errors = []
+            if rows or errors:
+                yield ImportChunk(rows, errors)
 
 
 class CSVExporter:
-    def __init__(self, item_datas, path_dir=None, is_backup=False):
+    def __init__(self, item_datas, path_dir=None, is_backup=False, total=None, on_progress=None):
+        """Initialize a CSVExporter instance.
+
+        The items are consumed lazily by export_to_file, so a database cursor can be streamed straight
+        into the file without building a list first.
+
+        Args:
+            item_datas (Iterable[Union[ItemData, Tuple]]): Items or item rows in the column order of the
+                'items' table.
+            path_dir (str, optional): Directory of the exported file. Defaults to None.
+            is_backup (bool, optional): Whether to write the file to the backup directory. Defaults to False.
+            total (int, optional): Number of items, used to report progress. Defaults to None.
+            on_progress (Callable[[int, int], None], optional): Called with the number of written items and
+                the total while exporting. Defaults to None.
+        """
         self.item_datas = item_datas
         self.progress = 0
+        self.total = total
+        self.on_progress = on_progress
+        self.progress_step = 1000
+        self.cancelled = False
         if is_backup:
             Path("backup").mkdir(parents=True, exist_ok=True)
             self.path_file = Path(f'backup/{datetime.now().strftime(f"{Settings().format_data}_%H%M%S")}_backup.csv')
         else:
             self.path_file = Path(f'{path_dir}/{datetime.now().strftime(f"{Settings().format_data}_%H%M%S")}.csv')
         self.path_file.touch()
-        self.export_to_file()
 
-    def export_to_file(self):
-        with open(self.path_file, 'w', newline='', encoding='utf-8') as csv_file:
+    def cancel(self):
+        """Ask a running export to stop. Safe to call from any thread."""
+        self.cancelled = True
+
+    def export_to_file(self) -> bool:
+        """Write the items to the CSV file, updating progress as rows are written.
+
+        Returns:
+            bool: True if every item was written, False if the export was cancelled and the partial file removed.
+        """
+        with open(self.path_file, 'w', newline='', encoding='utf-8', buffering=1024 * 1024) as csv_file:
 
             csv_writer = csv.writer(csv_file)
             csv_writer.writerow(['Group Name STRING',
@@ -173,7 +614,28 @@ class CSVExporter:
                                  'Count INTEGER',
                                  'id'])
             # Write the data to the CSV file
-            for itemData in self.item_datas:
-                row = itemData.to_list()[1::]
-                row.append(itemData.id_)
-                csv_writer.writerow(row)
+            try:
+                for item in self.item_datas:
+                    values = item.to_list() if isinstance(item, ItemData) else item
+                    row = list(values[1::])
+                    row.append(values[0])
+                    csv_writer.writerow(row)
+                    self.progress += 1
+                    if self.progress % self.progress_step == 0:
+                        if self.cancelled:
+                            break
+                        self.report_progress()
+            finally:
+                # A cancelled export must not leave a database cursor open on the connection it streams from
+                if hasattr(self.item_datas, 'close'):
+                    self.item_datas.close()
+        if self.cancelled:
+            self.path_file.unlink(missing_ok=True)
+            return False
+        self.report_progress()
+        return True
+
+    def report_progress(self):
+        """Call the progress callback with the number of written items and the total."""
+        if self.on_progress is not None:
+            self.on_progress(self.progress, self.total if self.total is not None else self.progress)
@@ -3,4 +3,23 @@ class Settings:
         self.language = "ua"
         self.theme = "dark_gray"
         self.format_data = "%d.%m.%Y"
-        self.format_time = "%H:%M:%S"
\ No newline at end of file
+        self.format_time = "%H:%M:%S"
+        self.db_journal_mode = "WAL"
+        self.db_synchronous = "NORMAL"
+        self.db_cache_size_kib = 20000
+        self.db_mmap_size = 256 * 1024 * 1024
+        self.db_busy_timeout_ms = 5000
+        self.db_read_connections = 2
+        self.log_max_bytes = 5 * 1024 * 1024
+        self.log_flush_interval = 0.5
+        self.backup_full_every = 24
+        self.backup_keep_chains = 3
+        self.snapshot_interval_minutes = 60
+        self.snapshot_pages_per_step = 256
+        self.snapshot_step_sleep = 0.01
+        self.snapshot_keep = 10
+        self.cache_max_entries = 256
+        self.stock_flush_interval_ms = 300
+        self.trace_queries = False
+        self.trace_slow_ms = 50
+        self.trace_top = 20
\ No newline at end of file
@@ -0,0 +1,50 @@
+import os
+import sys
+import time
+
+
+class StartupProfile:
+    def __init__(self, enabled: bool):
+        """Initialize a StartupProfile instance.
+
+        The profile times the startup phases of the application one after another: each mark records the
+        time elapsed since the previous one. When disabled, marks cost a single attribute check.
+
+        Args:
+            enabled (bool): Whether the phases are recorded and reported.
+        """
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.last_mark = self.started_at
+        self.phases = []
+
+    def mark(self, phase: str):
+        """Record the end of a phase.
+
+        Args:
+            phase (str): Name of the phase that just finished.
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last_mark))
+        self.last_mark = now
+
+    def report(self, logger=None):
+        """Print the phase timings to stderr and optionally to a log.
+
+        Args:
+            logger (Logger, optional): Logger receiving one entry per phase. Defaults to None.
+        """
+        if not self.enabled:
+            return
+        lines = [f"STARTUP {phase}: {seconds * 1000:.1f} ms" for phase, seconds in self.phases]
+        lines.append(f"STARTUP total: {(self.last_mark - self.started_at) * 1000:.1f} ms")
+        for line in lines:
+            print(line, file=sys.stderr)
+            if logger is not None:
+                logger.add_log(line)
+
+
+# Created when main.py starts, before the heavy imports, so that they are part of the first phase
+startup_profile = StartupProfile(enabled="--profile-startup" in sys.argv or bool(os.environ.get("PROFILE_STARTUP")))
@@ -0,0 +1,174 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from services import ItemData, FilterManager, ChangeEvent
+
+
+class ItemTableModel(QAbstractTableModel):
+    def __init__(self, db_handler, filter_manager: FilterManager, headers, page_size=200, parent=None):
+        """Initialize an ItemTableModel instance.
+
+        The model keeps only the rows fetched so far as plain tuples and loads the next page from the
+        database when the view scrolls to the end, so no Qt item is created per cell.
+
+        Args:
+            db_handler (DatabaseHandler): Database handler, or an InventoryCache in front of it, used to
+                fetch pages.
+            filter_manager (FilterManager): Filters applied to the fetched rows.
+            headers (List[str]): Column titles.
+            page_size (int, optional): Number of rows fetched at a time. Defaults to 200.
+            parent (QObject, optional): Parent object. Defaults to None.
+        """
+        super().__init__(parent)
+        self.db_handler = db_handler
+        self.filter_manager = filter_manager
+        self.headers = headers
+        self.page_size = page_size
+        self.rows = []
+        self.has_more = True
+        self.next_cursor = None
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+            return None
+        return str(self.rows[index.row()][index.column()])
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Replace one cell of a fetched row.
+
+        Args:
+            index (QModelIndex): Cell to change.
+            value: New value of the cell.
+            role (int, optional): Item data role. Defaults to Qt.EditRole.
+
+        Returns:
+            bool: True if the cell was changed, False otherwise.
+        """
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        row = list(self.rows[index.row()])
+        row[index.column()] = value
+        self.rows[index.row()] = tuple(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole, Qt.EditRole])
+        return True
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return section + 1
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more:
+            return
+        rows, self.next_cursor = self.db_handler.retrieve_items_page(self.filter_manager, self.page_size,
+                                                                     self.next_cursor)
+        self.has_more = self.next_cursor is not None
+        # Rows patched in place after a change may reappear in a later page
+        loaded_ids = {row[0] for row in self.rows}
+        rows = [row for row in rows if row[0] not in loaded_ids]
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def reset(self, first_page=None, next_cursor=None):
+        """Drop the fetched rows and load the first page for the current filters.
+
+        Args:
+            first_page (List[Tuple], optional): First page already fetched elsewhere, for example by a
+                background search. Defaults to None, which fetches it from the database.
+            next_cursor (str, optional): Cursor returned with first_page, or None if it is the only page.
+                Defaults to None.
+        """
+        self.beginResetModel()
+        if first_page is None:
+            self.rows = []
+            self.has_more = True
+            self.next_cursor = None
+        else:
+            self.rows = list(first_page)
+            self.next_cursor = next_cursor
+            self.has_more = next_cursor is not None
+        self.endResetModel()
+        if first_page is None:
+            self.fetchMore()
+
+    def row_of(self, id_):
+        """Return the model row showing an item.
+
+        Args:
+            id_ (int): ID of the item.
+
+        Returns:
+            int: Row number, or None if the item is not fetched.
+        """
+        for row, values in enumerate(self.rows):
+            if values[0] == id_:
+                return row
+        return None
+
+    def apply_change(self, event: ChangeEvent) -> bool:
+        """Patch the fetched rows after an item was inserted, updated or deleted.
+
+        Updated rows keep their position so that the selection does not jump while counts change.
+
+        Args:
+            event (ChangeEvent): Change reported by the database handler.
+
+        Returns:
+            bool: True if the model was patched, False if it has to be reset instead.
+        """
+        if event.kind == ChangeEvent.RELOADED or not self.filter_manager.can_match_locally():
+            return False
+        row = self.row_of(event.id_)
+        if event.kind == ChangeEvent.DELETED or not self.filter_manager.matches(event.item_data):
+            if row is not None:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[row]
+                self.endRemoveRows()
+            return True
+
+        values = tuple(event.item_data.to_list())
+        if row is not None:
+            self.rows[row] = values
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+            return True
+
+        # Rows are in the sort order of the filters, like the pages they were fetched with
+        position = next((i for i, row_values in enumerate(self.rows)
+                         if self.filter_manager.precedes(values, row_values)), len(self.rows))
+        if position == len(self.rows) and self.has_more:
+            # The item sorts after the fetched rows and will arrive with a later page
+            return True
+        self.beginInsertRows(QModelIndex(), position, position)
+        self.rows.insert(position, values)
+        self.endInsertRows()
+        return True
+
+    def item_data(self, row: int) -> ItemData:
+        """Return the item shown in a row.
+
+        Args:
+            row (int): Row number in the model.
+
+        Returns:
+            ItemData: Item data of the row.
+        """
+        return ItemData.from_row(self.rows[row])
@@ -0,0 +1,149 @@
+import threading
+
+import pytest
+
+from backup import IncrementalBackup
+from database import DatabaseHandler
+from services import ItemData
+
+
+def test_restore_keeps_empty_text_fields(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        db_handler.insert_item_data(ItemData(group_name="", taste="", nicotine=0, volume=10, price=99.5,
+                                             code="", count=1))
+        db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=3, volume=30, price=150.0,
+                                             code="1", count=2))
+        backup = IncrementalBackup(db_handler, directory=str(tmp_path / "backup"))
+        backup.run()
+        # A change after the full backup goes into a delta
+        item_data = db_handler.retrieve_item_data_by_code("1")
+        item_data.taste = ""
+        db_handler.update_item_data(item_data)
+        backup.run()
+        expected = db_handler.retrieve_data_from_items()
+
+        db_handler.cursor.execute("DELETE FROM items;")
+        db_handler.conn.commit()
+        backup.restore()
+
+        assert db_handler.retrieve_data_from_items() == expected
+        assert db_handler.verify_group_summary() == []
+    finally:
+        db_handler.close_connection()
+
+
+def test_full_backup_runs_off_the_writer_thread(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=3, volume=30, price=150.0,
+                                             code="1", count=2))
+        backup = IncrementalBackup(db_handler, directory=str(tmp_path / "backup"))
+        outcome = {}
+
+        def run_backup():
+            try:
+                outcome['entry'] = backup.run(prune=False)
+            except Exception as error:
+                outcome['error'] = error
+
+        worker = threading.Thread(target=run_backup)
+        worker.start()
+        worker.join()
+
+        assert 'error' not in outcome
+        entry = outcome['entry']
+        assert entry['kind'] == IncrementalBackup.FULL and entry['rows'] == 1
+        assert backup.load_manifest() == [entry]
+        assert db_handler.retrieve_last_change_seq() == entry['seq']
+        db_handler.cursor.execute("SELECT COUNT(*) FROM items_changes;")
+        assert db_handler.cursor.fetchone()[0] == 1
+
+        backup.prune_journal(entry)
+        db_handler.cursor.execute("SELECT COUNT(*) FROM items_changes;")
+        assert db_handler.cursor.fetchone()[0] == 0
+    finally:
+        db_handler.close_connection()
+
+
+def test_chains_of_deltas_and_their_retention(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        backup = IncrementalBackup(db_handler, directory=str(tmp_path / "backup"), full_every=2, keep_chains=2)
+        kinds = []
+        for code in range(7):
+            db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10,
+                                                 price=99.5, code=str(code), count=1))
+            kinds.append(backup.run()['kind'])
+        assert backup.run() is None
+
+        assert kinds == ["full", "delta", "delta", "full", "delta", "delta", "full"]
+        entries = backup.load_manifest()
+        assert [entry['kind'] for entry in entries] == ["full", "delta", "delta", "full"]
+        assert sorted(path.name for path in (tmp_path / "backup").glob("*.csv")) == sorted(
+            entry['file'] for entry in entries)
+        # Deltas hold only the items changed since the previous backup
+        assert [entry['rows'] for entry in entries] == [4, 1, 1, 7]
+    finally:
+        db_handler.close_connection()
+
+
+def test_restore_replays_deletions(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        for code in range(3):
+            db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10,
+                                                 price=99.5, code=str(code), count=1))
+        backup = IncrementalBackup(db_handler, directory=str(tmp_path / "backup"))
+        backup.run()
+        db_handler.delete_data_from_items(db_handler.retrieve_item_data_by_code("1").id_)
+        db_handler.insert_item_data(ItemData(group_name="Mint", taste="mint", nicotine=0, volume=10,
+                                             price=99.5, code="1", count=2))
+        entry = backup.run()
+        expected = db_handler.retrieve_data_from_items()
+        db_handler.cursor.execute("DELETE FROM items;")
+        db_handler.conn.commit()
+
+        assert backup.restore() == entry
+        assert db_handler.retrieve_data_from_items() == expected
+    finally:
+        db_handler.close_connection()
+
+
+def test_backup_task_leaves_the_pruning_to_the_caller(tmp_path):
+    pytest.importorskip("PyQt5")
+    from PyQt5.QtCore import QCoreApplication
+    from workers import BackupTask
+
+    # The signal crosses threads, so it is delivered by the event loop
+    app = QCoreApplication.instance() or QCoreApplication([])
+
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10,
+                                             price=99.5, code="1", count=1))
+        task = BackupTask(IncrementalBackup(db_handler, directory=str(tmp_path / "backup")))
+        finished = []
+        task.signals.finished.connect(lambda completed, entry: finished.append((completed, entry)))
+        worker = threading.Thread(target=task.run)
+        worker.start()
+        worker.join()
+        app.processEvents()
+
+        [(completed, entry)] = finished
+        assert completed and entry['kind'] == IncrementalBackup.FULL
+        task.backup.prune_journal(entry)
+        db_handler.cursor.execute("SELECT COUNT(*) FROM items_changes;")
+        assert db_handler.cursor.fetchone()[0] == 0
+    finally:
+        db_handler.close_connection()
@@ -0,0 +1,35 @@
+import pytest
+
+from database import DatabaseHandler
+from services import ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10, price=99.5,
+                                         code="4820000000017", count=2))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def test_scans_sell_one_unit_until_the_stock_runs_out(db_handler):
+    assert db_handler.adjust_count_by_code("4820000000017", -1).count == 1
+    assert db_handler.adjust_count_by_code("4820000000017", -1).count == 0
+    assert db_handler.adjust_count_by_code("4820000000017", -1) is None
+    assert db_handler.retrieve_item_data_by_code("4820000000017").count == 0
+
+
+def test_unknown_codes_change_nothing(db_handler):
+    assert db_handler.retrieve_item_data_by_code("0000") is None
+    assert db_handler.adjust_count_by_code("0000", -1) is None
+    assert db_handler.retrieve_item_data_by_code("4820000000017").count == 2
+
+
+def test_code_lookups_use_the_unique_index(db_handler):
+    for sql in ("SELECT * FROM items WHERE code = ?;", "UPDATE items SET count = count + ? WHERE code = ?;"):
+        parameters = ("4820000000017",) if sql.startswith("SELECT") else (-1, "4820000000017")
+        db_handler.cursor.execute(f"EXPLAIN QUERY PLAN {sql}", parameters)
+        assert "USING INDEX sqlite_autoindex_items_1 (code=?)" in db_handler.cursor.fetchone()[3]
@@ -0,0 +1,38 @@
+from benchmark.generator import create_database, generate_rows
+from benchmark.suite import compare, read_cases, run_suite
+
+
+def test_generator_is_deterministic():
+    rows = list(generate_rows(50, groups=3, tastes=5, seed=1))
+
+    assert rows == list(generate_rows(50, groups=3, tastes=5, seed=1))
+    assert rows != list(generate_rows(50, groups=3, tastes=5, seed=2))
+    assert len({row[5] for row in rows}) == 50
+    assert len({row[0] for row in rows}) <= 3
+
+
+def test_building_the_cases_runs_no_page_query(tmp_path, monkeypatch):
+    db_handler = create_database(tmp_path / "items.db", 200, groups=3, tastes=5)
+    try:
+        calls = []
+        retrieve_items_page = db_handler.retrieve_items_page
+        monkeypatch.setattr(db_handler, "retrieve_items_page",
+                            lambda *arguments: calls.append(arguments) or retrieve_items_page(*arguments))
+        cases = {case.name: case for case in read_cases(db_handler, 200)}
+        assert calls == []
+
+        cases["retrieve_items_page[group,deep]"].measure(2)
+        # The cursor is read once, then one page per repetition
+        assert [arguments[1] for arguments in calls] == [50, 200, 200]
+    finally:
+        db_handler.close_connection()
+
+
+def test_suite_runs_the_selected_cases_and_compares_runs(tmp_path):
+    results = run_suite(200, groups=3, tastes=5, seed=0, repeat=1, data_dir=str(tmp_path), select="[ranges")
+
+    assert results['results'] and all("[ranges" in name for name in results['results'])
+    slower = {**results, 'results': {name: {**result, 'min': result['min'] * 2}
+                                     for name, result in results['results'].items()}}
+    assert compare(slower, results, threshold=0.2) == list(results['results'])
+    assert compare(results, slower, threshold=0.2) == []
@@ -0,0 +1,95 @@
+import pytest
+
+from cache import InventoryCache
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    for code, group_name in enumerate(["Fruit", "Fruit", "Mint"]):
+        db_handler.insert_item_data(ItemData(group_name=group_name, taste="apple", nicotine=0, volume=10,
+                                             price=99.5, code=str(code), count=1))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def set_count(db_handler, code, count):
+    item_data = db_handler.retrieve_item_data_by_code(code)
+    item_data.count = count
+    db_handler.update_item_data(item_data)
+
+
+def test_repeated_reads_are_served_from_the_cache(db_handler):
+    cache = InventoryCache(db_handler)
+    filter_manager = FilterManager(group_name="Fruit")
+    first = cache.retrieve_items_page(filter_manager, 10)
+
+    assert cache.retrieve_items_page(filter_manager.copy(), 10) is first
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_changes_drop_only_the_results_they_affect(db_handler):
+    cache = InventoryCache(db_handler)
+    fruit, mint = FilterManager(group_name="Fruit"), FilterManager(group_name="Mint")
+    cache.retrieve_items_page(fruit, 10)
+    cache.retrieve_items_page(mint, 10)
+    cache.retrieve_groups_names()
+
+    set_count(db_handler, "2", 5)
+
+    assert cache.stats()['invalidations'] == 2
+    assert cache.retrieve_items_page(fruit, 10)[0] == db_handler.retrieve_items_page(fruit, 10)[0]
+    assert cache.retrieve_items_page(mint, 10)[0] == db_handler.retrieve_items_page(mint, 10)[0]
+    assert cache.stats()['hits'] == 1
+
+
+def test_moving_an_item_between_groups_drops_both(db_handler):
+    cache = InventoryCache(db_handler)
+    fruit, mint = FilterManager(group_name="Fruit"), FilterManager(group_name="Mint")
+    cache.retrieve_items_page(fruit, 10)
+    cache.retrieve_items_page(mint, 10)
+    item_data = db_handler.retrieve_item_data_by_code("0")
+    item_data.group_name = "Mint"
+    db_handler.update_item_data(item_data)
+
+    assert cache.stats()['entries'] == 0
+    assert len(cache.retrieve_items_page(mint, 10)[0]) == 2
+
+
+def test_searches_and_bulk_changes_drop_everything(db_handler):
+    cache = InventoryCache(db_handler)
+    cache.retrieve_items_page(FilterManager(search_teste="apple"), 10)
+    cache.retrieve_items_page(FilterManager(group_name="Mint"), 10)
+    set_count(db_handler, "0", 3)
+    assert cache.stats()['entries'] == 1
+
+    cache.retrieve_items_page(FilterManager(group_name="Fruit"), 10)
+    db_handler.insert_item_datas([ItemData(group_name="Cola", taste="cola", nicotine=0, volume=10, price=1.0,
+                                           code="9", count=1)])
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_results_are_evicted(db_handler):
+    cache = InventoryCache(db_handler, max_entries=2)
+    for page_size in (1, 2, 1, 3):
+        cache.retrieve_items_page(FilterManager(), page_size)
+
+    assert cache.stats() == {'hits': 1, 'misses': 3, 'evictions': 1, 'invalidations': 0, 'entries': 2}
+    cache.retrieve_items_page(FilterManager(), 1)
+    assert cache.stats()['hits'] == 2
+
+
+def test_result_read_before_a_change_is_not_stored(db_handler):
+    cache = InventoryCache(db_handler)
+
+    def read_then_change():
+        value = db_handler.retrieve_groups_names()
+        set_count(db_handler, "0", 7)
+        return value
+
+    cache.load(('groups_names',), None, read_then_change)
+    assert cache.stats()['entries'] == 0
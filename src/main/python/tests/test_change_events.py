@@ -0,0 +1,70 @@
+import pytest
+
+from database import DatabaseHandler
+from services import ChangeEvent, FilterManager, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def new_item(code, count=1, group_name="Fruit", price=99.5):
+    return ItemData(group_name=group_name, taste="apple", nicotine=0, volume=10, price=price, code=code, count=count)
+
+
+def test_mutations_report_the_item_before_and_after(db_handler):
+    events = []
+    db_handler.add_change_listener(events.append)
+    db_handler.insert_item_data(new_item("1"))
+    item_data = db_handler.retrieve_item_data_by_code("1")
+    item_data.count = 5
+    db_handler.update_item_data(item_data)
+    db_handler.delete_data_from_items(item_data.id_)
+    db_handler.remove_change_listener(events.append)
+    db_handler.insert_item_data(new_item("2"))
+
+    assert [event.kind for event in events] == [ChangeEvent.INSERTED, ChangeEvent.UPDATED, ChangeEvent.DELETED]
+    inserted, updated, deleted = events
+    assert inserted.id_ == item_data.id_ and inserted.item_data.count == 1 and inserted.previous is None
+    assert (updated.previous.count, updated.item_data.count) == (1, 5)
+    assert deleted.item_data is None and deleted.previous.count == 5
+
+
+def test_matches_follows_the_filters():
+    item_data = new_item("1", count=0, price=150.0)
+
+    assert FilterManager(in_stock=False).matches(item_data)
+    assert not FilterManager().matches(item_data)
+    assert not FilterManager(in_stock=False, group_name="Mint").matches(item_data)
+    assert FilterManager(in_stock=False, group_names=["Mint", "Fruit"]).matches(item_data)
+    assert FilterManager(in_stock=False, ranges={'price': (100, 200)}).matches(item_data)
+    assert not FilterManager(in_stock=False, ranges={'price': (None, 100)}).matches(item_data)
+    assert FilterManager().can_match_locally() and not FilterManager(search_teste="x").can_match_locally()
+
+
+def test_table_model_patches_rows_in_sort_order(db_handler):
+    pytest.importorskip("PyQt5")
+    from table_model import ItemTableModel
+
+    for code, count in enumerate((9, 7, 5, 3)):
+        db_handler.insert_item_data(new_item(str(code), count))
+    model = ItemTableModel(db_handler, FilterManager(), ['No'] * 8, page_size=10)
+    model.reset()
+    db_handler.add_change_listener(lambda event: model.apply_change(event) or model.reset())
+
+    db_handler.insert_item_data(new_item("new", 6))
+    item_data = db_handler.retrieve_item_data_by_code("0")
+    item_data.count = 0
+    db_handler.update_item_data(item_data)
+    item_data = db_handler.retrieve_item_data_by_code("3")
+    item_data.count = 8
+    db_handler.update_item_data(item_data)
+
+    # Updated rows keep their place, new rows go where the page order puts them, unmatched rows leave
+    assert [row[6] for row in model.rows] == ["1", "new", "2", "3"]
+    assert [row[7] for row in model.rows] == [7, 6, 5, 8]
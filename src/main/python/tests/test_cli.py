@@ -0,0 +1,85 @@
+import cli
+
+
+def write_csv(path, lines):
+    path.write_text("\n".join(["group_name,taste,nicotine,volume,price,code,count"] + lines) + "\n",
+                    encoding='utf-8')
+    return path
+
+
+def test_import_counts_unparsable_rows_as_rejected(tmp_path, capsys):
+    csv_path = write_csv(tmp_path / "items.csv", ["Fruit,apple,0,10,99.5,1,3", "Fruit,berry,x,10,99.5,2,3"])
+
+    exit_code = cli.main(["--db", str(tmp_path / "items.db"), "import", str(csv_path)])
+
+    assert exit_code == cli.EXIT_PARTIAL
+    assert "accepted 1, rejected 1" in capsys.readouterr().out
+
+
+def test_import_of_valid_file_succeeds(tmp_path, capsys):
+    csv_path = write_csv(tmp_path / "items.csv", ["Fruit,apple,0,10,99.5,1,3"])
+
+    assert cli.main(["--db", str(tmp_path / "items.db"), "import", str(csv_path)]) == cli.EXIT_OK
+    assert "accepted 1, rejected 0" in capsys.readouterr().out
+
+
+def test_invalid_filter_arguments_are_usage_errors(tmp_path):
+    db_path = tmp_path / "items.db"
+    for arguments in (["query", "--sort", "bogus"],
+                      ["query", "--sort", "price:up"],
+                      ["query", "--min-price", "5", "--max-price", "1"],
+                      ["query", "--cursor", "not a cursor"],
+                      ["export", "--sort", "bogus"]):
+        assert cli.main(["--db", str(db_path)] + arguments) == cli.EXIT_USAGE, arguments
+    assert not db_path.exists()
+
+
+def test_cursor_of_other_filters_is_a_usage_error(tmp_path, capsys):
+    db_path = tmp_path / "items.db"
+    cli.main(["--db", str(db_path), "import", str(write_csv(tmp_path / "items.csv", [
+        f"Fruit,apple,0,10,99.5,{code},3" for code in range(3)]))])
+    cli.main(["--db", str(db_path), "query", "--page-size", "1"])
+    cursor = capsys.readouterr().err.split("next cursor: ")[1].strip()
+
+    assert cli.main(["--db", str(db_path), "query", "--cursor", cursor]) == cli.EXIT_OK
+    assert cli.main(["--db", str(db_path), "query", "--sort", "price,taste", "--cursor", cursor]) == cli.EXIT_USAGE
+
+
+def imported_db(tmp_path, capsys):
+    db_path = tmp_path / "items.db"
+    cli.main(["--db", str(db_path), "import", str(write_csv(tmp_path / "items.csv", [
+        "Fruit,apple,0,10,99.5,1,3", "Fruit,berry,0,30,150,2,0", "Mint,ice mint,6,10,120,3,5"]))])
+    capsys.readouterr()
+    return str(db_path)
+
+
+def test_query_streams_the_filtered_items(tmp_path, capsys):
+    db_path = imported_db(tmp_path, capsys)
+
+    assert cli.main(["--db", db_path, "query", "--in-stock", "--format", "tsv"]) == cli.EXIT_OK
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split("\t") == ["id", "group_name", "taste", "nicotine", "volume", "price", "code", "count"]
+    assert [line.split("\t")[6] for line in lines[1:]] == ["3", "1"]
+
+    cli.main(["--db", db_path, "query", "--group", "Fruit", "--group", "Mint", "--min-volume", "10",
+              "--max-volume", "10", "--sort", "price:desc", "--limit", "1"])
+    assert [line.split(",")[6] for line in capsys.readouterr().out.splitlines()[1:]] == ["3"]
+
+
+def test_export_backup_restore_and_summary(tmp_path, capsys):
+    db_path = imported_db(tmp_path, capsys)
+    backup_dir = str(tmp_path / "backup")
+
+    assert cli.main(["--db", db_path, "export", "--dir", str(tmp_path), "--search", "mint"]) == cli.EXIT_OK
+    with open(capsys.readouterr().out.strip(), encoding='utf-8') as file:
+        assert len(file.read().splitlines()) == 2
+    assert cli.main(["--db", db_path, "backup", "--dir", backup_dir]) == cli.EXIT_OK
+    assert capsys.readouterr().out.startswith("full ")
+    assert cli.main(["--db", db_path, "restore", "--dir", backup_dir]) == cli.EXIT_USAGE
+    assert cli.main(["--db", db_path, "restore", "--dir", backup_dir, "--yes"]) == cli.EXIT_OK
+    assert cli.main(["--db", db_path, "snapshot", "--dir", backup_dir]) == cli.EXIT_OK
+    capsys.readouterr()
+
+    assert cli.main(["--db", db_path, "summary"]) == cli.EXIT_OK
+    assert sorted(capsys.readouterr().out.splitlines()[1:]) == ["Fruit,2,1,3,298.5", "Mint,1,1,5,600.0"]
+    assert cli.main(["--db", db_path, "summary", "--verify"]) == cli.EXIT_OK
@@ -0,0 +1,56 @@
+from services import CSVImporter, CSVExporter
+
+
+def write_csv(path, text):
+    path.write_text(text, encoding='utf-8')
+    return CSVImporter(str(path))
+
+
+def test_columns_are_found_by_header_name(tmp_path):
+    importer = write_csv(tmp_path / "items.csv", "Count,Code,Price,Volume,Nicotine,Taste,Group\n"
+                                                 "3,A1,\"99,5\",30.0,6,apple,Fruit\n")
+
+    [chunk] = importer.iter_chunks()
+    [item_data] = chunk.rows
+    assert item_data.to_list() == [None, "Fruit", "apple", 6, 30, 99.5, "A1", 3]
+    assert chunk.errors == []
+
+
+def test_header_without_names_falls_back_to_the_positional_layout(tmp_path):
+    importer = write_csv(tmp_path / "items.csv", "a,b,c,d,e,f,g\nFruit,apple,6,30,99.5,A1,3\n")
+
+    assert [item_data.code for item_data in importer.get_in_item_data_list()] == ["A1"]
+    assert list(write_csv(tmp_path / "short.csv", "a,b\nFruit,apple\n").iter_chunks())[0].errors == [
+        (1, "header does not name the columns")]
+
+
+def test_bad_rows_are_reported_with_their_line(tmp_path):
+    importer = write_csv(tmp_path / "items.csv", "group,taste,nicotine,volume,price,code,count\n"
+                                                 "Fruit,apple,6,30,99.5,1,3\n"
+                                                 "Fruit,,6,30,99.5,2,3\n"
+                                                 "\n"
+                                                 "Fruit,berry,6.5,30,99.5,3,3\n"
+                                                 "Fruit,cola,6,30,99.5,4,-1\n"
+                                                 "Fruit,lime,6\n")
+
+    [chunk] = importer.iter_chunks()
+    assert [item_data.code for item_data in chunk.rows] == ["1"]
+    assert [(line, reason.split(":")[0]) for line, reason in chunk.errors] == [
+        (3, "empty taste"), (5, "invalid number"), (6, "negative number"), (7, "expected 7 columns, got 3")]
+
+
+def test_rows_are_streamed_in_chunks(tmp_path):
+    lines = [f"Fruit,apple,0,10,99.5,{code},1" for code in range(5)] + ["Fruit,apple,x,10,99.5,5,1"]
+    importer = write_csv(tmp_path / "items.csv", "group,taste,nicotine,volume,price,code,count\n" + "\n".join(lines))
+
+    chunks = list(importer.iter_chunks(chunk_size=2))
+    assert [(len(chunk.rows), len(chunk.errors)) for chunk in chunks] == [(2, 0), (2, 0), (1, 1)]
+
+
+def test_exported_files_import_back(tmp_path):
+    rows = [(1, "Fruit", "apple", 6, 30, 99.5, "A1", 3), (2, "Mint", "ice, mint", 0, 10, 150.0, "B2", 0)]
+    exporter = CSVExporter(rows, path_dir=str(tmp_path))
+    exporter.export_to_file()
+
+    assert [item_data.to_list()[1:] for item_data in CSVImporter(str(exporter.path_file)).get_in_item_data_list()] \
+        == [list(row[1:]) for row in rows]
@@ -0,0 +1,61 @@
+import csv
+
+import pytest
+
+from database import DatabaseHandler
+from services import CSVExporter, FilterManager
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES ('Fruit', 'apple', 0, 10, 99.5, ?, ?);",
+                                  [(str(code), code % 2) for code in range(2500)])
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.reader(file))
+
+
+def test_export_streams_the_filtered_rows(db_handler, tmp_path):
+    progress = []
+    filter_manager = FilterManager()
+    exporter = CSVExporter(db_handler.iter_item_rows(filter_manager), path_dir=str(tmp_path),
+                           total=db_handler.count_items(filter_manager), on_progress=lambda *step: progress.append(step))
+
+    assert exporter.export_to_file()
+    header, *rows = read_rows(exporter.path_file)
+    assert header[-1] == 'id' and len(rows) == 1250
+    assert {row[6] for row in rows} == {'1'}
+    assert progress == [(1000, 1250), (1250, 1250)]
+
+
+def test_cancelled_export_removes_the_file(db_handler, tmp_path):
+    exporter = CSVExporter(db_handler.iter_item_rows(), path_dir=str(tmp_path))
+    exporter.on_progress = lambda written, total: exporter.cancel()
+
+    assert not exporter.export_to_file()
+    assert not exporter.path_file.exists()
+    assert exporter.progress == 2000
+
+
+def test_export_task_reports_progress_and_the_file(db_handler, tmp_path):
+    pytest.importorskip("PyQt5")
+    from workers import ExportTask
+
+    task = ExportTask(db_handler, FilterManager(in_stock=False), path_dir=str(tmp_path))
+    progress, finished = [], []
+    task.signals.progress.connect(lambda written, total: progress.append((written, total)))
+    task.signals.finished.connect(lambda completed, path_file: finished.append((completed, path_file)))
+    task.run()
+
+    assert progress == [(1000, 2500), (2000, 2500), (2500, 2500)]
+    [(completed, path_file)] = finished
+    assert completed and len(read_rows(path_file)) == 2501
@@ -0,0 +1,90 @@
+import pytest
+
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?);",
+                                  [("Fruit", "apple", 3, 10, 99.5, "001", 2),
+                                   ("Fruit", "berry", 6, 30, 150.0, "002", 0),
+                                   ("Mint", "ice", 0, 10, 300.0, "003", 5),
+                                   ("Tobacco", "cuban", 12, 30, None, "004", 1)])
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def codes(rows):
+    return sorted(row[6] for row in rows)
+
+
+def test_parse_sort():
+    assert FilterManager.parse_sort("price:desc, count,taste:asc") == [('price', True), ('count', False),
+                                                                       ('taste', False)]
+    with pytest.raises(ValueError):
+        FilterManager.parse_sort("price:up")
+
+
+def test_set_sort_rejects_unknown_and_repeated_columns():
+    filter_manager = FilterManager()
+    with pytest.raises(ValueError):
+        filter_manager.set_sort([('colour', False)])
+    with pytest.raises(ValueError):
+        filter_manager.set_sort([('price', False), ('price', True)])
+    assert filter_manager.sort_order() == [('count', True), ('id', False)]
+
+
+def test_set_range_checks_and_lifts_bounds():
+    filter_manager = FilterManager()
+    with pytest.raises(ValueError):
+        filter_manager.set_range('taste', 1, 2)
+    with pytest.raises(ValueError):
+        filter_manager.set_range('price', 300, 100)
+    filter_manager.set_range('price', 100, None)
+    assert filter_manager.ranges == {'price': (100, None)}
+    filter_manager.set_range('price')
+    assert filter_manager.ranges == {}
+
+
+@pytest.mark.parametrize("text, ranges, search", [
+    ("price:100-300 apple", {'price': (100, 300)}, "apple"),
+    ("volume:10", {'volume': (10, 10)}, None),
+    ("nicotine:20- count:-5", {'nicotine': (20, None), 'count': (None, 5)}, None),
+    ("Price:9,5-12.5", {'price': (9.5, 12.5)}, None),
+    ("taste:1-2 price:5-1 code:", {}, "taste:1-2 price:5-1 code:"),
+])
+def test_set_search_text(text, ranges, search):
+    filter_manager = FilterManager(ranges={'count': (1, None)})
+    filter_manager.set_search_text(text)
+
+    assert filter_manager.ranges == ranges
+    assert filter_manager.search_taste == search
+
+
+def test_matches_groups_and_ranges():
+    filter_manager = FilterManager(in_stock=False, group_names=["Fruit", "Mint"], ranges={'price': (100, None)})
+    item_data = ItemData(group_name="Fruit", taste="berry", price=150.0, count=0)
+
+    assert filter_manager.matches(item_data)
+    assert not filter_manager.matches(ItemData(group_name="Tobacco", price=150.0))
+    assert not filter_manager.matches(ItemData(group_name="Mint", price=99.5))
+    assert not filter_manager.matches(ItemData(group_name="Mint", price=None))
+
+
+def test_queries_apply_groups_ranges_and_sort(db_handler):
+    filter_manager = FilterManager(in_stock=False, group_names=["Fruit", "Mint"], ranges={'volume': (10, 10)})
+    assert codes(db_handler.retrieve_items_where_filter_manager(filter_manager)) == ["001", "003"]
+
+    filter_manager = FilterManager(in_stock=False, ranges={'price': (None, 200)}, sort=[('price', True)])
+    rows = db_handler.retrieve_items_where_filter_manager(filter_manager)
+    assert [row[6] for row in rows] == ["002", "001"]
+
+    filter_manager = FilterManager(in_stock=False, sort=[('nicotine', True)])
+    rows = db_handler.retrieve_items_where_filter_manager(filter_manager)
+    assert [row[6] for row in rows] == ["004", "002", "001", "003"]
@@ -0,0 +1,43 @@
+import pytest
+
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    for code, (group_name, taste, count) in enumerate([("Fruit", "apple", 3), ("Fruit", "mint apple", 1),
+                                                       ("Fruit", "berry", 0), ("Mint", "mint", 5),
+                                                       ("Mint", "ice mint", 0), ("Cola", "cola", 0)]):
+        db_handler.insert_item_data(ItemData(group_name=group_name, taste=taste, nicotine=0, volume=10,
+                                             price=99.5, code=str(code), count=count))
+    yield db_handler
+    db_handler.close_connection()
+
+
+FILTERS = [FilterManager(), FilterManager(in_stock=False), FilterManager(search_teste="mint"),
+           FilterManager(in_stock=False, search_teste="apple")]
+
+
+def test_groups_are_listed_by_the_in_stock_filter(db_handler):
+    facets, total = db_handler.retrieve_group_facets_with_filters(FilterManager())
+    assert facets == [("Mint", 1), ("Fruit", 2)]
+    assert total == 3
+
+    facets, total = db_handler.retrieve_group_facets_with_filters(FilterManager(in_stock=False, search_teste="mint"))
+    assert dict(facets) == {"Mint": 2, "Fruit": 1, "Cola": 0}
+    assert total == 3
+
+
+@pytest.mark.parametrize("filter_manager", FILTERS, ids=str)
+def test_facets_match_the_per_group_queries(db_handler, filter_manager):
+    facets, total = db_handler.retrieve_group_facets_with_filters(filter_manager)
+
+    group_names = [row[0] for row in db_handler.retrieve_groups_names_with_filters(filter_manager)]
+    assert sorted(group_name for group_name, _ in facets) == sorted(group_names)
+    for group_name, row_count in facets:
+        assert row_count == db_handler.retrieve_count_in_group_with_filters(group_name, filter_manager)
+    assert total == len(db_handler.retrieve_items_where_filter_manager(filter_manager))
@@ -0,0 +1,50 @@
+import pytest
+
+from database import DatabaseHandler
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def insert(db_handler, group_name, code, price=3.0, count=2):
+    db_handler.cursor.execute("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                              "VALUES (?, 'taste', 0, 10, ?, ?, ?);", (group_name, price, code, count))
+    db_handler.conn.commit()
+    return db_handler.cursor.lastrowid
+
+
+def test_triggers_follow_inserts_updates_and_deletes(db_handler):
+    first = insert(db_handler, "Fruit", "1")
+    insert(db_handler, "Fruit", "2", price=1.5, count=0)
+    insert(db_handler, "Mint", "3", price=10.0, count=1)
+    db_handler.adjust_count(first, 3)
+    db_handler.delete_data_from_items(3)
+
+    assert db_handler.retrieve_group_summaries() == [("Fruit", 2, 1, 5, 15.0)]
+    assert db_handler.retrieve_inventory_totals() == (1, 2, 1, 5, 15.0)
+    assert db_handler.verify_group_summary() == []
+
+
+def test_null_group_is_summarised_once(db_handler):
+    insert(db_handler, None, "1")
+    second = insert(db_handler, None, "2")
+    db_handler.delete_data_from_items(second)
+
+    assert db_handler.retrieve_group_summaries() == [("", 1, 1, 2, 6.0)]
+    assert db_handler.verify_group_summary() == []
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(db_handler):
+    insert(db_handler, "Fruit", "1")
+    db_handler.cursor.execute("UPDATE group_summary SET units = units + 1;")
+    db_handler.conn.commit()
+
+    assert db_handler.verify_group_summary() == [("Fruit", (1, 1, 3, 600), (1, 1, 2, 600))]
+    assert db_handler.rebuild_group_summary() == 1
+    assert db_handler.verify_group_summary() == []
@@ -0,0 +1,61 @@
+import sqlite3
+
+import pytest
+
+from database import DatabaseHandler
+from services import ItemData, ChangeEvent
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def item_datas(count, start=0):
+    for code in range(start, start + count):
+        yield ItemData(group_name="Fruit", taste=f"taste {code}", nicotine=0, volume=10, price=99.5,
+                       code=str(code), count=1)
+
+
+def count_from_other_connection(db_handler):
+    conn = sqlite3.connect(db_handler.db_name)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM items;").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_import_commits_once_and_rejects_only_bad_rows(db_handler):
+    events = []
+    db_handler.add_change_listener(events.append)
+    db_handler.insert_item_data(ItemData(group_name="Mint", taste="mint", nicotine=0, volume=10, price=1.0,
+                                         code="3", count=1))
+    events.clear()
+
+    result = db_handler.insert_item_datas(item_datas(5), chunk_size=2)
+
+    assert result.accepted == 4
+    assert [(data.code, "UNIQUE" in reason) for data, reason in result.rejected] == [("3", True)]
+    assert count_from_other_connection(db_handler) == 5
+    assert [event.kind for event in events] == [ChangeEvent.RELOADED]
+
+
+def test_failing_source_imports_nothing(db_handler):
+    def failing_item_datas():
+        yield from item_datas(5)
+        raise ValueError("broken file")
+
+    events = []
+    db_handler.add_change_listener(events.append)
+    with pytest.raises(ValueError):
+        db_handler.insert_item_datas(failing_item_datas(), chunk_size=2)
+
+    assert count_from_other_connection(db_handler) == 0
+    assert not db_handler.conn.in_transaction
+    assert events == []
+    # The writer is usable again afterwards
+    assert db_handler.insert_item_datas(item_datas(1)).accepted == 1
@@ -0,0 +1,40 @@
+import pytest
+
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+
+ROW = (4, "Fruit", "apple", 6, 30, 99.5, "A1", 3)
+
+
+def test_item_data_has_no_instance_dict():
+    item_data = ItemData(*ROW)
+
+    assert not hasattr(item_data, '__dict__')
+    with pytest.raises(AttributeError):
+        item_data.colour = "red"
+
+
+def test_from_row_matches_the_constructor():
+    assert ItemData.from_row(ROW).to_list() == ItemData(*ROW).to_list() == list(ROW)
+
+
+def test_read_paths_build_item_data_from_rows(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    try:
+        db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                      "VALUES ('Fruit', 'apple', 0, 10, 99.5, ?, ?);",
+                                      [(str(code), code % 3) for code in range(2500)])
+        db_handler.conn.commit()
+
+        assert [item_data.to_list() for item_data in db_handler.retrieve_all_item_data()] == \
+            [list(row) for row in db_handler.retrieve_data_from_items()]
+        filter_manager = FilterManager()
+        assert [item_data.to_list() for item_data in db_handler.iter_item_data(filter_manager, batch_size=7)] == \
+            [list(row) for row in db_handler.retrieve_items_where_filter_manager(filter_manager)]
+        assert db_handler.count_items(filter_manager) == len(db_handler.retrieve_item_data_with_filters(filter_manager))
+        # The shared cursor is not used by the row factory
+        assert db_handler.cursor.row_factory is None
+    finally:
+        db_handler.close_connection()
@@ -0,0 +1,119 @@
+import random
+
+import pytest
+
+from database import DatabaseHandler
+from query import decode_cursor, encode_cursor
+from services import FilterManager, SORT_COLUMNS
+
+NULLABLE_COLUMNS = ('group_name', 'taste', 'nicotine', 'volume', 'price', 'code')
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    generator = random.Random(0)
+    rows = []
+    for index in range(300):
+        row = [generator.choice(["Fruit", "Mint", "Tobacco"]),
+               generator.choice(["apple", "berry", "cola", "lime"]),
+               generator.choice((0, 3, 6)),
+               generator.choice((10, 30)),
+               generator.choice((99.5, 150.0, 300.0)),
+               f"{index:05d}",
+               generator.randint(0, 3)]
+        # Every nullable column is NULL in about one row in five
+        for position, column in enumerate(NULLABLE_COLUMNS):
+            if generator.random() < 0.2:
+                row[position] = None
+        rows.append(row)
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES (?, ?, ?, ?, ?, ?, ?);", rows)
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def page_through(db_handler, filter_manager, page_size):
+    rows = []
+    cursor = None
+    while True:
+        page, cursor = db_handler.retrieve_items_page(filter_manager, page_size, cursor)
+        rows += page
+        if cursor is None:
+            return rows
+
+
+SORTS = [[(column, descending)] for column in NULLABLE_COLUMNS for descending in (False, True)] + [
+    [('group_name', False), ('taste', False)],
+    [('group_name', True), ('price', False), ('nicotine', True)],
+    [('volume', False), ('code', True)],
+]
+
+
+@pytest.mark.parametrize('sort', SORTS, ids=str)
+@pytest.mark.parametrize('page_size', [1, 7, 50])
+def test_pages_cover_every_row_with_nulls(db_handler, sort, page_size):
+    filter_manager = FilterManager(in_stock=False, sort=sort)
+    expected = db_handler.retrieve_items_where_filter_manager(filter_manager)
+
+    assert page_through(db_handler, filter_manager, page_size) == expected
+
+
+@pytest.mark.parametrize('sort', SORTS, ids=str)
+def test_precedes_matches_sql_order(db_handler, sort):
+    filter_manager = FilterManager(in_stock=False, sort=sort)
+    rows = db_handler.retrieve_items_where_filter_manager(filter_manager)
+
+    for row, next_row in zip(rows, rows[1:]):
+        assert filter_manager.precedes(row, next_row)
+        assert not filter_manager.precedes(next_row, row)
+
+
+def test_sort_columns_cover_nullable_columns():
+    assert set(NULLABLE_COLUMNS) <= set(SORT_COLUMNS)
+
+
+@pytest.mark.parametrize("column", ['group_name', 'taste', 'code', 'nicotine', 'volume', 'price', 'count'])
+def test_deep_pages_seek_an_index(db_handler, column):
+    filter_manager = FilterManager(in_stock=False)
+    filter_manager.set_sort([(column, False)])
+    page, cursor = db_handler.retrieve_items_page(filter_manager, 100)
+    after = [page[-1][SORT_COLUMNS.index(column)], page[-1][0]]
+    compiler = db_handler.query_compiler
+    for tied, beyond in compiler.keyset_parts(filter_manager, after):
+        retrieve_query, values = compiler.compile_items_keyset(filter_manager, 100, after, tied, beyond)
+        db_handler.cursor.execute(f"EXPLAIN QUERY PLAN {retrieve_query}", values)
+        plan = " ".join(row[3] for row in db_handler.cursor.fetchall())
+        assert plan.startswith("SEARCH items USING") and "TEMP B-TREE" not in plan, plan
+
+
+FILTERS = [FilterManager(), FilterManager(group_name="Fruit"), FilterManager(in_stock=False, search_teste="berry"),
+           FilterManager(search_teste="apple", sort=[('price', False)])]
+
+
+@pytest.mark.parametrize('filter_manager', FILTERS, ids=str)
+def test_pages_follow_the_full_result_of_the_filters(db_handler, filter_manager):
+    expected = db_handler.retrieve_items_where_filter_manager(filter_manager)
+
+    assert expected
+    assert page_through(db_handler, filter_manager, 9) == expected
+
+
+def test_cursors_are_opaque_and_checked(db_handler):
+    assert decode_cursor(encode_cursor(['key', 3, None, "é"])) == ['key', 3, None, "é"]
+    for cursor in ("not a cursor", encode_cursor({'key': 1}), encode_cursor([])):
+        with pytest.raises(ValueError):
+            decode_cursor(cursor)
+
+    _, key_cursor = db_handler.retrieve_items_page(FilterManager(), 5)
+    _, offset_cursor = db_handler.retrieve_items_page(FilterManager(search_teste="apple"), 5)
+    assert decode_cursor(offset_cursor) == ['offset', 5]
+    with pytest.raises(ValueError):
+        db_handler.retrieve_items_page(FilterManager(search_teste="apple"), 5, key_cursor)
+    with pytest.raises(ValueError):
+        db_handler.retrieve_items_page(FilterManager(), 5, offset_cursor)
+    with pytest.raises(ValueError):
+        db_handler.retrieve_items_page(FilterManager(sort=[('price', False), ('taste', False)]), 5, key_cursor)
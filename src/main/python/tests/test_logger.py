@@ -0,0 +1,54 @@
+import pytest
+
+from logger import LogWriter
+
+
+@pytest.fixture
+def writer(tmp_path):
+    writer = LogWriter(directory=str(tmp_path / "log"), max_bytes=100, flush_interval=0.01)
+    writer.start()
+    yield writer
+    writer.stop()
+
+
+def test_lines_are_written_in_order_on_flush(writer):
+    for number in range(3):
+        writer.put("18.10.2026", f"line {number}")
+    writer.flush(5)
+
+    assert writer.path_for("18.10.2026", 0).read_text(encoding="utf-8") == "line 0\nline 1\nline 2\n"
+
+
+def test_files_rotate_by_size_and_date(writer):
+    line = "x" * 39
+    for _ in range(5):
+        writer.put("18.10.2026", line)
+    writer.put("19.10.2026", line)
+    writer.flush(5)
+
+    # A file is rotated once it reaches max_bytes, so it may end with the line crossing the limit
+    assert writer.path_for("18.10.2026", 0).read_text(encoding="utf-8") == f"{line}\n" * 3
+    assert writer.path_for("18.10.2026", 1).read_text(encoding="utf-8") == f"{line}\n" * 2
+    assert writer.path_for("19.10.2026", 0).read_text(encoding="utf-8") == f"{line}\n"
+
+
+def test_rotation_continues_after_a_restart(tmp_path):
+    for _ in range(2):
+        writer = LogWriter(directory=str(tmp_path / "log"), max_bytes=10, flush_interval=0.01)
+        writer.start()
+        writer.put("18.10.2026", "0123456789")
+        writer.stop()
+
+    assert sorted(path.name for path in (tmp_path / "log").iterdir()) == ["18.10.2026.1.txt", "18.10.2026.txt"]
+
+
+def test_write_errors_do_not_stop_the_writer(tmp_path):
+    (tmp_path / "log").write_text("not a directory")
+    writer = LogWriter(directory=str(tmp_path / "log"), flush_interval=0.01)
+    writer.start()
+    writer.put("18.10.2026", "lost")
+    writer.flush(5)
+
+    assert writer.is_alive()
+    writer.stop()
+    assert not writer.is_alive()
@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from migrations import MIGRATIONS, migrate, get_schema_version
+
+
+def index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index';")}
+
+
+def test_fresh_database_is_migrated_to_the_latest_version(tmp_path):
+    conn = sqlite3.connect(tmp_path / "items.db")
+    try:
+        assert migrate(conn) == len(MIGRATIONS)
+        assert {"idx_items_count_id_taste", "idx_items_group_name_count_id_taste"} <= index_names(conn)
+        # Migrating again changes nothing
+        assert migrate(conn) == len(MIGRATIONS)
+    finally:
+        conn.close()
+
+
+def test_database_of_the_original_schema_keeps_its_items(tmp_path):
+    conn = sqlite3.connect(tmp_path / "items.db")
+    try:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, group_name TEXT, taste TEXT, nicotine INTEGER, "
+                     "volume INTEGER, price REAL, code TEXT UNIQUE, count INTEGER);")
+        conn.execute("INSERT INTO items VALUES (7, 'Fruit', 'apple', 3, 30, 150.0, '1', 2);")
+        conn.commit()
+
+        assert migrate(conn) == len(MIGRATIONS)
+        assert conn.execute("SELECT * FROM items;").fetchall() == [(7, 'Fruit', 'apple', 3, 30, 150.0, '1', 2)]
+        assert conn.execute("SELECT group_name, units FROM group_summary;").fetchall() == [('Fruit', 2)]
+    finally:
+        conn.close()
+
+
+def test_newer_schema_is_refused(tmp_path):
+    conn = sqlite3.connect(tmp_path / "items.db")
+    try:
+        conn.execute(f"PRAGMA user_version = {len(MIGRATIONS) + 1};")
+        with pytest.raises(RuntimeError):
+            migrate(conn)
+    finally:
+        conn.close()
+
+
+def test_failing_migration_is_rolled_back(tmp_path, monkeypatch):
+    def broken_migration(cursor):
+        cursor.execute("CREATE TABLE half_done (id INTEGER);")
+        raise sqlite3.OperationalError("broken")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS + [broken_migration])
+    conn = sqlite3.connect(tmp_path / "items.db")
+    try:
+        with pytest.raises(sqlite3.OperationalError):
+            migrate(conn)
+        # Every migration before the broken one stays applied
+        assert get_schema_version(conn) == len(MIGRATIONS)
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'half_done';").fetchall() == []
+    finally:
+        conn.close()
@@ -0,0 +1,42 @@
+from query import QueryCompiler
+from services import FilterManager
+
+
+def test_same_filters_with_other_values_reuse_the_template():
+    compiler = QueryCompiler(full_text_search=True)
+    first_sql, first_values = compiler.compile_items(FilterManager(group_name="Fruit", search_teste="apple"))
+    second_sql, second_values = compiler.compile_items(FilterManager(group_name="Mint", search_teste="ice"))
+
+    assert first_sql == second_sql
+    assert first_values == ('"apple"*', 'Fruit')
+    assert second_values == ('"ice"*', 'Mint')
+    assert compiler.stats() == {'hits': 1, 'misses': 1, 'templates': 1}
+
+
+def test_other_active_filters_build_other_templates():
+    compiler = QueryCompiler()
+    filter_managers = [FilterManager(), FilterManager(in_stock=False), FilterManager(group_name="Fruit"),
+                       FilterManager(search_teste="apple"), FilterManager(ranges={'price': (1, 5)}),
+                       FilterManager(ranges={'price': (1, None)}), FilterManager(group_names=["A", "B"]),
+                       FilterManager(sort=[('price', True)])]
+    sqls = {compiler.compile_items(filter_manager)[0] for filter_manager in filter_managers}
+
+    assert len(sqls) == len(filter_managers)
+    assert compiler.stats() == {'hits': 0, 'misses': len(filter_managers), 'templates': len(filter_managers)}
+
+
+def test_values_are_bound_rather_than_spliced():
+    compiler = QueryCompiler()
+    text = "x'; DROP TABLE items; --"
+    sql, values = compiler.compile_items(FilterManager(group_name=text, search_teste=text))
+
+    assert text not in sql
+    assert values == (text, f"%{text}%")
+
+
+def test_like_fallback_without_words():
+    compiler = QueryCompiler(full_text_search=True)
+
+    assert compiler.search_mode(None) is None
+    assert compiler.search_mode("apple") == 'fts'
+    assert compiler.search_mode("  ") == 'like'
@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+
+import pytest
+
+from database import DatabaseHandler
+from services import ItemData
+from setting import Settings
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10, price=99.5,
+                                         code="1", count=1))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def test_writer_uses_the_configured_pragmas(db_handler):
+    settings = Settings()
+
+    assert db_handler.conn.execute("PRAGMA journal_mode;").fetchone()[0] == settings.db_journal_mode.lower()
+    assert db_handler.conn.execute("PRAGMA busy_timeout;").fetchone()[0] == settings.db_busy_timeout_ms
+    assert db_handler.conn.execute("PRAGMA cache_size;").fetchone()[0] == -settings.db_cache_size_kib
+
+
+def test_readers_are_read_only(db_handler):
+    with db_handler.reader() as reader:
+        assert reader.retrieve_item_data_by_code("1").taste == "apple"
+        with pytest.raises(sqlite3.OperationalError):
+            reader.cursor.execute("DELETE FROM items;")
+
+
+def test_reader_keeps_its_snapshot_while_the_writer_commits(db_handler):
+    with db_handler.reader() as reader, reader.read_transaction():
+        assert reader.count_items() == 1
+        db_handler.insert_item_data(ItemData(group_name="Fruit", taste="berry", nicotine=0, volume=10,
+                                             price=99.5, code="2", count=1))
+        assert reader.count_items() == 1
+    with db_handler.reader() as reader:
+        assert reader.count_items() == 2
+
+
+def test_pool_is_bounded_and_reuses_connections(db_handler):
+    size = db_handler.settings.db_read_connections
+    connections = [db_handler.acquire_read_connection() for _ in range(size)]
+    acquired = []
+    waiting = threading.Thread(target=lambda: acquired.append(db_handler.acquire_read_connection()))
+    waiting.start()
+    waiting.join(0.2)
+    assert acquired == [] and db_handler.read_connections == size
+
+    db_handler.release_read_connection(connections[0])
+    waiting.join(5)
+    assert acquired == [connections[0]]
+    for conn in acquired + connections[1:]:
+        db_handler.release_read_connection(conn)
+
+
+def test_in_memory_database_has_no_readers():
+    db_handler = DatabaseHandler(":memory:")
+    db_handler.connect()
+    try:
+        with pytest.raises(ValueError):
+            with db_handler.reader():
+                pass
+    finally:
+        db_handler.close_connection()
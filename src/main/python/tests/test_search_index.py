@@ -0,0 +1,63 @@
+import pytest
+
+from database import DatabaseHandler
+from query import to_fts_query
+from services import FilterManager, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    for code, (group_name, taste) in enumerate([("Fruit", "Green Apple"), ("Fruit", "Crème brûlée"),
+                                                ("Mint", "Ice mint"), ("Tobacco", "Cuban \"Gold\"")]):
+        db_handler.insert_item_data(ItemData(group_name=group_name, taste=taste, nicotine=0, volume=10,
+                                             price=99.5, code=f"40{code}", count=1))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def search(db_handler, text):
+    rows = db_handler.retrieve_items_where_filter_manager(FilterManager(search_teste=text))
+    return sorted(row[2] for row in rows)
+
+
+def test_fts_query_matches_every_word_as_a_prefix():
+    assert to_fts_query("green app") == '"green"* "app"*'
+    assert to_fts_query('say "hi"') == '"say"* """hi"""*'
+    assert to_fts_query("   ") is None
+
+
+def test_search_goes_through_the_index(db_handler):
+    assert db_handler.query_compiler.full_text_search
+    assert db_handler.query_compiler.search_mode("apple") == 'fts'
+    assert search(db_handler, "app") == ["Green Apple"]
+    assert search(db_handler, "apple green") == ["Green Apple"]
+    # Group names and codes are indexed as well as the taste
+    assert search(db_handler, "mint") == ["Ice mint"]
+    assert search(db_handler, "fruit") == ["Crème brûlée", "Green Apple"]
+    assert search(db_handler, "401") == ["Crème brûlée"]
+    # Diacritics and quotes are matched as typed by people
+    assert search(db_handler, "creme brulee") == ["Crème brûlée"]
+    assert search(db_handler, '"gold"') == ['Cuban "Gold"']
+
+
+def test_index_follows_updates_and_deletes(db_handler):
+    item_data = db_handler.retrieve_item_data_by_code("400")
+    item_data.taste = "Red berry"
+    db_handler.update_item_data(item_data)
+    db_handler.delete_data_from_items(db_handler.retrieve_item_data_by_code("402").id_)
+
+    assert search(db_handler, "apple") == []
+    assert search(db_handler, "berry") == ["Red berry"]
+    assert search(db_handler, "mint") == []
+    db_handler.cursor.execute("INSERT INTO items_fts (items_fts) VALUES ('integrity-check');")
+
+
+def test_like_fallback_finds_the_same_tastes(db_handler):
+    expected = {text: search(db_handler, text) for text in ("apple", "Ice", "brûlée")}
+    db_handler.query_compiler.full_text_search = False
+
+    assert db_handler.query_compiler.search_mode("apple") == 'like'
+    assert {text: search(db_handler, text) for text in expected} == expected
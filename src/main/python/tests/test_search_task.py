@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from cache import InventoryCache
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+from workers import SearchTask
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    for code, (group_name, taste) in enumerate([("Fruit", "apple"), ("Fruit", "mint apple"), ("Mint", "ice mint")]):
+        db_handler.insert_item_data(ItemData(group_name=group_name, taste=taste, nicotine=0, volume=10,
+                                             price=99.5, code=str(code), count=1))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def run_task(task):
+    results = []
+    task.signals.finished.connect(lambda *arguments: results.append(arguments))
+    task.run()
+    return results
+
+
+@pytest.mark.parametrize("with_cache", [False, True])
+def test_search_returns_the_first_page_and_facets(db_handler, with_cache):
+    filter_manager = FilterManager(search_teste="mint")
+    cache = InventoryCache(db_handler) if with_cache else None
+
+    results = run_task(SearchTask(db_handler, filter_manager, 1, generation=7, cache=cache))
+
+    assert len(results) == 1
+    generation, (rows, next_cursor), facets, total = results[0]
+    assert generation == 7
+    assert rows == db_handler.retrieve_items_page(filter_manager, 1)[0]
+    assert db_handler.retrieve_items_page(filter_manager, 1, next_cursor)[1] is None
+    assert (facets, total) == db_handler.retrieve_group_facets_with_filters(filter_manager)
+
+
+def test_cancelled_search_reports_nothing(db_handler):
+    task = SearchTask(db_handler, FilterManager(search_teste="mint"), 10, generation=1)
+    task.cancel()
+
+    assert run_task(task) == []
@@ -0,0 +1,73 @@
+import sqlite3
+import time
+
+import pytest
+
+from backup import DatabaseSnapshot
+from database import DatabaseHandler
+from migrations import MIGRATIONS, get_schema_version
+from services import ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES ('Fruit', ?, 0, 10, 99.5, ?, 1);",
+                                  [("apple " * 20, str(code)) for code in range(2000)])
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def test_snapshot_is_a_complete_database(db_handler, tmp_path):
+    progress = []
+    snapshot = DatabaseSnapshot(db_handler, directory=str(tmp_path / "backup"), pages_per_step=16, step_sleep=0)
+    path = snapshot.run(on_progress=lambda copied, total: progress.append((copied, total)))
+
+    conn = sqlite3.connect(path)
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM items;").fetchone()[0] == 2000
+        assert get_schema_version(conn) == len(MIGRATIONS)
+        assert conn.execute("PRAGMA integrity_check;").fetchone()[0] == "ok"
+    finally:
+        conn.close()
+    assert len(progress) > 1 and progress[-1][0] == progress[-1][1]
+    assert list((tmp_path / "backup").glob("*.part")) == []
+
+
+def test_writes_during_a_snapshot_are_not_blocked(db_handler, tmp_path):
+    written = []
+
+    def write_while_copying(copied, total):
+        # Every write from another connection restarts the copy, so only the first few steps write
+        if copied < total and len(written) < 3:
+            db_handler.insert_item_data(ItemData(group_name="Mint", taste="mint", nicotine=0, volume=10,
+                                                 price=1.0, code=f"new {len(written)}", count=1))
+            written.append(copied)
+
+    snapshot = DatabaseSnapshot(db_handler, directory=str(tmp_path / "backup"), pages_per_step=16, step_sleep=0)
+    path = snapshot.run(on_progress=write_while_copying)
+
+    conn = sqlite3.connect(path)
+    try:
+        # The copy restarted after the writes, so it holds all of them
+        count, = conn.execute("SELECT COUNT(*) FROM items;").fetchone()
+        assert count == 2003
+        assert conn.execute("PRAGMA integrity_check;").fetchone()[0] == "ok"
+    finally:
+        conn.close()
+    assert len(written) == 3
+
+
+def test_retention_keeps_the_newest_snapshots(db_handler, tmp_path):
+    snapshot = DatabaseSnapshot(db_handler, directory=str(tmp_path / "backup"), pages_per_step=-1, step_sleep=0,
+                                keep=2)
+    paths = []
+    for _ in range(3):
+        paths.append(snapshot.run())
+        time.sleep(0.01)
+
+    assert snapshot.list_snapshots() == paths[1:]
@@ -0,0 +1,48 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from startup import StartupProfile
+
+
+class ListLog:
+    def __init__(self):
+        self.lines = []
+
+    def add_log(self, log: str):
+        self.lines.append(log)
+
+
+def test_enabled_profile_reports_every_phase(capsys):
+    profile = StartupProfile(enabled=True)
+    profile.mark("imports")
+    profile.mark("window")
+    log = ListLog()
+    profile.report(log)
+
+    assert [phase for phase, _ in profile.phases] == ["imports", "window"]
+    assert [line.split(":")[0] for line in log.lines] == ["STARTUP imports", "STARTUP window", "STARTUP total"]
+    assert capsys.readouterr().err.splitlines() == log.lines
+
+
+def test_disabled_profile_records_nothing(capsys):
+    profile = StartupProfile(enabled=False)
+    profile.mark("imports")
+    profile.report(ListLog())
+
+    assert profile.phases == []
+    assert capsys.readouterr().err == ""
+
+
+def test_window_module_defers_handler_imports():
+    pytest.importorskip("PyQt5")
+    pytest.importorskip("fbs_runtime")
+    deferred = ("pyperclip", "webbrowser", "subprocess", "shutil")
+    code = f"import sys, view; print([name for name in {deferred!r} if name in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parent.parent,
+                            capture_output=True, text=True, check=True, env={**os.environ, "QT_QPA_PLATFORM": "offscreen"})
+
+    assert output.stdout.strip() == "[]"
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from database import DatabaseHandler
+from services import ChangeEvent, ItemData
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    for code, count in enumerate((5, 1)):
+        db_handler.insert_item_data(ItemData(group_name="Fruit", taste="apple", nicotine=0, volume=10,
+                                             price=99.5, code=str(code), count=count))
+    yield db_handler
+    db_handler.close_connection()
+
+
+def counts(db_handler):
+    return [row[7] for row in db_handler.retrieve_data_from_items()]
+
+
+def test_movements_are_guarded_one_by_one(db_handler):
+    events = []
+    db_handler.add_change_listener(events.append)
+
+    results = db_handler.apply_stock_movements([(1, -2), (2, -2), (1, -3), (1, -1), (3, 1)])
+
+    assert [result.count if result is not None else None for result in results] == [3, None, 0, None, None]
+    assert counts(db_handler) == [0, 1]
+    assert [(event.kind, event.previous.count, event.item_data.count) for event in events] == [
+        (ChangeEvent.UPDATED, 5, 3), (ChangeEvent.UPDATED, 3, 0)]
+
+
+def test_deltas_do_not_overwrite_changes_of_other_connections(db_handler):
+    other = sqlite3.connect(db_handler.db_name)
+    try:
+        other.execute("UPDATE items SET count = count + 10 WHERE id = 1;")
+        other.commit()
+    finally:
+        other.close()
+
+    assert db_handler.adjust_count(1, -1).count == 14
+
+
+def test_failed_batch_applies_nothing(db_handler):
+    with pytest.raises(sqlite3.Error):
+        db_handler.apply_stock_movements([(1, -1), (2, ["not a number"])])
+
+    assert counts(db_handler) == [5, 1]
+    assert not db_handler.conn.in_transaction
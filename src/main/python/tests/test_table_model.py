@@ -0,0 +1,68 @@
+import pytest
+
+pytest.importorskip("PyQt5")
+
+from PyQt5.QtCore import Qt
+
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+from table_model import ItemTableModel
+
+HEADERS = ['No', 'group', 'taste', 'nicotine', 'volume', 'price', 'cod', 'count']
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES ('Fruit', 'apple', 0, 10, 99.5, ?, ?);",
+                                  [(str(code), code % 4) for code in range(25)])
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def test_rows_are_fetched_a_page_at_a_time(db_handler):
+    model = ItemTableModel(db_handler, FilterManager(), HEADERS, page_size=10)
+    model.reset()
+    assert model.rowCount() == 10 and model.canFetchMore()
+
+    while model.canFetchMore():
+        model.fetchMore()
+
+    expected = db_handler.retrieve_items_where_filter_manager(FilterManager())
+    assert model.rows == expected
+    assert model.columnCount() == len(HEADERS)
+    assert model.headerData(2, Qt.Horizontal) == 'taste'
+    assert model.data(model.index(0, 7)) == str(expected[0][7])
+    assert model.item_data(0).code == expected[0][6]
+
+
+def test_reset_takes_a_page_fetched_elsewhere(db_handler):
+    model = ItemTableModel(db_handler, FilterManager(), HEADERS, page_size=10)
+    rows, next_cursor = db_handler.retrieve_items_page(FilterManager(), 10)
+    model.reset(rows, next_cursor)
+    assert model.rows == rows and model.canFetchMore()
+
+    model.fetchMore()
+    assert model.rows == db_handler.retrieve_items_page(FilterManager(), 20)[0]
+
+
+def test_set_data_replaces_one_cell(db_handler):
+    model = ItemTableModel(db_handler, FilterManager(), HEADERS, page_size=10)
+    model.reset()
+    index = model.index(0, 7)
+
+    assert model.setData(index, 42)
+    assert model.data(index) == '42'
+    assert not model.setData(index, 43, Qt.DisplayRole)
+
+
+def test_offset_pages_follow_the_full_result(db_handler):
+    expected = db_handler.retrieve_items_where_filter_manager(FilterManager())
+    pages = [db_handler.retrieve_items_page_where_filter_manager(FilterManager(), limit=7, offset=offset)
+             for offset in range(0, len(expected), 7)]
+
+    assert [row for page in pages for row in page] == expected
@@ -0,0 +1,76 @@
+import pytest
+
+from database import DatabaseHandler
+from services import FilterManager, ItemData
+from tracing import Histogram, QueryTracer, format_report, normalize_statement, percentile
+
+
+class ListLog:
+    def __init__(self):
+        self.lines = []
+
+    def add_log(self, log: str):
+        self.lines.append(log)
+
+
+@pytest.fixture
+def db_handler(tmp_path):
+    db_handler = DatabaseHandler(str(tmp_path / "items.db"))
+    db_handler.connect()
+    db_handler.create_tables()
+    db_handler.cursor.executemany("INSERT INTO items (group_name, taste, nicotine, volume, price, code, count) "
+                                  "VALUES ('Fruit', 'apple', 0, 10, 99.5, ?, 1);", [(str(code),) for code in range(30)])
+    db_handler.conn.commit()
+    yield db_handler
+    db_handler.close_connection()
+
+
+def test_statements_with_other_values_add_up():
+    assert normalize_statement("SELECT * FROM items\n  WHERE code = 'it''s' AND count > 10.5;") == \
+        "SELECT * FROM items WHERE code = ? AND count > ?;"
+
+
+def test_percentiles_come_from_the_buckets():
+    histogram = Histogram()
+    for elapsed_ms in (0.05, 0.2, 0.2, 3.0, 4000.0):
+        histogram.add(elapsed_ms)
+    histogram = histogram.to_dict()
+
+    assert histogram['count'] == 5 and histogram['max_ms'] == 4000.0
+    assert percentile(histogram, 0.5) == 0.25
+    assert percentile(histogram, 0.8) == 5
+    assert percentile(histogram, 1.0) == 4000.0
+
+
+def test_installed_tracer_times_methods_and_statements(db_handler):
+    tracer = QueryTracer(slow_ms=0, logger=ListLog())
+    tracer.install(db_handler)
+    db_handler.retrieve_data_from_items()
+    db_handler.retrieve_item_data_by_code("1")
+    db_handler.retrieve_item_data_by_code("2")
+    assert sum(1 for _ in db_handler.iter_item_rows(FilterManager())) == 30
+    with db_handler.reader() as reader:
+        reader.count_items()
+
+    snapshot = tracer.snapshot()
+    assert snapshot['methods']['retrieve_data_from_items']['rows'] == 30
+    assert snapshot['methods']['iter_item_rows']['rows'] == 30
+    assert snapshot['methods']['retrieve_item_data_by_code']['count'] == 2
+    assert snapshot['methods']['count_items']['count'] == 1
+    assert list(snapshot['methods']['retrieve_data_from_items']['call_sites'])[0].startswith("test_tracing.py:")
+    assert snapshot['statements']["SELECT * FROM items WHERE code = ?;"]['calls'] == 2
+    # Every slow statement is logged, with its plan the first time only
+    by_code = [line for line in tracer.logger.lines if "WHERE code = ?" in line]
+    assert len(by_code) == 2 and "PLAN:" in by_code[0] and "PLAN:" not in by_code[1]
+    report = format_report(snapshot, top=3)
+    assert "Top 3 statements by total time" in report and len(report.splitlines()) == 2 + 3 + 3 + 3
+
+
+def test_closing_a_traced_iterator_closes_its_cursor(db_handler):
+    QueryTracer().install(db_handler)
+    rows = db_handler.iter_item_rows(batch_size=5)
+    next(rows)
+    rows.close()
+
+    # An unfinished statement would keep the WAL from being truncated
+    db_handler.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
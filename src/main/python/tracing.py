@@ -0,0 +1,334 @@
+import bisect
+import functools
+import inspect
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from setting import Settings
+
+# Upper bounds, in milliseconds, of the histogram buckets; the last bucket is unbounded
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+# Plumbing of DatabaseHandler that is not worth timing, or that must not be wrapped
+NOT_TRACED = {'connect', 'configure_connection', 'is_in_memory', 'open_read_connection', 'acquire_read_connection',
+              'release_read_connection', 'reader', 'read_transaction', 'interrupt', 'add_change_listener',
+              'remove_change_listener', 'emit_change', 'emit_inserted', 'emit_updated', 'item_data_factory',
+              'close_connection'}
+
+LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+
+def normalize_statement(sql: str) -> str:
+    """Turn an expanded statement back into its template, so that calls with different values add up.
+
+    Args:
+        sql (str): Statement as reported by the trace callback, with its parameters inlined.
+
+    Returns:
+        str: Statement on one line with literals replaced by '?'.
+    """
+    return " ".join(LITERAL_PATTERN.sub("?", sql).split())
+
+
+class Histogram:
+    def __init__(self):
+        """Initialize a Histogram instance counting durations in the BUCKETS_MS buckets."""
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, elapsed_ms: float):
+        """Record one duration.
+
+        Args:
+            elapsed_ms (float): Duration in milliseconds.
+        """
+        self.buckets[bisect.bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def to_dict(self):
+        """Convert Histogram instance to a dictionary.
+
+        Returns:
+            Dict: Bucket counts, number of durations, their total and maximum.
+        """
+        return {'buckets': list(self.buckets), 'count': self.count, 'total_ms': self.total_ms, 'max_ms': self.max_ms}
+
+
+def percentile(histogram, fraction: float) -> float:
+    """Estimate a percentile from the buckets of a histogram dictionary.
+
+    Args:
+        histogram (Dict): Histogram as returned by Histogram.to_dict.
+        fraction (float): Percentile as a fraction, for example 0.95.
+
+    Returns:
+        float: Upper bound of the bucket holding the percentile, capped by the maximum.
+    """
+    rank = fraction * histogram['count']
+    seen = 0
+    for index, count in enumerate(histogram['buckets']):
+        seen += count
+        if count and seen >= rank:
+            return min(BUCKETS_MS[index], histogram['max_ms']) if index < len(BUCKETS_MS) else histogram['max_ms']
+    return 0.0
+
+
+class QueryTracer:
+    def __init__(self, slow_ms=None, logger=None):
+        """Initialize a QueryTracer instance.
+
+        Once installed on a DatabaseHandler, the tracer wraps its public methods to record their duration,
+        row count and call sites in per-method histograms, and receives every statement sent to SQLite
+        through the connection's trace callback. A statement runs until the next statement of the same
+        call or the end of the call, fetching included; that span is its duration. Statements slower than
+        slow_ms are logged once per template with their EXPLAIN QUERY PLAN.
+
+        Args:
+            slow_ms (float, optional): Duration from which a statement is logged as slow.
+                Defaults to Settings().trace_slow_ms.
+            logger (Logger, optional): Logger receiving the slow-query entries. Defaults to None.
+        """
+        self.slow_ms = slow_ms if slow_ms is not None else Settings().trace_slow_ms
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.methods = {}
+        self.call_sites = {}
+        self.rows = {}
+        self.statements = {}
+        self.explained = set()
+
+    def install(self, db_handler):
+        """Trace a connected DatabaseHandler. Readers it lends out are traced too.
+
+        Args:
+            db_handler (DatabaseHandler): Handler to be traced.
+        """
+        db_handler.tracer = self
+        db_handler.conn.set_trace_callback(self.on_statement)
+        for name, _ in inspect.getmembers(type(db_handler), inspect.isfunction):
+            if name.startswith('_') or name in NOT_TRACED:
+                continue
+            setattr(db_handler, name, self.wrap(db_handler, name, getattr(db_handler, name)))
+
+    def wrap(self, db_handler, name: str, method):
+        """Return a method recording every call of a DatabaseHandler method.
+
+        Args:
+            db_handler (DatabaseHandler): Handler the method belongs to.
+            name (str): Name of the method.
+            method (Callable): Bound method.
+
+        Returns:
+            Callable: Traced method.
+        """
+        @functools.wraps(method)
+        def traced(*args, **kwargs):
+            call_site = self.call_site()
+            call = self.start_call()
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+            except BaseException:
+                self.finish_call(db_handler, name, call_site, call, start, None)
+                raise
+            if inspect.isgenerator(result):
+                # The statements of an iterator run while it is consumed
+                self.remove_call(call)
+                return self.trace_iterator(db_handler, name, call_site, result)
+            rows = len(result) if isinstance(result, list) else None
+            self.finish_call(db_handler, name, call_site, call, start, rows)
+            return result
+
+        return traced
+
+    def trace_iterator(self, db_handler, name: str, call_site: str, iterator):
+        call = self.start_call()
+        start = time.perf_counter()
+        rows = 0
+        try:
+            for row in iterator:
+                rows += 1
+                yield row
+        finally:
+            self.finish_call(db_handler, name, call_site, call, start, rows)
+
+    def calls(self):
+        """Return the stack of traced calls running on the current thread.
+
+        Each entry is [statement running, its start time, (sql, elapsed_ms) pairs of the finished ones].
+
+        Returns:
+            List[List]: Calls, innermost last.
+        """
+        if not hasattr(self.local, 'calls'):
+            self.local.calls = []
+            self.local.explaining = False
+        return self.local.calls
+
+    def start_call(self):
+        call = [None, 0.0, []]
+        self.calls().append(call)
+        return call
+
+    def remove_call(self, call):
+        # Iterators may finish in any order, so the call is looked up rather than popped
+        calls = self.calls()
+        for index in range(len(calls) - 1, -1, -1):
+            if calls[index] is call:
+                del calls[index]
+                return
+
+    @staticmethod
+    def call_site() -> str:
+        """Return the first caller outside the database and tracing modules.
+
+        Returns:
+            str: Tag of the form file:line:function.
+        """
+        frame = sys._getframe(2)
+        while frame is not None and Path(frame.f_code.co_filename).name in ('database.py', 'tracing.py'):
+            frame = frame.f_back
+        if frame is None:
+            return "unknown"
+        return f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno}:{frame.f_code.co_name}"
+
+    def on_statement(self, sql: str):
+        """Trace callback of the connection, called by SQLite before every statement.
+
+        Args:
+            sql (str): Statement with its parameters inlined.
+        """
+        calls = self.calls()
+        # Statements starting with a comment run inside another one: a trigger or a virtual table such as FTS5
+        if self.local.explaining or sql.startswith("--"):
+            return
+        now = time.perf_counter()
+        if calls:
+            self.close_statement(calls[-1], now)
+            calls[-1][0] = sql
+            calls[-1][1] = now
+        else:
+            # Outside a traced method the statement is counted, but its duration is unknown
+            self.add_statement(normalize_statement(sql), None)
+
+    def close_statement(self, call, now: float):
+        if call[0] is not None:
+            call[2].append((call[0], (now - call[1]) * 1000))
+            call[0] = None
+
+    def add_statement(self, statement: str, elapsed_ms):
+        with self.lock:
+            totals = self.statements.setdefault(statement, {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+            totals['calls'] += 1
+            if elapsed_ms is not None:
+                totals['total_ms'] += elapsed_ms
+                totals['max_ms'] = max(totals['max_ms'], elapsed_ms)
+
+    def finish_call(self, db_handler, name: str, call_site: str, call, start: float, rows):
+        now = time.perf_counter()
+        self.remove_call(call)
+        self.close_statement(call, now)
+        with self.lock:
+            self.methods.setdefault(name, Histogram()).add((now - start) * 1000)
+            sites = self.call_sites.setdefault(name, {})
+            sites[call_site] = sites.get(call_site, 0) + 1
+            if rows is not None:
+                self.rows[name] = self.rows.get(name, 0) + rows
+        for sql, elapsed_ms in call[2]:
+            statement = normalize_statement(sql)
+            self.add_statement(statement, elapsed_ms)
+            if elapsed_ms >= self.slow_ms:
+                self.log_slow_statement(db_handler, name, call_site, statement, sql, elapsed_ms)
+
+    def log_slow_statement(self, db_handler, name: str, call_site: str, statement: str, sql: str, elapsed_ms: float):
+        with self.lock:
+            first = statement not in self.explained
+            self.explained.add(statement)
+        entry = f"SLOW QUERY {elapsed_ms:.1f} ms in {name} from {call_site}: {statement}"
+        if first and sql.lstrip().upper().startswith(EXPLAINABLE):
+            entry += f" | PLAN: {'; '.join(self.explain(db_handler, sql))}"
+        if self.logger is not None:
+            self.logger.add_log(entry)
+
+    def explain(self, db_handler, sql: str):
+        """Run EXPLAIN QUERY PLAN for a statement as it was executed.
+
+        Args:
+            db_handler (DatabaseHandler): Handler whose connection ran the statement.
+            sql (str): Statement with its parameters inlined.
+
+        Returns:
+            List[str]: Lines of the query plan.
+        """
+        self.calls()
+        self.local.explaining = True
+        try:
+            return [row[-1] for row in db_handler.conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        except Exception as err:
+            return [f"not available ({err})"]
+        finally:
+            self.local.explaining = False
+
+    def snapshot(self):
+        """Return everything recorded so far.
+
+        Returns:
+            Dict: JSON-serialisable statistics of the methods and statements.
+        """
+        with self.lock:
+            return {
+                'methods': {name: dict(histogram.to_dict(), rows=self.rows.get(name),
+                                       call_sites=dict(self.call_sites.get(name, {})))
+                            for name, histogram in self.methods.items()},
+                'statements': {statement: dict(totals) for statement, totals in self.statements.items()},
+            }
+
+    def save(self, path):
+        """Write the snapshot to a JSON file, for cli.py trace-dump.
+
+        Args:
+            path (str): Path of the JSON file.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+
+def format_report(snapshot, top: int = None) -> str:
+    """Format a tracer snapshot as the top statements by total time followed by the method histograms.
+
+    Args:
+        snapshot (Dict): Snapshot as returned by QueryTracer.snapshot.
+        top (int, optional): Number of statements and methods shown. Defaults to Settings().trace_top.
+
+    Returns:
+        str: Report as plain text.
+    """
+    top = top if top is not None else Settings().trace_top
+    lines = [f"Top {top} statements by total time",
+             f"{'total ms':>10} {'calls':>7} {'mean ms':>9} {'max ms':>9}  statement"]
+    statements = sorted(snapshot['statements'].items(), key=lambda item: item[1]['total_ms'], reverse=True)
+    for statement, totals in statements[:top]:
+        mean_ms = totals['total_ms'] / totals['calls'] if totals['calls'] else 0.0
+        lines.append(f"{totals['total_ms']:10.1f} {totals['calls']:7d} {mean_ms:9.2f} {totals['max_ms']:9.2f}  "
+                     f"{statement}")
+    lines += ["", f"Top {top} methods by total time",
+              f"{'total ms':>10} {'calls':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>9} {'rows':>9}  method (main call site)"]
+    methods = sorted(snapshot['methods'].items(), key=lambda item: item[1]['total_ms'], reverse=True)
+    for name, histogram in methods[:top]:
+        call_site = max(histogram['call_sites'].items(), key=lambda item: item[1])[0] if histogram['call_sites'] else ""
+        rows = histogram['rows'] if histogram['rows'] is not None else "-"
+        lines.append(f"{histogram['total_ms']:10.1f} {histogram['count']:7d} {percentile(histogram, 0.5):8.2f} "
+                     f"{percentile(histogram, 0.95):8.2f} {histogram['max_ms']:9.2f} {rows:>9}  {name} ({call_site})")
+    return "\n".join(lines)
@@ -1,24 +1,28 @@
 import os
-import shutil
-import subprocess
 import sys
-import webbrowser
+from datetime import datetime
 
-import pyperclip
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QThreadPool
 
-from PyQt5.QtGui import QStandardItem, QStandardItemModel, QIntValidator, QKeySequence
-from PyQt5.QtWidgets import QDialog, QApplication, QWidget, QHeaderView, QFileDialog, QMainWindow, QShortcut
+from PyQt5.QtGui import QIntValidator, QKeySequence
+from PyQt5.QtWidgets import QDialog, QApplication, QWidget, QHeaderView, QFileDialog, QMainWindow, QShortcut, \
+    QProgressDialog, QTableWidgetItem
 from PyQt5 import QtWidgets
 from fbs_runtime.application_context.PyQt5 import ApplicationContext
 
+from backup import IncrementalBackup, DatabaseSnapshot
+from cache import InventoryCache
 from database import DatabaseHandler
 from PyQt5.uic import loadUi
 
-from services import ItemData, FilterManager, CSVImporter, CSVExporter
+from services import ItemData, FilterManager, CSVImporter, ChangeEvent, SORT_COLUMNS
+from table_model import ItemTableModel
+from workers import SearchTask, ExportTask, BackupTask, SnapshotTask
 from language import Language
 from setting import Settings
 from logger import Logger
+from startup import startup_profile
+from tracing import QueryTracer
 from style import Theme
 
 
@@ -29,9 +33,12 @@ class MainWindow(QMainWindow):
         # Loads the UI from a file using appctxt and sets up event connections
         super(MainWindow, self).__init__()
         loadUi(appctxt.get_resource("main.ui"), self)
+        startup_profile.mark("loadUi")
         self.language = Language(Settings().language)
         self.logger = Logger()
         self.db_handler = db_handler
+        # Registered before on_db_change, so stale results are dropped before the window re-reads them
+        self.cache = InventoryCache(db_handler)
         self.filter_manager = FilterManager()
         self.appctxt = appctxt
         self.setFixedHeight(975)
@@ -42,15 +49,22 @@ class MainWindow(QMainWindow):
         self.init_tableview()
         self.init_shortcuts()
         self.init_under_tableview_btns()
+        self.init_search()
+        self.init_scan_mode()
+        self.init_stock_movements()
+        self.init_snapshots()
+        self.init_dashboard()
+        self.db_handler.add_change_listener(self.on_db_change)
 
         self.group_name_comboBox.currentIndexChanged.connect(self.on_combo_selection_change)
         self.search_edit.textChanged.connect(self.on_search_edit_changed)
-        self.show_group_name_comboBox()
         self.update_language()
 
         self.setStyleSheet(Theme(Settings().theme).get_theme())
 
     def init_windows(self):
+        self.export_tasks = []
+        self.backup_tasks = []
         self.window_import_csv = None
         self.window_item = None
         self.window_setting = None
@@ -62,7 +76,7 @@ class MainWindow(QMainWindow):
         self.actionImport_CSV.triggered.connect(self.press_import_csv)
         self.actionExport_All.triggered.connect(self.press_export_all_csv)
         self.actionExport_current_table.triggered.connect(self.press_export_table_csv)
-        self.github_btn.clicked.connect(lambda: webbrowser.open("https://github.com/KovalchukValentin"))
+        self.github_btn.clicked.connect(self.press_github)
         self.in_stock_checkBox.stateChanged.connect(self.on_in_stock_checkBox_state_change)
         self.action_Settings.triggered.connect(self.press_settings)
         self.actionLogs.triggered.connect(self.press_logs)
@@ -71,18 +85,72 @@ class MainWindow(QMainWindow):
 
     def init_tableview(self):
         # Initializes the table view
-        self.model = QStandardItemModel(self)
-        self.model.setHorizontalHeaderLabels(['No',
-                                              self.language.group,
-                                              self.language.taste,
-                                              self.language.nicotine,
-                                              self.language.volume,
-                                              self.language.price,
-                                              self.language.cod,
-                                              self.language.count])
+        self.model = ItemTableModel(db_handler=self.cache,
+                                    filter_manager=self.filter_manager,
+                                    headers=['No',
+                                             self.language.group,
+                                             self.language.taste,
+                                             self.language.nicotine,
+                                             self.language.volume,
+                                             self.language.price,
+                                             self.language.cod,
+                                             self.language.count],
+                                    parent=self)
+        # Nothing is fetched before load_first_data runs, after the window is shown
+        self.model.has_more = False
         self.tableView.setModel(self.model)
         selection_model = self.tableView.selectionModel()
         selection_model.selectionChanged.connect(self.on_selection_changed)
+        # Header clicks sort in the database, starting from the default order: count, highest first
+        header = self.tableView.horizontalHeader()
+        header.setSectionsClickable(True)
+        header.setSortIndicatorShown(True)
+        header.setSortIndicator(SORT_COLUMNS.index('count'), Qt.DescendingOrder)
+        header.sortIndicatorChanged.connect(self.on_sort_indicator_changed)
+
+    def load_first_data(self):
+        # Fills the group ComboBox; selecting its first item loads the first page of the table
+        self.show_group_name_comboBox()
+        self.refresh_dashboard()
+
+    def init_search(self):
+        # Searches are debounced and run on the thread pool; only the latest generation is applied
+        self.search_generation = 0
+        self.search_task = None
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(250)
+        self.search_timer.timeout.connect(self.start_search)
+
+    def init_scan_mode(self):
+        # In scan mode every code entered into scan_edit (a barcode scanner ends it with Enter) sells one unit
+        self.scan_mode_checkBox.stateChanged.connect(self.on_scan_mode_checkBox_state_change)
+        self.scan_edit.returnPressed.connect(self.on_code_scanned)
+
+    def init_stock_movements(self):
+        # +1/-1 clicks are summed per item and written together, one transaction per flush
+        self.pending_movements = {}
+        self.stock_timer = QTimer(self)
+        self.stock_timer.setSingleShot(True)
+        self.stock_timer.setInterval(Settings().stock_flush_interval_ms)
+        self.stock_timer.timeout.connect(self.flush_stock_movements)
+
+    def init_dashboard(self):
+        # The dashboard reads the per-group summary kept by triggers, one row per group
+        # Changes arriving together, like a flush of stock movements, refresh it once
+        self.dashboard_timer = QTimer(self)
+        self.dashboard_timer.setSingleShot(True)
+        self.dashboard_timer.setInterval(0)
+        self.dashboard_timer.timeout.connect(self.refresh_dashboard)
+        self.dashboard_tableWidget.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+    def init_snapshots(self):
+        # Takes a native database snapshot on a timer, in the background
+        self.snapshot_task = None
+        self.snapshot_timer = QTimer(self)
+        self.snapshot_timer.setInterval(Settings().snapshot_interval_minutes * 60 * 1000)
+        self.snapshot_timer.timeout.connect(self.start_snapshot)
+        self.snapshot_timer.start()
 
     def init_under_tableview_btns(self):
         # Initializes buttons below the table view and sets up event connections
@@ -113,73 +181,107 @@ class MainWindow(QMainWindow):
         self.copy_cod_btn.setEnabled(True)
 
     def get_item_data_from_table_view(self) -> ItemData:
-        return ItemData(id_=int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 0).text()),
-                        group_name=self.model.item(self.tableView.selectionModel().currentIndex().row(), 1).text(),
-                        taste=self.model.item(self.tableView.selectionModel().currentIndex().row(), 2).text(),
-                        nicotine=int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 3).text()),
-                        volume=int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 4).text()),
-                        price=float(self.model.item(self.tableView.selectionModel().currentIndex().row(), 5).text()),
-                        code=self.model.item(self.tableView.selectionModel().currentIndex().row(), 6).text(),
-                        count=int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 7).text()))
+        return self.model.item_data(self.tableView.selectionModel().currentIndex().row())
 
     def get_current_count_and_index_from_model(self):
         # Retrieves the current item count and index from the table view
-        return int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 7).text()), \
-               int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 0).text())
+        item_data = self.get_item_data_from_table_view()
+        return item_data.count, item_data.id_
 
     def press_copy_cod_of_item(self):
         # Handler for copy code button press
         # Copies the item code to the clipboard
-        pyperclip.copy(str(self.model.item(self.tableView.selectionModel().currentIndex().row(), 6).text()))
+        import pyperclip
+
+        pyperclip.copy(self.get_item_data_from_table_view().code)
 
     def get_current_row_item_data(self) -> ItemData:
         # Retrieves item data from the current selected row in the table view
-        id_ = self.model.item(self.tableView.selectionModel().currentIndex().row(), 0).text()
-        group_name = self.model.item(self.tableView.selectionModel().currentIndex().row(), 1).text()
-        taste = self.model.item(self.tableView.selectionModel().currentIndex().row(), 2).text()
-        nicotine = int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 3).text())
-        volume = int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 4).text())
-        price = float(self.model.item(self.tableView.selectionModel().currentIndex().row(), 5).text())
-        code = self.model.item(self.tableView.selectionModel().currentIndex().row(), 6).text()
-        count = int(self.model.item(self.tableView.selectionModel().currentIndex().row(), 7).text())
-        return ItemData(id_, group_name, taste, nicotine, volume, price, code, count)
+        return self.get_item_data_from_table_view()
 
     def show_group_name_comboBox(self):
         # Shows group names in the ComboBox
         self.filter_manager.group_name = None
-        self.group_name_comboBox.addItem(f'{self.language.all} ({self.db_handler.retrieve_count_in_group_with_filters(None, self.filter_manager)})')
-        for row in self.db_handler.retrieve_groups_names_with_filters(self.filter_manager):
-            self.group_name_comboBox.addItem(f'{row[0]} ({self.db_handler.retrieve_count_in_group_with_filters(row[0], self.filter_manager)})')
-
-    def view_all_data_from_db(self):
-        # Retrieves and displays all data from the database
-        data = self.db_handler.retrieve_data_from_items_with_group_name()
-        self.append_rows_to_table_model(data)
-
-    def view_group_items_from_db(self, group_name: str):
-        # Retrieves and displays items from the database for a specific group
-        data = self.db_handler.retrieve_data_from_items_with_group_name_where_group(group_name)
-        self.append_rows_to_table_model(data)
-
-    def append_rows_to_table_model(self, data):
-        # Appends rows to the table model for display in the table view
-        for row in data:
-            self.model.appendRow([QStandardItem(str(i)) for i in row])
+        facets, total = self.cache.retrieve_group_facets_with_filters(self.filter_manager)
+        self.add_group_facets_to_comboBox(facets, total)
+
+    def add_group_facets_to_comboBox(self, facets, total):
+        # Fills the ComboBox with (group_name, row_count) pairs and remembers them for patching
+        self.group_facets = dict(facets)
+        self.group_facets_total = total
+        self.group_name_comboBox.addItem(f'{self.language.all} ({total})')
+        for group_name, row_count in facets:
+            self.group_name_comboBox.addItem(f'{group_name} ({row_count})')
+
+    def refresh_group_facets(self):
+        # Re-reads the group facets with one query and keeps the selected group if it still exists
+        selected = self.filter_manager.group_name
+        facets, total = self.cache.retrieve_group_facets_with_filters(self.filter_manager)
+        self.group_name_comboBox.blockSignals(True)
+        self.group_name_comboBox.clear()
+        self.add_group_facets_to_comboBox(facets, total)
+        index = list(self.group_facets).index(selected) + 1 if selected in self.group_facets else 0
+        self.group_name_comboBox.setCurrentIndex(index)
+        self.group_name_comboBox.blockSignals(False)
+        if selected is not None and index == 0:
+            self.filter_manager.group_name = None
+            self.update_table()
+
+    def patch_group_facets(self, event: ChangeEvent) -> bool:
+        # Moves the changed item between the group counts without querying the database
+        # Returns False when the counts depend on the search or a group may appear or disappear
+        if event.kind == ChangeEvent.RELOADED or not self.filter_manager.can_match_locally():
+            return False
+        stock_filter = FilterManager(in_stock=self.filter_manager.in_stock, ranges=self.filter_manager.ranges)
+        facets = dict(self.group_facets)
+        total = self.group_facets_total
+        for item_data, step in ((event.previous, -1), (event.item_data, 1)):
+            if item_data is not None and stock_filter.matches(item_data):
+                facets[item_data.group_name] = facets.get(item_data.group_name, 0) + step
+                total += step
+        # Groups are listed by the in-stock filter alone, so a group with no item in the ranges stays listed
+        listing_filter = FilterManager(in_stock=self.filter_manager.in_stock)
+        joins = event.item_data is not None and listing_filter.matches(event.item_data)
+        leaves = event.previous is not None and listing_filter.matches(event.previous)
+        if joins and event.item_data.group_name not in self.group_facets:
+            return False
+        # Whether the group lost its last listed item is only known from its count when no range narrows it
+        if leaves and not (joins and event.item_data.group_name == event.previous.group_name) and (
+                self.filter_manager.ranges or facets.get(event.previous.group_name, 0) == 0):
+            return False
+        self.group_facets = facets
+        self.group_facets_total = total
+        self.group_name_comboBox.setItemText(0, f'{self.language.all} ({total})')
+        for index, (group_name, row_count) in enumerate(facets.items(), start=1):
+            self.group_name_comboBox.setItemText(index, f'{group_name} ({row_count})')
+        return True
+
+    def on_db_change(self, event: ChangeEvent):
+        # Handler for changes made through the database handler
+        # Patches only the affected rows and group counts, reloading only when the filters require it
+        if not self.model.apply_change(event):
+            self.update_table()
+        if not self.patch_group_facets(event):
+            self.refresh_group_facets()
+        self.dashboard_timer.start()
+
+    def refresh_dashboard(self):
+        # Shows the stock totals of the whole inventory and of every group
+        groups, sku_count, in_stock_count, units, stock_value = self.db_handler.retrieve_inventory_totals()
+        self.dashboard_total_label.setText(f'{self.language.skus}: {sku_count} ({self.language.in_stock}: '
+                                           f'{in_stock_count})\n{self.language.units}: {units}\n'
+                                           f'{self.language.stock_value}: {stock_value:,.2f}')
+        summaries = self.db_handler.retrieve_group_summaries()
+        self.dashboard_tableWidget.setRowCount(len(summaries))
+        for row, (group_name, sku_count, _, units, stock_value) in enumerate(summaries):
+            for column, value in enumerate((group_name, sku_count, units, f'{stock_value:,.2f}')):
+                self.dashboard_tableWidget.setItem(row, column, QTableWidgetItem(str(value)))
 
     def get_dir_from_file_dialog(self, title: str):
         options = QFileDialog.Options()
         directory_dialog = QFileDialog()
         return directory_dialog.getExistingDirectory(self, title, '', options=options)
 
-    def remove_rows(self):
-        # Removes all rows from the table view
-        for row in range(self.model.rowCount(), -1, -1):
-            self.model.removeRow(row)
-
-    def show_data_in_table(self):
-        # Shows data in the table view
-        self.append_rows_to_table_model(self.db_handler.retrieve_items_where_filter_manager(self.filter_manager))
-
     def on_selection_changed(self, selected, deselected):
         # Handler for table view selection change
         # Enables or disables buttons based on selection
@@ -204,13 +306,87 @@ class MainWindow(QMainWindow):
         self.update_group_name_comboBox()
         self.update_table()
 
-    def on_search_edit_changed(self, text):
-        if len(text) > 0:
-            self.filter_manager.search_taste = text
+    def on_scan_mode_checkBox_state_change(self, state):
+        # Shows the scan input and keeps the keyboard focus on it while scan mode is on
+        enabled = state == Qt.Checked
+        self.scan_edit.setVisible(enabled)
+        self.scan_status_label.setVisible(enabled)
+        self.scan_status_label.clear()
+        if enabled:
+            self.scan_edit.setFocus()
+
+    def on_code_scanned(self):
+        # Sells one unit of the scanned item with one atomic UPDATE
+        # The change event patches the table and the group counts, so nothing is reloaded
+        code = self.scan_edit.text().strip()
+        self.scan_edit.clear()
+        if not code:
+            return
+        item_data = self.db_handler.adjust_count_by_code(code, -1)
+        if item_data is None:
+            reason = self.language.scan_out_of_stock if self.db_handler.retrieve_item_data_by_code(code) \
+                else self.language.scan_not_found
+            self.scan_status_label.setText(f"{code}: {reason}")
+            self.logger.add_log(f"SCAN {code}: {reason}")
+            return
+        self.scan_status_label.setText(f"{item_data.taste} ({item_data.code}): {item_data.count}")
+        row = self.model.row_of(item_data.id_)
+        if row is not None:
+            self.tableView.selectRow(row)
+        self.logger.add_log(f"SCAN -1 RESULT: {item_data}")
+
+    def on_sort_indicator_changed(self, section, order):
+        # Handler for table header clicks
+        # Sorts by the clicked column; Shift+click adds it after the columns already sorted on
+        column = SORT_COLUMNS[section]
+        descending = order == Qt.DescendingOrder
+        if QApplication.keyboardModifiers() & Qt.ShiftModifier:
+            sort = self.filter_manager.sort or [('count', True)]
+            sort = [(sorted_column, desc) for sorted_column, desc in sort if sorted_column != column]
+            sort.append((column, descending))
         else:
-            self.filter_manager.search_taste = None
+            sort = [(column, descending)]
+        self.filter_manager.set_sort(sort)
         self.update_table()
-        self.update_group_name_comboBox()
+
+    def on_search_edit_changed(self, text):
+        # Restarting the timer drops the keystrokes typed within the debounce interval
+        self.search_timer.start()
+
+    def start_search(self):
+        # Cancels the running search and starts a new one on the thread pool
+        # The search runs on a copy of the filters; the table keeps paging with the applied filters and
+        # their cursor until on_search_finished swaps both at once
+        self.search_generation += 1
+        if self.search_task is not None:
+            self.search_task.cancel()
+        search_filter_manager = self.filter_manager.copy()
+        # Words like "price:100-300" or "volume:10" set ranges, the other words are searched for
+        search_filter_manager.set_search_text(self.search_edit.text())
+        search_filter_manager.group_name = None
+        self.search_task = SearchTask(db_handler=self.db_handler,
+                                      filter_manager=search_filter_manager,
+                                      page_size=self.model.page_size,
+                                      generation=self.search_generation,
+                                      cache=self.cache)
+        self.search_task.signals.finished.connect(self.on_search_finished)
+        QThreadPool.globalInstance().start(self.search_task)
+
+    def on_search_finished(self, generation, page, facets, total):
+        # Applies the search result unless a newer search has been started meanwhile
+        if generation != self.search_generation:
+            return
+        self.filter_manager = self.search_task.filter_manager
+        self.model.filter_manager = self.filter_manager
+        self.search_task = None
+        self.group_name_comboBox.blockSignals(True)
+        self.group_name_comboBox.clear()
+        self.add_group_facets_to_comboBox(facets, total)
+        self.group_name_comboBox.blockSignals(False)
+        rows, next_cursor = page
+        self.model.reset(first_page=rows, next_cursor=next_cursor)
+        self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.disable_btns()
 
     def press_add_items(self):
         # Handler for add items button press
@@ -233,47 +409,84 @@ class MainWindow(QMainWindow):
 
     def press_plus_one_to_item(self):
         # Handler for plus one button press
-        # Increases item count by one in the database and updates the UI
+        # Queues a relative +1 for the selected item; the database computes the new count
         item_data = self.get_item_data_from_table_view()
-        item_data.count += 1
-        self.db_handler.update_item_count_value(item_data.id_, item_data.count)
-
-        item_index = self.model.index(self.tableView.selectionModel().currentIndex().row(), 7)
-        self.model.setData(item_index, item_data.count)
-
-        self.logger.add_log(f"+1 RESULT: {item_data}")
+        self.queue_stock_movement(item_data.id_, 1)
 
     def press_minus_one_to_item(self):
         # Handler for minus one button press
-        # Decreases item count by one in the database and updates the UI
+        # Queues a relative -1 unless the clicks queued so far already use up the shown count
         item_data = self.get_item_data_from_table_view()
-        if item_data.count <= 0:
+        if item_data.count + self.pending_movements.get(item_data.id_, 0) <= 0:
             return
-        item_data.count -= 1
-        self.db_handler.update_item_count_value(item_data.id_, item_data.count)
-
-        item_index = self.model.index(self.tableView.selectionModel().currentIndex().row(), 7)
-        self.model.setData(item_index, item_data.count)
-
-        self.logger.add_log(f"-1 RESULT: {item_data}")
+        self.queue_stock_movement(item_data.id_, -1)
+
+    def queue_stock_movement(self, id_: int, delta: int):
+        # The timer is not restarted, so a click is written at most one interval later
+        self.pending_movements[id_] = self.pending_movements.get(id_, 0) + delta
+        if self.pending_movements[id_] == 0:
+            del self.pending_movements[id_]
+        if not self.stock_timer.isActive():
+            self.stock_timer.start()
+
+    def flush_stock_movements(self):
+        # Writes the queued deltas in one transaction; the change events patch the table
+        self.stock_timer.stop()
+        if not self.pending_movements:
+            return
+        movements = list(self.pending_movements.items())
+        self.pending_movements.clear()
+        results = self.db_handler.apply_stock_movements(movements)
+        for (id_, delta), item_data in zip(movements, results):
+            if item_data is None:
+                self.logger.add_log(f"{delta:+d} REJECTED: id={id_}")
+            else:
+                self.logger.add_log(f"{delta:+d} RESULT: {item_data}")
 
     def press_export_all_csv(self):
         directory_path = self.get_dir_from_file_dialog(self.language.export_all)
         if not directory_path:
             return
         self.logger.add_log(f"EXPORT file scv to: {directory_path}")
-        CSVExporter(item_datas=self.db_handler.retrieve_all_item_data(), path_dir=directory_path, is_backup=False)
-        self.logger.add_log(f"EXPORT successful")
-        self.open_done_window(self.language.export_all)
+        self.start_export(self.language.export_all, path_dir=directory_path)
 
     def press_export_table_csv(self):
         directory_path = self.get_dir_from_file_dialog(self.language.export_current_table)
         if not directory_path:
             return
         self.logger.add_log(f"EXPORT file scv to: {directory_path} with filters :{str(self.filter_manager)}")
-        CSVExporter(item_datas=self.db_handler.retrieve_item_data_with_filters(self.filter_manager), path_dir=directory_path, is_backup=False)
-        self.logger.add_log(f"EXPORT successful")
-        self.open_done_window(self.language.export_current_table)
+        self.start_export(self.language.export_current_table,
+                          filter_manager=self.filter_manager.copy(),
+                          path_dir=directory_path)
+
+    def start_export(self, title: str, filter_manager=None, path_dir=None, is_backup=False):
+        # Streams a CSV export on the thread pool behind a progress dialog that can cancel it
+        task = ExportTask(db_handler=self.db_handler,
+                          filter_manager=filter_manager,
+                          path_dir=path_dir,
+                          is_backup=is_backup)
+        dialog = QProgressDialog(title, self.language.cansel, 0, 100, self)
+        dialog.setWindowTitle(title)
+        dialog.setWindowModality(Qt.WindowModal)
+        dialog.setMinimumDuration(500)
+        dialog.setAutoClose(False)
+        dialog.canceled.connect(task.cancel)
+        task.signals.progress.connect(
+            lambda written, total: dialog.setValue(written * 100 // total if total else 100))
+        task.signals.finished.connect(
+            lambda completed, path_file: self.on_export_finished(task, dialog, title, completed, path_file))
+        self.export_tasks.append(task)
+        QThreadPool.globalInstance().start(task)
+
+    def on_export_finished(self, task, dialog, title: str, completed: bool, path_file: str):
+        # Closes the progress dialog and reports how the export ended
+        self.export_tasks.remove(task)
+        dialog.close()
+        if not completed:
+            self.logger.add_log(f"EXPORT cancelled: {path_file}")
+            return
+        self.logger.add_log(f"EXPORT successful: {path_file}")
+        self.open_done_window(title)
 
     def press_settings(self):
         if self.window_setting is None:
@@ -281,15 +494,51 @@ class MainWindow(QMainWindow):
                                           appctxt=self.appctxt)
         self.window_setting.show()
 
+    def press_github(self):
+        import webbrowser
+
+        webbrowser.open("https://github.com/KovalchukValentin")
+
     def press_logs(self):
+        import subprocess
+
         subprocess.Popen(f'explorer /select, "{os.getcwd()}\\log\\"', shell=True)
 
     def press_backup_now(self):
-        CSVExporter(item_datas=self.db_handler.retrieve_all_item_data(), is_backup=True)
-        self.logger.add_log(f"BACKUP")
+        # Writes only the changes since the last backup, or a full snapshot when one is due,
+        # and takes a native database snapshot next to it
+        self.start_snapshot()
+        task = BackupTask(IncrementalBackup(self.db_handler))
+        task.signals.finished.connect(lambda completed, entry: self.on_backup_finished(task, completed, entry))
+        self.backup_tasks.append(task)
+        QThreadPool.globalInstance().start(task)
+
+    def start_snapshot(self):
+        # Starts a database snapshot on the thread pool unless one is already running
+        if self.snapshot_task is not None:
+            return
+        self.snapshot_task = SnapshotTask(DatabaseSnapshot(self.db_handler))
+        self.snapshot_task.signals.finished.connect(self.on_snapshot_finished)
+        QThreadPool.globalInstance().start(self.snapshot_task)
+
+    def on_snapshot_finished(self, completed: bool, path_file: str):
+        self.snapshot_task = None
+        self.logger.add_log(f"SNAPSHOT: {path_file}" if completed else f"SNAPSHOT failed")
+
+    def on_backup_finished(self, task, completed: bool, entry):
+        self.backup_tasks.remove(task)
+        if not completed:
+            self.logger.add_log(f"BACKUP failed")
+            return
+        # The writer connection belongs to the GUI thread, so a full backup prunes the journal here
+        task.backup.prune_journal(entry)
+        self.logger.add_log(f"BACKUP {entry['kind']}: {entry['file']} ({entry['rows']} rows)" if entry is not None
+                            else f"BACKUP skipped: no changes")
         self.open_done_window(self.language.backup)
 
     def press_show_backup(self):
+        import subprocess
+
         subprocess.Popen(f'explorer /select, "{os.getcwd()}\\backup\\"', shell=True)
 
     def press_import_csv(self):
@@ -313,13 +562,28 @@ class MainWindow(QMainWindow):
 
     def update_table(self):
         # Updates the table view with the latest data
-        self.remove_rows()
-        self.show_data_in_table()
+        search_pending = self.search_timer.isActive() or self.search_task is not None
+        # A search still running was started with older filters, so its result is dropped
+        if self.search_task is not None:
+            self.search_task.cancel()
+            self.search_task = None
+            self.search_generation += 1
+        # The model drops its fetched rows and loads only the first page
+        self.model.reset()
         self.tableView.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         self.disable_btns()
+        if search_pending:
+            # The search typed meanwhile is not applied yet; it runs again with the changed filters
+            self.search_timer.stop()
+            self.start_search()
 
     def update_language(self):
         self.in_stock_checkBox.setText(self.language.only_in_stock)
+        self.scan_mode_checkBox.setText(self.language.scan_mode)
+        self.search_edit.setToolTip(self.language.search_hint)
+        self.dashboard_label.setText(self.language.inventory)
+        self.dashboard_tableWidget.setHorizontalHeaderLabels([self.language.group, self.language.skus,
+                                                              self.language.units, self.language.stock_value])
         self.edit_btn.setText(self.language.edit)
         self.copy_cod_btn.setText(self.language.cod)
         self.actionNew_items.setText(self.language.new_items)
@@ -381,9 +645,6 @@ class ItemWindow(QWidget):
             self.change_data_in_db()
             self.close()
 
-        self.main_window.update_table()
-        self.main_window.update_group_name_comboBox()
-
     def insert_data_to_db(self):
         self.db_handler.insert_item_data(self.item_data)
         self.update_group_comboBox()
@@ -414,9 +675,9 @@ class ItemWindow(QWidget):
                                count=self.count_spinBox.value())
 
     def add_group_names_to_comboBox(self):
-        # Populates the group ComboBox with group names from the database
+        # Populates the group ComboBox with group names, read from the database only when they changed
         self.group_comboBox.addItem(self.language.select_group)
-        for row in self.db_handler.retrieve_groups_names():
+        for row in self.main_window.cache.retrieve_groups_names():
             self.group_comboBox.addItem(row[0])
 
     def show_data(self):
@@ -444,14 +705,12 @@ class ItemWindow(QWidget):
     def press_delete(self):
         self.db_handler.delete_data_from_items(self.item_data.id_)
         self.logger.add_log(f"DELETE: {self.item_data}")
-        self.main_window.update_table()
-        self.main_window.update_group_name_comboBox()
         self.close()
 
     def update_group_comboBox(self):
         # Updates the group ComboBox content
         self.group_comboBox.clear()
-        self.add_group_wwnames_to_comboBox()
+        self.add_group_names_to_comboBox()
 
     def update_language(self):
         self.group_label.setText(self.language.group)
@@ -509,21 +768,20 @@ class ImportCSVWindow(QWidget):
         if not self.path_edit.text():
             return
         self.logger.add_log(f"Import file scv from: {self.path_edit.text()}")
-        counter = 0
-        for item_data in CSVImporter(self.path_edit.text()).get_in_item_data_list():
-            if item_data.isValid():
-                try:
-                    self.db_handler.insert_item_data(item_data)
-                    self.logger.add_log(f"ADD: {item_data}")
-                    counter += 1
-                except:
-                    self.logger.add_log(f"ERROR ADD: {item_data}")
-                    continue
-        self.main_window.update_table()
-        self.main_window.update_group_name_comboBox()
-        self.main_window.open_done_window(f"{self.language.import_}: {counter}")
+        result = self.db_handler.insert_item_datas(self.read_item_datas(CSVImporter(self.path_edit.text())),
+                                                   logger=self.logger)
+        self.logger.add_log(f"IMPORT RESULT: {result}")
+        self.main_window.open_done_window(f"{self.language.import_}: {result.accepted}")
         self.close()
 
+    def read_item_datas(self, importer: CSVImporter):
+        # Streams typed items chunk by chunk, logging one summary line per chunk of unreadable rows
+        for chunk in importer.iter_chunks():
+            if chunk.errors:
+                errors = "; ".join(f"line {line_number}: {message}" for line_number, message in chunk.errors)
+                self.logger.add_log(f"IMPORT SKIPPED {len(chunk.errors)} rows ({errors})")
+            yield from chunk.rows
+
     def press_load_example(self):
         # Handler for load example button press
         # Allows users to load an example CSV file
@@ -531,6 +789,8 @@ class ImportCSVWindow(QWidget):
         directory_dialog = QFileDialog()
         directory_path = directory_dialog.getExistingDirectory(self, 'Open Folder', '', options=options)
         if directory_path:
+            import shutil
+
             shutil.copy(self.path_to_example, directory_path + '/' + self.path_to_example.split('\\')[-1])
             self.logger.add_log("Download example file scv")
         self.close()
@@ -577,17 +837,43 @@ class DoneWindow(QDialog):
 
 
 def main():
+    # Run with --profile-startup or PROFILE_STARTUP=1 to print the duration of every startup phase
     db_handler = DatabaseHandler('database.db')
     db_handler.connect()
+    # Run with TRACE_QUERIES=1, or set Settings().trace_queries, to time every query of the session
+    tracer = None
+    if Settings().trace_queries or os.environ.get("TRACE_QUERIES"):
+        tracer = QueryTracer(logger=Logger())
+        tracer.install(db_handler)
+    startup_profile.mark("db connect")
     db_handler.create_tables()
+    startup_profile.mark("create_tables")
 
     appctxt = ApplicationContext()
+    startup_profile.mark("application context")
     main_window = MainWindow(appctxt, db_handler)
+    startup_profile.mark("main window")
     main_window.move(0, 0)
     main_window.setWindowTitle("Developed By @Valent_nk")
     main_window.show()
+
+    def finish_startup():
+        # Runs on the first event loop iteration, once the empty window has been painted
+        startup_profile.mark("first paint")
+        main_window.load_first_data()
+        startup_profile.mark("first query")
+        startup_profile.report(main_window.logger)
+
+    QTimer.singleShot(0, finish_startup)
     try:
-        sys.exit(appctxt.app.exec_())
-    except ValueError as err:
+        exit_code = appctxt.app.exec_()
+    finally:
+        main_window.flush_stock_movements()
+        # Background tasks hold pooled connections, so they finish before the database is checkpointed
+        QThreadPool.globalInstance().waitForDone()
+        if tracer is not None:
+            path = f"log/trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            # Read it with: python cli.py trace-dump <path>
+            tracer.save(path)
         db_handler.close_connection()
-        print("Exiting" + str(err))
+    sys.exit(exit_code)
@@ -0,0 +1,176 @@
+import sqlite3
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from backup import IncrementalBackup, DatabaseSnapshot
+from services import FilterManager, CSVExporter
+
+
+class SearchSignals(QObject):
+    # Emitted with the generation of the search, the first page as (rows, next cursor), the group facets
+    # and their total
+    finished = pyqtSignal(int, object, object, int)
+
+
+class SearchTask(QRunnable):
+    def __init__(self, db_handler, filter_manager: FilterManager, page_size: int, generation: int, cache=None):
+        """Initialize a SearchTask instance.
+
+        The task runs the first page of the filtered items and the group facets on a pooled read connection,
+        so the GUI thread never waits for a search. With a cache, repeated searches skip the queries.
+
+        Args:
+            db_handler (DatabaseHandler): Handler of the GUI thread, lending the task a read connection.
+            filter_manager (FilterManager): Snapshot of the filters to search with.
+            page_size (int): Number of rows of the first page.
+            generation (int): Sequence number used by the caller to drop stale results.
+            cache (InventoryCache, optional): Cache of search results shared with the GUI thread. Defaults to None.
+        """
+        super().__init__()
+        self.db_handler = db_handler
+        self.cache = cache
+        self.filter_manager = filter_manager
+        self.page_size = page_size
+        self.generation = generation
+        self.signals = SearchSignals()
+        self.reader = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            with self.db_handler.reader() as reader:
+                with self.lock:
+                    self.reader = reader
+                try:
+                    if self.cache is None:
+                        page = reader.retrieve_items_page(self.filter_manager, self.page_size)
+                        facets, total = reader.retrieve_group_facets_with_filters(self.filter_manager)
+                    else:
+                        page = self.cache.retrieve_items_page(self.filter_manager, self.page_size, source=reader)
+                        facets, total = self.cache.retrieve_group_facets_with_filters(self.filter_manager, source=reader)
+                finally:
+                    # The pooled connection must not be interrupted once it is handed to another task
+                    with self.lock:
+                        self.reader = None
+        except sqlite3.OperationalError:
+            # The query was interrupted by a newer search
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.generation, page, facets, total)
+
+    def cancel(self):
+        """Stop the task, interrupting its query if it is already running. Safe to call from any thread."""
+        with self.lock:
+            self.cancelled = True
+            if self.reader is not None:
+                self.reader.interrupt()
+
+
+class ExportSignals(QObject):
+    # Emitted with the number of exported items and the total
+    progress = pyqtSignal(int, int)
+    # Emitted with True when the export completed, False when it was cancelled or failed, and the file path
+    finished = pyqtSignal(bool, str)
+
+
+class ExportTask(QRunnable):
+    def __init__(self, db_handler, filter_manager: FilterManager = None, path_dir=None, is_backup=False):
+        """Initialize an ExportTask instance.
+
+        The task streams items from a pooled read connection into a CSV file, so memory stays flat and the
+        GUI thread stays responsive whatever the size of the table.
+
+        Args:
+            db_handler (DatabaseHandler): Handler of the GUI thread, lending the task a read connection.
+            filter_manager (FilterManager, optional): Snapshot of the filters to export, or None for every item.
+                Defaults to None.
+            path_dir (str, optional): Directory of the exported file. Defaults to None.
+            is_backup (bool, optional): Whether to write the file to the backup directory. Defaults to False.
+        """
+        super().__init__()
+        self.db_handler = db_handler
+        self.filter_manager = filter_manager
+        self.path_dir = path_dir
+        self.is_backup = is_backup
+        self.signals = ExportSignals()
+        self.exporter = None
+        self.cancelled = False
+
+    def run(self):
+        completed = False
+        try:
+            with self.db_handler.reader() as reader:
+                total = reader.count_items(self.filter_manager)
+                self.exporter = CSVExporter(item_datas=reader.iter_item_rows(self.filter_manager),
+                                            path_dir=self.path_dir,
+                                            is_backup=self.is_backup,
+                                            total=total,
+                                            on_progress=self.signals.progress.emit)
+                if self.cancelled:
+                    self.exporter.cancel()
+                completed = self.exporter.export_to_file()
+        except (sqlite3.Error, OSError):
+            completed = False
+        path_file = str(self.exporter.path_file) if self.exporter is not None else ""
+        self.signals.finished.emit(completed, path_file)
+
+    def cancel(self):
+        """Stop the export and remove the partial file. Safe to call from any thread."""
+        self.cancelled = True
+        if self.exporter is not None:
+            self.exporter.cancel()
+
+
+class BackupSignals(QObject):
+    # Emitted with True and the manifest entry of the backup (None if nothing changed), or False on failure
+    finished = pyqtSignal(bool, object)
+
+
+class BackupTask(QRunnable):
+    def __init__(self, backup: IncrementalBackup):
+        """Initialize a BackupTask instance.
+
+        Args:
+            backup (IncrementalBackup): Backup to run off the GUI thread. The journal is not pruned here,
+                the receiver of finished calls backup.prune_journal on the GUI thread.
+        """
+        super().__init__()
+        self.backup = backup
+        self.signals = BackupSignals()
+
+    def run(self):
+        try:
+            entry = self.backup.run(prune=False)
+        except (sqlite3.Error, OSError, ValueError):
+            self.signals.finished.emit(False, None)
+            return
+        self.signals.finished.emit(True, entry)
+
+
+class SnapshotSignals(QObject):
+    # Emitted with True and the snapshot path, or False and an empty string on failure
+    finished = pyqtSignal(bool, str)
+
+
+class SnapshotTask(QRunnable):
+    def __init__(self, snapshot: DatabaseSnapshot):
+        """Initialize a SnapshotTask instance.
+
+        Args:
+            snapshot (DatabaseSnapshot): Snapshot to take off the GUI thread.
+        """
+        super().__init__()
+        self.snapshot = snapshot
+        self.signals = SnapshotSignals()
+
+    def run(self):
+        try:
+            path = self.snapshot.run()
+        except (sqlite3.Error, OSError, ValueError):
+            self.signals.finished.emit(False, "")
+            return
+        self.signals.finished.emit(True, str(path))